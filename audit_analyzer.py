@@ -46,6 +46,10 @@ def parse_audit_file(filepath):
     data['complexity'] = re.search(r'Complexity level: (\w+)', content).group(1)
     data['avg_time_per_transform'] = float(re.search(r'Avg time per transformation: ([\d.]+)s', content).group(1))
     
+    # Motor de lectura (solo en audits que lo registran)
+    engine_match = re.search(r'Engine: (\S+)', content)
+    data['reading_engine'] = engine_match.group(1) if engine_match else None
+    
     # Status
     data['status'] = re.search(r'Status: (\w+)', content).group(1)
     
@@ -212,7 +216,7 @@ def generate_comparison_csv(df, output_file='zzz_audit_analysis/audit_comparison
         'total_runtime', 'reading_time', 'transformation_time', 'writing_time',
         'reading_pct', 'transformation_pct', 'writing_pct',
         'throughput', 'time_per_1m', 'complexity',
-        'transformation_count', 'avg_time_per_transform'
+        'transformation_count', 'avg_time_per_transform', 'reading_engine'
     ]
     
     # Agregar columnas de memoria si existen
@@ -238,7 +242,8 @@ def generate_comparison_csv(df, output_file='zzz_audit_analysis/audit_comparison
         'time_per_1m': 'Time per 1M (s)',
         'complexity': 'Complexity',
         'transformation_count': 'Transform Count',
-        'avg_time_per_transform': 'Avg Time per Transform (s)'
+        'avg_time_per_transform': 'Avg Time per Transform (s)',
+        'reading_engine': 'Reading Engine'
     }
     
     # Agregar renombres de memoria si existen
@@ -69,6 +69,19 @@ class AuditLogger:
         self.metrics['reading_start'] = time.time()
         self._write_line("[PHASE] Starting INPUT READING...")
     
+    def log_reading_detail(self, name, value):
+        """Registrar un detalle de la fase de lectura (motor, bytes, tiempos parciales...)"""
+        self.metrics.setdefault('reading_details', {})[name] = value
+        self._write_line(f"  ├─ {name}: {value}")
+    
+    def log_input_metadata(self, metadata):
+        """Registrar los metadatos del input obtenidos antes de leerlo (ver reader.read_input_metadata)"""
+        self.metrics['input_metadata'] = metadata
+        approx = "" if metadata['rows_exact'] else "~"
+        files = f" in {metadata['files']} files" if metadata['files'] > 1 else ""
+        self._write_line(f"  ├─ Input estimate: {approx}{metadata['rows']:,} rows × {len(metadata['columns'])} columns{files}, "
+                         f"{metadata['bytes'] / 1024 / 1024:.1f} MB (estimated read {metadata['estimated_read_seconds']:.3f}s)")
+
     def log_reading_end(self, rows, columns):
         """Marcar fin de lectura de input"""
         if 'reading_start' in self.metrics:
@@ -94,13 +107,51 @@ class AuditLogger:
         self.metrics['transformations_start'] = time.time()
         self._write_line("[PHASE] Starting TRANSFORMATIONS...")
     
-    def log_transformation(self, name, execution_time=None):
-        """Registrar una transformación individual"""
+    def log_transformation(self, name, execution_time=None, buffers=None):
+        """Registrar una transformación individual (buffers: bytes asignados y compartidos por el paso)"""
         self.metrics['transformations_count'] += 1
+        detail = ""
+        if buffers:
+            allocated, shared = buffers
+            detail = f" (new {allocated / 1024 / 1024:.1f} MB, shared {shared / 1024 / 1024:.1f} MB)"
         if execution_time:
-            self._write_line(f"  ├─ {name}: {execution_time:.3f}s")
+            self._write_line(f"  ├─ {name}: {execution_time:.3f}s{detail}")
         else:
-            self._write_line(f"  ├─ {name}")
+            self._write_line(f"  ├─ {name}{detail}")
+    
+    def log_lookup(self, table, key, rows, unmatched):
+        """Registrar las claves sin correspondencia de un lookup en una tabla auxiliar"""
+        self.metrics.setdefault('lookup_unmatched', {})[table] = unmatched
+        self._write_line(f"  ├─ Lookup {table} on {key}: {unmatched:,} of {rows:,} rows unmatched")
+
+    def log_copies(self, allocated, shared):
+        """Registrar los bytes únicos de la salida de las transformaciones: nuevos y compartidos con el input"""
+        self.metrics['bytes_allocated'] = allocated
+        self.metrics['bytes_shared'] = shared
+
+    def _write_copies(self, label="Copies"):
+        """Escribir la línea de copias registrada con log_copies, si la hay"""
+        if 'bytes_allocated' in self.metrics:
+            self._write_line(f"  ├─ {label}: output {self.metrics['bytes_allocated'] / 1024 / 1024:.1f} MB newly allocated, "
+                             f"{self.metrics['bytes_shared'] / 1024 / 1024:.1f} MB shared with the input")
+
+    def log_pruned_steps(self, pruned):
+        """Registrar los pasos de reglas eliminados (columnas muertas) y las columnas que habrían creado"""
+        self.metrics['pruned_steps'] = [name for name, _ in pruned]
+        self._write_line(f"  ├─ Pruned steps (dead columns): {len(pruned)}")
+        for name, columns in pruned:
+            self._write_line(f"  │   ├─ {name} -> {', '.join(columns) or '-'}")
+
+    def log_pruned_estimate(self, estimates, rows):
+        """Registrar el tiempo estimado ahorrado por los pasos eliminados (medido fuera de las fases)"""
+        saved = sum(seconds for _, seconds in estimates if seconds is not None)
+        self.metrics['pruned_estimated_seconds'] = saved
+        self._write_line("[PRUNED STEPS] Estimated time saved (sampled outside the timed phases)")
+        for name, seconds in estimates:
+            estimate = f"~{seconds:.3f}s" if seconds is not None else "n/a (input columns not read)"
+            self._write_line(f"  ├─ {name}: {estimate}")
+        self._write_line(f"  └─ Total: ~{saved:.3f}s on {rows:,} rows")
+        self._write_line("")
     
     def log_transformations_end(self):
         """Marcar fin de transformaciones"""
@@ -121,6 +172,7 @@ class AuditLogger:
         self._write_line(f"  ├─ Total transformations: {self.metrics['transformations_count']}")
         self._write_line(f"  ├─ Complexity: {complexity}")
         self._write_line(f"  ├─ Time: {self.metrics['runtime_transformations']:.3f}s")
+        self._write_copies()
         self._write_line(f"  └─ Memory: {mem_mb:.1f} MB")
         self._write_line("")
     
@@ -129,6 +181,11 @@ class AuditLogger:
         self.metrics['writing_start'] = time.time()
         self._write_line("[PHASE] Starting OUTPUT WRITING...")
     
+    def log_writing_detail(self, name, value):
+        """Registrar un detalle de la fase de escritura (workers, throughput, tiempos parciales...)"""
+        self.metrics.setdefault('writing_details', {})[name] = value
+        self._write_line(f"  ├─ {name}: {value}")
+    
     def log_writing_end(self, rows, columns):
         """Marcar fin de escritura de output"""
         if 'writing_start' in self.metrics:
@@ -149,6 +206,72 @@ class AuditLogger:
         self._write_line(f"  └─ Memory: {mem_mb:.1f} MB")
         self._write_line("")
     
+    def log_streaming_start(self, chunk_size):
+        """Marcar inicio del modo streaming (lectura, transformación y escritura por chunks)"""
+        self.metrics['streaming_start'] = time.time()
+        self.metrics['chunk_size'] = chunk_size
+        self.metrics['chunks'] = []
+        self.metrics['chunk_peak_mb'] = 0
+        self._write_line(f"[PHASE] Starting STREAMING (chunk size: {chunk_size:,} rows)...")
+
+    def sample_chunk_memory(self):
+        """Tomar una muestra de memoria dentro del chunk en curso (high-water mark del chunk)"""
+        mem_mb = self.process.memory_info().rss / 1024 / 1024
+        self.metrics['chunk_peak_mb'] = max(self.metrics.get('chunk_peak_mb', 0), mem_mb)
+        self.metrics['memory_peak_mb'] = max(self.metrics['memory_peak_mb'], mem_mb)
+        return mem_mb
+
+    def log_chunk(self, index, rows_in, rows_out, read_time, transform_time, write_time):
+        """Registrar un chunk procesado: filas, tiempos por fase y pico de memoria"""
+        self.sample_chunk_memory()
+        peak_mb = self.metrics['chunk_peak_mb']
+        self.metrics['chunk_peak_mb'] = 0
+
+        self.metrics['chunks'].append({
+            'index': index,
+            'rows_in': rows_in,
+            'rows_out': rows_out,
+            'peak_mb': peak_mb
+        })
+        self.metrics['input_rows'] += rows_in
+        self.metrics['output_rows'] += rows_out
+        self.metrics['runtime_reading'] += read_time
+        self.metrics['runtime_transformations'] += transform_time
+        self.metrics['runtime_writing'] += write_time
+
+        self._write_line(f"  ├─ Chunk {index}: {rows_in:,} rows in → {rows_out:,} rows out | "
+                         f"read {read_time:.3f}s | transform {transform_time:.3f}s | "
+                         f"write {write_time:.3f}s | peak {peak_mb:.1f} MB")
+
+    def log_streaming_end(self, input_columns, output_columns):
+        """Marcar fin del modo streaming"""
+        self.metrics['input_columns'] = input_columns
+        self.metrics['output_columns'] = output_columns
+        self.metrics['transformations_complexity'] = self._calculate_complexity()
+
+        mem_info = self.process.memory_info()
+        mem_mb = mem_info.rss / 1024 / 1024
+        self.memory_samples.append({'phase': 'after_streaming', 'rss_mb': mem_mb, 'vms_mb': mem_info.vms / 1024 / 1024})
+        self.metrics['memory_peak_mb'] = max(self.metrics['memory_peak_mb'], mem_mb)
+
+        chunks = self.metrics['chunks']
+        max_rows = max((c['rows_in'] for c in chunks), default=0)
+        max_peak = max((c['peak_mb'] for c in chunks), default=0)
+        elapsed = time.time() - self.metrics['streaming_start']
+
+        self._write_line(f"[PHASE] STREAMING completed")
+        self._write_line(f"  ├─ Chunks: {len(chunks)}")
+        self._write_line(f"  ├─ Rows read: {self.metrics['input_rows']:,}")
+        self._write_line(f"  ├─ Columns: {input_columns}")
+        self._write_line(f"  ├─ Rows written: {self.metrics['output_rows']:,}")
+        self._write_line(f"  ├─ Columns: {output_columns}")
+        self._write_line(f"  ├─ Largest chunk: {max_rows:,} rows")
+        self._write_line(f"  ├─ Highest chunk peak: {max_peak:.1f} MB")
+        self._write_copies("Copies (first chunk)")
+        self._write_line(f"  ├─ Time: {elapsed:.3f}s")
+        self._write_line(f"  └─ Memory: {mem_mb:.1f} MB")
+        self._write_line("")
+
     def end_audit(self, status='success', error_message=None):
         """Finalizar auditoría"""
         self.metrics['runtime_total'] = time.time() - self.start_time
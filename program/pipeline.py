@@ -2,134 +2,332 @@ import yaml
 import os
 import sys
 import time
-from reader import read_input
-from writer import write_csv, write_rpt
+from reader import read_input, read_input_chunks, read_input_metadata
+from writer import (write_csv, write_rpt, write_parquet, write_arrow, write_outputs, open_output_writers,
+                    CsvStreamWriter, RptStreamWriter, ParquetStreamWriter, ArrowStreamWriter, PartitionedStreamWriter,
+                    apply_column_formats, split_output_ext)
 from logger import Logger
 from audit import AuditLogger
-from transformers.engine import apply_transformations
+from transformers.engine import aggregate_rules, apply_transformations, estimate_pruned_time, required_input_columns
+from transformers.memory import enable_copy_on_write
 
-# 0. logger init
-use_colors = sys.stdout.isatty()
-log = Logger("Pipeline", use_colors=use_colors)
+def inspect_input(input_path, input_file_config, log, audit=None):
+    """Metadatos del input sin parsearlo (filas estimadas, columnas, tamaño); None si no se pueden obtener"""
+    try:
+        metadata = read_input_metadata(input_path, input_file_config)
+    except Exception as e:
+        log.warning(f"Input metadata not available: {e}")
+        return None
+    approx = "" if metadata['rows_exact'] else "~"
+    log.info(f"Input estimate: {approx}{metadata['rows']:,} rows × {len(metadata['columns'])} columns, "
+             f"{metadata['bytes'] / 1024 / 1024:.1f} MB")
+    if audit:
+        audit.log_input_metadata(metadata)
+    return metadata
+
+def main():
+    # 0. logger init
+    use_colors = sys.stdout.isatty()
+    log = Logger("Pipeline", use_colors=use_colors)
 
-start_time = time.time()
-log.info("=== PIPELINE BEGINNING ===")
-script_dir = os.path.dirname(os.path.abspath(__file__))
+    start_time = time.time()
+    log.info("=== PIPELINE BEGINNING ===")
+    script_dir = os.path.dirname(os.path.abspath(__file__))
 
-# 1. load config
-try:
-    config_path = os.path.join(script_dir, "config.yaml")
-    with open(config_path, "r") as f:
-        config = yaml.safe_load(f)
+    # 1. load config
+    try:
+        config_path = os.path.join(script_dir, "config.yaml")
+        with open(config_path, "r") as f:
+            config = yaml.safe_load(f)
     
-    # Verificar si audit está habilitado (después de cargar config)
-    audit_enabled = config.get('enable_audit', True)
-    audit = AuditLogger() if audit_enabled else None
+        # Verificar si audit está habilitado (después de cargar config)
+        audit_enabled = config.get('enable_audit', True)
+        audit = AuditLogger() if audit_enabled else None
     
-    if audit_enabled:
-        log.info("Audit logging: ENABLED")
-        audit.start_audit(config)
-    else:
-        log.info("Audit logging: DISABLED (no performance metrics will be saved)")
-    
-    log.success(f"Setting input file location: {config['input_file']}")
-    if 'input_file_config' in config:
-        input_config = config['input_file_config']
-        log.info(f"Input file type: {input_config.get('type', 'auto')}")
-        if input_config.get('delimiter'):
-            log.info(f"Input file delimiter: \"{input_config.get('delimiter')}\"")
-    else:
-        log.info("Using auto-detect for input file format")
-    
-    log.success(f"Setting tables location: {config['tables_path']}")
-    log.success(f"Setting output file location: {config['output_file']}")
-except Exception as e:
-    log.critical(f"Error during configuration loading: {e} --> PROCESS ENDED")
-    exit()
-
-# 2. input reading
-try:
-    input_file = config["input_file"]
-    if input_file.startswith("input"):
-        input_path = os.path.join(script_dir, "..", input_file)
-    else:
-        input_path = input_file
+        if audit_enabled:
+            log.info("Audit logging: ENABLED")
+            audit.start_audit(config)
+        else:
+            log.info("Audit logging: DISABLED (no performance metrics will be saved)")
     
+        log.success(f"Setting input file location: {config['input_file']}")
+        if 'input_file_config' in config:
+            input_config = config['input_file_config']
+            log.info(f"Input file type: {input_config.get('type', 'auto')}")
+            if input_config.get('delimiter'):
+                log.info(f"Input file delimiter: \"{input_config.get('delimiter')}\"")
+            if input_config.get('schema'):
+                schema = input_config.get('schema')
+                log.info(f"Input file schema: {schema if isinstance(schema, str) else 'custom'}")
+            if input_config.get('engine'):
+                log.info(f"Input file engine: {input_config.get('engine')}")
+            if input_config.get('chunk_size'):
+                log.info(f"Streaming mode: ENABLED ({input_config.get('chunk_size')} rows per chunk)")
+        else:
+            log.info("Using auto-detect for input file format")
+    
+        log.success(f"Setting tables location: {config['tables_path']}")
+        if config.get('rules_spec'):
+            log.info(f"Business rules spec: {config['rules_spec']}")
+        if config.get('copy_on_write'):
+            # pandas Copy-on-Write: renames, selecciones y copias superficiales no duplican datos
+            enable_copy_on_write()
+            log.info("Copy-on-Write mode: ENABLED")
+        log.success(f"Setting output file location: {config['output_file']}")
+        if (config.get('output_file_config') or {}).get('write_workers'):
+            log.info(f"Output formatting workers: {config['output_file_config']['write_workers']}")
+        if (config.get('output_file_config') or {}).get('compression'):
+            log.info(f"Output compression: {config['output_file_config']['compression']}")
+        if (config.get('output_file_config') or {}).get('csv_engine'):
+            log.info(f"Output CSV engine: {config['output_file_config']['csv_engine']}")
+    except Exception as e:
+        log.critical(f"Error during configuration loading: {e} --> PROCESS ENDED")
+        exit()
+
     input_file_config = config.get('input_file_config', None)
+    chunk_size = input_file_config.get('chunk_size') if input_file_config else None
+    output_file_config = config.get('output_file_config') or {}
+    write_workers = output_file_config.get('write_workers', 1)
+    # Opciones de los formatos columnares (.parquet/.feather/.arrow)
+    columnar_options = {key: output_file_config[key] for key in ('compression', 'row_group_size') if key in output_file_config}
+    dictionary_options = {'use_dictionary': output_file_config['use_dictionary']} if 'use_dictionary' in output_file_config else {}
+    # Motor de escritura CSV ('pandas' por defecto, 'pyarrow' más rápido pero no idéntico byte a byte)
+    csv_engine = output_file_config.get('csv_engine', 'pandas')
+    csv_options = {'csv_engine': csv_engine} if 'csv_engine' in output_file_config else {}
+    # Threads de compresión zstd de los outputs de texto comprimidos (.csv.gz, .csv.zst, .rpt.zst)
+    compression_options = {'compression_threads': output_file_config['compression_threads']} if output_file_config.get('compression_threads') else {}
+    # Formato por columna del output (decimales, entero, formato de fecha), común a todos los formatos
+    column_formats = output_file_config.get('column_formats') or {}
+    # Output particionado por columnas clave y/o por máximo de filas por archivo
+    partition_options = {key: output_file_config[key] for key in ('partition_by', 'max_rows_per_file') if output_file_config.get(key)}
+    if partition_options and isinstance(config.get('output_file'), list):
+        log.critical("Partitioned output (partition_by / max_rows_per_file) supports a single output_file --> PROCESS ENDED")
+        exit()
+
+    # Proyección de columnas: solo se leen las columnas que usan las reglas activas
+    projection_enabled = (input_file_config or {}).get('projection', True)
+    try:
+        projected_columns = required_input_columns(config, script_dir) if projection_enabled else None
+    except Exception as e:
+        log.critical(f"Error during rule spec compilation: {e} --> PROCESS ENDED")
+        exit()
+
+    # Streaming aplica las reglas chunk a chunk: las que agregan sobre filas requieren aceptarlo explícitamente
+    if chunk_size:
+        try:
+            aggregates = aggregate_rules(config, script_dir)
+        except Exception as e:
+            log.critical(f"Error during rule spec compilation: {e} --> PROCESS ENDED")
+            exit()
+        if aggregates and not input_file_config.get('allow_chunked_aggregates'):
+            log.critical(f"Streaming mode: {len(aggregates)} business rule(s) aggregate across rows and would be computed "
+                         f"per chunk ({'; '.join(aggregates[:3])}{'; ...' if len(aggregates) > 3 else ''}). "
+                         "Remove 'chunk_size' or set 'allow_chunked_aggregates: true' --> PROCESS ENDED")
+            exit()
+
+    # 2-4. streaming mode: lectura, transformación y escritura por chunks
+    if chunk_size:
+        try:
+            input_file = config["input_file"]
+            if input_file.startswith("input"):
+                input_path = os.path.join(script_dir, "..", input_file)
+            else:
+                input_path = input_file
+
+            # output_file admite una lista de targets: se escriben todos en una sola pasada
+            output_targets = config["output_file"] if isinstance(config["output_file"], list) else [config["output_file"]]
+            output_path = "../" + output_targets[0]
+            output_file = os.path.basename(output_path)
+            ext = split_output_ext(output_path)[0]
+
+            if partition_options:
+                writer = PartitionedStreamWriter(output_path, **partition_options, audit=audit, **columnar_options, **dictionary_options, **csv_options, **compression_options)
+                output_file = f"{os.path.basename(writer.root)}/*{writer.suffix}"
+            elif len(output_targets) > 1:
+                output_paths = ["../" + target for target in output_targets]
+                output_file = ", ".join(os.path.basename(path) for path in output_paths)
+                writer = open_output_writers(output_paths, write_workers, audit, **columnar_options, **dictionary_options, **csv_options, **compression_options)
+            elif ext == ".rpt":
+                writer = RptStreamWriter(output_path, workers=write_workers, audit=audit, **compression_options)
+            elif ext == ".csv":
+                writer = CsvStreamWriter(output_path, workers=write_workers, audit=audit, engine=csv_engine, **compression_options)
+            elif ext == ".parquet":
+                writer = ParquetStreamWriter(output_path, **columnar_options, **dictionary_options)
+            elif ext in (".feather", ".arrow"):
+                writer = ArrowStreamWriter(output_path, **columnar_options)
+            else:
+                output_path = output_path + ".csv"
+                log.warning(f"'{ext}' extension is not supported; the output file will use 'csv' format in: {output_path}")
+                output_file = os.path.basename(output_path)
+                writer = CsvStreamWriter(output_path, workers=write_workers, audit=audit, engine=csv_engine, **compression_options)
+
+            # Solo con 'allow_chunked_aggregates': las agregaciones (groupby, cuantiles, rankings) se calculan por chunk
+            if aggregates:
+                log.warning("Streaming mode: business rules are applied chunk by chunk; group-level statistics are computed per chunk")
+
+            if audit:
+                audit.log_streaming_start(int(chunk_size))
+
+            metadata = inspect_input(input_path, input_file_config, log, audit)
+            # Total de chunks estimado para el progreso
+            total_chunks = -(-metadata['rows'] // int(chunk_size)) if metadata else None
+
+            total_rows_in = total_rows_out = 0
+            input_columns = output_columns = 0
+            with writer:
+                read_start = time.time()
+                for index, chunk in enumerate(read_input_chunks(input_path, file_config=input_file_config, audit=audit, columns=projected_columns), start=1):
+                    read_time = time.time() - read_start
+                    if audit:
+                        audit.sample_chunk_memory()
+
+                    # El detalle de transformaciones se registra en el audit solo para el primer chunk
+                    transform_start = time.time()
+                    df = apply_transformations(chunk, config, log, script_dir, audit if index == 1 else None)
+                    transform_time = time.time() - transform_start
+                    if audit:
+                        audit.sample_chunk_memory()
+
+                    write_start = time.time()
+                    df = apply_column_formats(df, column_formats)
+                    writer.write(df)
+                    write_time = time.time() - write_start
+
+                    total_rows_in += len(chunk)
+                    total_rows_out += len(df)
+                    input_columns, output_columns = len(chunk.columns), len(df.columns)
+                    if audit:
+                        audit.log_chunk(index, len(chunk), len(df), read_time, transform_time, write_time)
+                    if index == 1:
+                        estimate_pruned_time(chunk, config, script_dir, audit)
+                    progress = f"/~{max(total_chunks, index)}" if total_chunks else ""
+                    log.info(f"Chunk {index}{progress}: {len(chunk)} lines processed ({total_rows_in} total)")
+
+                    del chunk, df
+                    read_start = time.time()
+
+            if audit:
+                audit.log_streaming_end(input_columns, output_columns)
+
+            log.success(f"{total_rows_in} lines read")
+            log.success(f"{output_file} file successfully saved")
+        except Exception as e:
+            log.critical(f"Error during streaming execution: {e} --> PROCESS ENDED")
+            if audit:
+                audit.end_audit(status='failed', error_message=str(e))
+            exit()
+
+    else:
+        # 2. input reading
+        try:
+            input_file = config["input_file"]
+            if input_file.startswith("input"):
+                input_path = os.path.join(script_dir, "..", input_file)
+            else:
+                input_path = input_file
     
-    if audit:
-        audit.log_reading_start()
+            input_file_config = config.get('input_file_config', None)
     
-    df = read_input(input_path, file_config=input_file_config)
+            if audit:
+                audit.log_reading_start()
     
-    if audit:
-        audit.log_reading_end(len(df), len(df.columns))
+            inspect_input(input_path, input_file_config, log, audit)
     
-    log.success(f"{len(df)} lines read")
+            df = read_input(input_path, file_config=input_file_config, audit=audit, columns=projected_columns)
     
-    if input_file_config:
-        file_type = input_file_config.get('type', 'auto')
-        if file_type == 'csv' and input_file_config.get('delimiter'):
-            log.info(f"File read as CSV with delimiter: \"{input_file_config.get('delimiter')}\"")
-        else:
-            log.info(f"File read as: {file_type}")
-    else:
-        log.info("File read using auto-detection")
-except Exception as e:
-    log.critical(f"Error during input reading: {e} --> PROCESS ENDED ")
-    if audit:
-        audit.end_audit(status='failed', error_message=str(e))
-    exit()
+            if audit:
+                audit.log_reading_end(len(df), len(df.columns))
+    
+            log.success(f"{len(df)} lines read")
+    
+            if input_file_config:
+                file_type = input_file_config.get('type', 'auto')
+                if file_type == 'csv' and input_file_config.get('delimiter'):
+                    log.info(f"File read as CSV with delimiter: \"{input_file_config.get('delimiter')}\"")
+                else:
+                    log.info(f"File read as: {file_type}")
+            else:
+                log.info("File read using auto-detection")
+        except Exception as e:
+            log.critical(f"Error during input reading: {e} --> PROCESS ENDED ")
+            if audit:
+                audit.end_audit(status='failed', error_message=str(e))
+            exit()
 
-# 3. applying transformation
-try:
-    if audit:
-        audit.log_transformations_start()
+        # 3. applying transformation
+        try:
+            if audit:
+                audit.log_transformations_start()
     
-    df = apply_transformations(df, config, log, script_dir, audit)
+            transformed = apply_transformations(df, config, log, script_dir, audit)
     
-    if audit:
-        audit.log_transformations_end()
-except Exception as e:
-    log.critical(f"Error during transformations: {e} --> PROCESS ENDED")
-    if audit:
-        audit.end_audit(status='failed', error_message=str(e))
-    exit()
+            if audit:
+                audit.log_transformations_end()
+            estimate_pruned_time(df, config, script_dir, audit)
+            df = transformed
+            del transformed
+        except Exception as e:
+            log.critical(f"Error during transformations: {e} --> PROCESS ENDED")
+            if audit:
+                audit.end_audit(status='failed', error_message=str(e))
+            exit()
 
-# 4. printing output
-try:
-    output_path = "../" + config["output_file"]
-    output_file = os.path.basename(output_path)
-    ext = os.path.splitext(output_path)[-1].lower()
+        # 4. printing output
+        try:
+            output_targets = config["output_file"] if isinstance(config["output_file"], list) else [config["output_file"]]
+            output_path = "../" + output_targets[0]
+            output_file = os.path.basename(output_path)
+            ext = split_output_ext(output_path)[0]
     
-    if audit:
-        audit.log_writing_start()
-    
-    if ext == ".rpt":
-        write_rpt(df, output_path)
-        log.success(f"{output_file} file successfully saved")
-    elif ext == ".csv":
-        write_csv(df, output_path)
-        log.success(f"{output_file} file successfully saved")
-    else:
-        warn_path = output_path + ".csv"
-        log.warning(f"'{ext}' extension is not supported; the output file will use 'csv' format in: {warn_path}")
-        df.to_csv(warn_path, index=False)
-        log.success(f"{os.path.basename(warn_path)} .csv file successfully saved")
+            if audit:
+                audit.log_writing_start()
     
+            df = apply_column_formats(df, column_formats)
+    
+            if partition_options:
+                with PartitionedStreamWriter(output_path, **partition_options, audit=audit, **columnar_options, **dictionary_options, **csv_options, **compression_options) as writer:
+                    writer.write(df)
+                log.success(f"{os.path.basename(writer.root)}/ partitions successfully saved (manifest: {os.path.basename(writer.manifest_path)})")
+            elif len(output_targets) > 1:
+                output_paths = ["../" + target for target in output_targets]
+                write_outputs(df, output_paths, write_workers, audit, **columnar_options, **dictionary_options, **csv_options, **compression_options)
+                log.success(f"{', '.join(os.path.basename(path) for path in output_paths)} files successfully saved")
+            elif ext == ".rpt":
+                write_rpt(df, output_path, workers=write_workers, audit=audit, **compression_options)
+                log.success(f"{output_file} file successfully saved")
+            elif ext == ".csv":
+                write_csv(df, output_path, workers=write_workers, audit=audit, engine=csv_engine, **compression_options)
+                log.success(f"{output_file} file successfully saved")
+            elif ext == ".parquet":
+                write_parquet(df, output_path, **columnar_options, **dictionary_options)
+                log.success(f"{output_file} file successfully saved")
+            elif ext in (".feather", ".arrow"):
+                write_arrow(df, output_path, **columnar_options, **dictionary_options)
+                log.success(f"{output_file} file successfully saved")
+            else:
+                warn_path = output_path + ".csv"
+                log.warning(f"'{ext}' extension is not supported; the output file will use 'csv' format in: {warn_path}")
+                df.to_csv(warn_path, index=False)
+                log.success(f"{os.path.basename(warn_path)} .csv file successfully saved")
+    
+            if audit:
+                audit.log_writing_end(len(df), len(df.columns))
+        except Exception as e:
+            log.critical(f"Error during output saving: {e}")
+            if audit:
+                audit.end_audit(status='failed', error_message=str(e))
+            exit()
+
+    # 999. logger ends
+    runtime = time.time() - start_time
+    log.info(f"Pipeline runtime: {runtime:.2f} seconds")
+    log.info("=== PIPELINE ENDING ===")
+
+    # Finalizar auditoría
     if audit:
-        audit.log_writing_end(len(df), len(df.columns))
-except Exception as e:
-    log.critical(f"Error during output saving: {e}")
-    if audit:
-        audit.end_audit(status='failed', error_message=str(e))
-    exit()
+        audit.end_audit(status='success')
 
-# 999. logger ends
-runtime = time.time() - start_time
-log.info(f"Pipeline runtime: {runtime:.2f} seconds")
-log.info("=== PIPELINE ENDING ===")
 
-# Finalizar auditoría
-if audit:
-    audit.end_audit(status='success')
\ No newline at end of file
+# Guard necesario para los process pools del reader (spawn en Windows re-importa este módulo)
+if __name__ == "__main__":
+    main()
@@ -1,44 +1,1121 @@
 import pandas as pd
+import numpy as np
+from pandas.api.types import union_categoricals
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import glob
+import hashlib
+import io
 import os
+import time
 
-def read_input(path, file_config=None):
+# Esquema por defecto del layout de seguros generado por inputs/csv_generator.py
+INSURANCE_SCHEMA = {
+    'ID': 'int32',
+    'tipo_producto': 'category',
+    'temp_idx': 'float32',
+    'Sex': 'category',
+    'inception_date': 'date',
+    'birth_date': 'date',
+    'sum_insured': 'int32',
+    'tariff_grp': 'int8',
+    'country': 'category',
+    'reins_name': 'category',
+    'annual_prem': 'float64',
+    'prem_frecuency': 'category',
+    'comission_precentage': 'float64'
+}
+
+DEFAULT_DATE_FORMAT = '%d/%m/%Y'
+
+# Extensiones de compresión soportadas para inputs CSV
+COMPRESSION_EXTENSIONS = {
+    '.gz': 'gzip',
+    '.bz2': 'bz2',
+    '.xz': 'xz',
+    '.zst': 'zstd'
+}
+
+# Bytes leídos al inicio de un CSV para estimar su número de filas
+METADATA_SAMPLE_BYTES = 1024 * 1024
+
+# Throughput orientativo de lectura (MB/s) para estimar el coste de parseo de un input
+READ_THROUGHPUT_MB_S = {
+    'csv': 50,
+    'rpt': 50,
+    'parquet': 400,
+    'feather': 2000,
+    'excel': 2
+}
+
+def _compression(path):
+    """Códec de compresión según la extensión del archivo (None si no está comprimido)"""
+    return COMPRESSION_EXTENSIONS.get(os.path.splitext(path)[-1].lower())
+
+def detect_file_type(path):
     """
-    Lee un archivo de input usando la configuración especificada
-    
-    Args:
-        path (str): Ruta al archivo
-        file_config (dict, optional): Configuración del archivo con 'type' y 'delimiter'
-    
+    Detectar el tipo de archivo por extensión ('.csv.gz', '.rpt.zst'... cuentan como csv/rpt)
+
     Returns:
-        pandas.DataFrame: DataFrame con los datos leídos
+        str: 'excel', 'csv', 'rpt', 'parquet' o 'feather'
     """
-    
-    # Si no hay configuración específica, usar auto-detect por extensión
-    if file_config is None or file_config.get('type') == 'auto':
-        ext = os.path.splitext(path)[-1].lower()
-        
-        if ext in [".xlsx", ".xls"]:
-            return pd.read_excel(path)
-        elif ext == ".csv":
-            return pd.read_csv(path)
-        elif ext == ".parquet":
-            return pd.read_parquet(path)
+    base = os.path.splitext(path)[0] if _compression(path) else path
+    ext = os.path.splitext(base)[-1].lower()
+
+    if _compression(path) and ext not in (".csv", ".rpt"):
+        raise ValueError(f"Unsupported compressed file format: {ext}{os.path.splitext(path)[-1]}")
+
+    if ext in [".xlsx", ".xls"]:
+        return "excel"
+    elif ext == ".csv":
+        return "csv"
+    elif ext == ".rpt":
+        return "rpt"
+    elif ext == ".parquet":
+        return "parquet"
+    elif ext in [".feather", ".arrow"]:
+        return "feather"
+    else:
+        raise ValueError(f"Unsupported file format: {ext}")
+
+def _import_zstandard():
+    """Importar zstandard (opcional): sin él, error que indica el paquete que falta"""
+    try:
+        import zstandard
+    except ImportError as e:
+        raise ImportError("Reading .zst inputs requires the optional 'zstandard' package "
+                          "(pip install zstandard)") from e
+    return zstandard
+
+class _DecompressedStream(io.RawIOBase):
+    """Stream de lectura que descomprime al vuelo y contabiliza bytes y tiempo de descompresión"""
+
+    def __init__(self, path, compression):
+        self.compression = compression
+        self.compressed_bytes = os.path.getsize(path)
+        self.uncompressed_bytes = 0
+        self.seconds = 0.0
+        if compression == 'zstd':
+            zstandard = _import_zstandard()
+        self._raw = open(path, "rb")
+
+        if compression == 'gzip':
+            import gzip
+            self._stream = gzip.GzipFile(fileobj=self._raw)
+        elif compression == 'bz2':
+            import bz2
+            self._stream = bz2.BZ2File(self._raw)
+        elif compression == 'xz':
+            import lzma
+            self._stream = lzma.LZMAFile(self._raw)
         else:
-            raise ValueError(f"Unsupported file format: {ext}")
-    
-    # Usar configuración específica
+            self._stream = zstandard.ZstdDecompressor().stream_reader(self._raw)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        start = time.perf_counter()
+        data = self._stream.read(len(buffer))
+        self.seconds += time.perf_counter() - start
+        size = len(data)
+        buffer[:size] = data
+        self.uncompressed_bytes += size
+        return size
+
+    def close(self):
+        if not self.closed:
+            self._stream.close()
+            self._raw.close()
+        super().close()
+
+def _open_csv_source(path):
+    """
+    Abrir el origen de un CSV: la ruta tal cual, o un stream descomprimido si está comprimido
+
+    Returns:
+        tuple: (origen para pd.read_csv, _DecompressedStream o None)
+    """
+    compression = _compression(path)
+    if compression is None:
+        return path, None
+    stream = _DecompressedStream(path, compression)
+    return io.BufferedReader(stream, buffer_size=1024 * 1024), stream
+
+def _log_decompression(audit, stream):
+    """Registrar en el audit bytes comprimidos/descomprimidos y throughput de descompresión"""
+    if not audit or stream is None:
+        return
+    compressed_mb = stream.compressed_bytes / 1024 / 1024
+    uncompressed_mb = stream.uncompressed_bytes / 1024 / 1024
+    ratio = stream.uncompressed_bytes / max(1, stream.compressed_bytes)
+    throughput = uncompressed_mb / stream.seconds if stream.seconds > 0 else 0
+    audit.log_reading_detail(
+        "Compression",
+        f"{stream.compression} | {compressed_mb:.1f} MB compressed → {uncompressed_mb:.1f} MB uncompressed "
+        f"(ratio {ratio:.1f}x) | decompression {throughput:.1f} MB/s"
+    )
+
+def _resolve_file_type(path, file_config=None):
+    """Determinar el tipo de archivo a partir de la configuración o de la extensión"""
+    if file_config is None or file_config.get('type', 'auto') == 'auto':
+        return detect_file_type(path)
+
     file_type = file_config.get('type')
-    
+    if file_type == 'arrow':
+        return 'feather'  # Arrow IPC y Feather V2 son el mismo formato
+    if file_type not in ('excel', 'csv', 'rpt', 'parquet', 'feather'):
+        raise ValueError(f"Unsupported file type in config: {file_type}")
+    return file_type
+
+def _csv_delimiter(file_config=None):
+    """Delimitador configurado (solo aplica con type: csv; auto-detect usa ',')"""
+    if file_config and file_config.get('type') == 'csv':
+        return file_config.get('delimiter', ',')
+    return ','
+
+def _resolve_schema(file_config=None):
+    """
+    Resolver el esquema configurado ('schema' en input_file_config)
+
+    'schema' puede ser 'insurance' (INSURANCE_SCHEMA) o un dict columna -> dtype;
+    las columnas declaradas como 'date' se parsean con 'date_format'.
+
+    Returns:
+        tuple: (dict columna -> dtype, lista de columnas fecha, formato de fecha)
+    """
+    schema = (file_config or {}).get('schema')
+    if not schema:
+        return {}, [], None
+
+    if schema == 'insurance':
+        schema = INSURANCE_SCHEMA
+    elif not isinstance(schema, dict):
+        raise ValueError(f"Unsupported schema in config: {schema}")
+
+    dtypes = {col: dtype for col, dtype in schema.items() if dtype != 'date'}
+    date_cols = [col for col, dtype in schema.items() if dtype == 'date']
+    return dtypes, date_cols, file_config.get('date_format', DEFAULT_DATE_FORMAT)
+
+def _apply_schema(df, file_config=None):
+    """Aplicar el esquema a un DataFrame ya leído (Excel y Parquet)"""
+    dtypes, date_cols, date_format = _resolve_schema(file_config)
+    dtypes = {col: dtype for col, dtype in dtypes.items() if col in df.columns}
+    if dtypes:
+        df = df.astype(dtypes)
+    for col in date_cols:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], format=date_format)
+    return df
+
+def _log_schema(audit, file_config=None):
+    """Registrar en el audit el esquema aplicado en la lectura"""
+    schema = (file_config or {}).get('schema')
+    if audit and schema:
+        name = schema if isinstance(schema, str) else "custom"
+        columns = len(INSURANCE_SCHEMA) if schema == 'insurance' else len(schema)
+        audit.log_reading_detail("Schema", f"{name} ({columns} typed columns)")
+
+def _select_columns(available, columns=None):
+    """
+    Resolver la proyección de columnas a leer
+
+    Returns:
+        list: columnas a leer en el orden del archivo, o None para leerlas todas
+    """
+    if columns is None:
+        return None
+    wanted = set(columns)
+    selected = [col for col in available if col in wanted]
+    if not selected or len(selected) == len(available):
+        return None
+    return selected
+
+def _log_projection(audit, available, selected):
+    """Registrar en el audit las columnas leídas y las descartadas"""
+    if audit and selected is not None:
+        skipped = [col for col in available if col not in set(selected)]
+        audit.log_reading_detail("Columns read", f"{len(selected)} of {len(available)} (skipped: {', '.join(map(str, skipped))})")
+
+def _arrow_dtype(dtype):
+    """Dtype Arrow equivalente a un dtype numérico numpy del esquema ('int32' -> int32[pyarrow])"""
+    try:
+        numpy_dtype = np.dtype(dtype)
+    except TypeError:
+        return dtype  # 'category' y demás dtypes de pandas
+    if numpy_dtype.kind not in 'iuf':
+        return dtype
+    import pyarrow as pa
+    return pd.ArrowDtype(pa.from_numpy_dtype(numpy_dtype))
+
+def _csv_kwargs(path, file_config=None, columns=None, audit=None):
+    """Argumentos de pd.read_csv comunes a la lectura completa y por chunks"""
+    kwargs = {'sep': _csv_delimiter(file_config)}
+    if (file_config or {}).get('dtype_backend'):
+        # 'pyarrow' mantiene los dtypes de Arrow en lugar de convertirlos a numpy
+        kwargs['dtype_backend'] = file_config['dtype_backend']
+
+    dtypes, date_cols, date_format = _resolve_schema(file_config)
+    if dtypes or date_cols or columns is not None:
+        # Solo se declaran las columnas presentes en el archivo (se lee únicamente el header)
+        available = list(pd.read_csv(path, sep=kwargs['sep'], nrows=0).columns)
+        usecols = _select_columns(available, columns)
+        _log_projection(audit, available, usecols)
+        if usecols is not None:
+            kwargs['usecols'] = usecols
+        present = set(usecols if usecols is not None else available)
+
+        kwargs['dtype'] = {col: dtype for col, dtype in dtypes.items() if col in present}
+        if kwargs.get('dtype_backend') == 'pyarrow':
+            # Con el backend Arrow los tipos numéricos se declaran como Arrow: el motor C
+            # leería como float64 los enteros declarados con dtypes numpy
+            kwargs['dtype'] = {col: _arrow_dtype(dtype) for col, dtype in kwargs['dtype'].items()}
+        date_cols = [col for col in date_cols if col in present]
+        if date_cols:
+            kwargs['parse_dates'] = date_cols
+            kwargs['date_format'] = date_format
+    return kwargs
+
+def _excel_sidecar_path(path, sheet_name=0):
+    """Ruta del sidecar Feather de un Excel: la clave incluye ruta, tamaño, mtime y hoja"""
+    stat = os.stat(path)
+    abs_path = os.path.abspath(path)
+    key = f"{abs_path}|{stat.st_size}|{stat.st_mtime_ns}|{sheet_name!r}"
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+    directory, name = os.path.split(abs_path)
+    return os.path.join(directory, f".{name}.{digest}.feather")
+
+def _remove_stale_sidecars(path, keep):
+    """Eliminar sidecars de versiones anteriores del mismo Excel"""
+    directory, name = os.path.split(os.path.abspath(path))
+    for sidecar in glob.glob(os.path.join(glob.escape(directory), f".{glob.escape(name)}.*.feather")):
+        if sidecar != keep:
+            try:
+                os.remove(sidecar)
+            except OSError:
+                pass
+
+def read_excel_cached(path, sheet_name=0, columns=None, audit=None):
+    """
+    Lee un Excel usando un sidecar Feather como caché binaria
+
+    La primera lectura parsea el workbook y guarda la hoja completa en un archivo
+    '.<nombre>.<hash>.feather' junto al Excel; las siguientes cargan el sidecar.
+    Si el workbook cambia (tamaño o mtime) el hash cambia y el sidecar se regenera.
+
+    Args:
+        path (str): Ruta al Excel
+        sheet_name (str|int): Hoja a leer
+        columns (iterable, optional): Columnas a cargar (None = todas)
+        audit (AuditLogger, optional): Audit donde registrar hit/miss de la caché
+
+    Returns:
+        pandas.DataFrame: DataFrame con los datos de la hoja
+    """
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return _read_excel_sheet(path, sheet_name, columns, audit)
+
+    sidecar = _excel_sidecar_path(path, sheet_name)
+
+    if os.path.exists(sidecar):
+        df = read_feather_mapped(sidecar, columns, audit)
+        if audit:
+            audit.log_reading_detail("Excel cache", f"hit ({os.path.basename(sidecar)})")
+        return df
+
+    # Miss: se parsea la hoja completa para que el sidecar sirva a cualquier proyección
+    df = pd.read_excel(path, sheet_name=sheet_name)
+    status = "miss, sidecar written"
+    try:
+        tmp_path = sidecar + ".tmp"
+        df.to_feather(tmp_path)
+        os.replace(tmp_path, sidecar)
+        _remove_stale_sidecars(path, keep=sidecar)
+    except Exception as e:
+        # Directorio de solo lectura o columnas no serializables en Arrow: se sigue sin caché
+        status = f"miss, sidecar not written ({e})"
+        if os.path.exists(sidecar + ".tmp"):
+            os.remove(sidecar + ".tmp")
+    if audit:
+        audit.log_reading_detail("Excel cache", status)
+
+    if columns is not None:
+        selected = _select_columns(list(df.columns), columns)
+        _log_projection(audit, list(df.columns), selected)
+        if selected is not None:
+            df = df[selected]
+    return df
+
+def _read_excel_sheet(path, sheet_name=0, columns=None, audit=None):
+    """Leer un Excel sin caché, descartando en el parseo las columnas fuera de la proyección"""
+    if columns is None:
+        return pd.read_excel(path, sheet_name=sheet_name)
+    wanted = set(columns)
+    df = pd.read_excel(path, sheet_name=sheet_name, usecols=lambda col: col in wanted)
+    if audit:
+        audit.log_reading_detail("Columns read", f"{len(df.columns)} (projected)")
+    return df
+
+def _read_excel(path, file_config=None, columns=None, audit=None):
+    """Leer un Excel con la hoja configurada, usando el sidecar salvo 'excel_cache: false'"""
+    file_config = file_config or {}
+    sheet_name = file_config.get('sheet_name', 0)
+    if file_config.get('excel_cache', True):
+        return read_excel_cached(path, sheet_name, columns, audit)
+    return _read_excel_sheet(path, sheet_name, columns, audit)
+
+def _parquet_columns(path, columns=None, audit=None):
+    """Columnas a leer de un Parquet según la proyección (se lee solo el schema del footer)"""
+    if columns is None:
+        return None
+    import pyarrow.parquet as pq
+    available = pq.read_schema(path).names
+    selected = _select_columns(available, columns)
+    _log_projection(audit, available, selected)
+    return selected
+
+def _open_arrow_table(path, columns=None, audit=None):
+    """
+    Abrir un archivo Arrow IPC/Feather V2 memory-mapped (formato file o stream)
+
+    Returns:
+        tuple: (pyarrow.Table con buffers sobre el mapeo, bytes asignados por Arrow al leer)
+    """
+    import pyarrow as pa
+
+    source = pa.memory_map(path)
+    allocated_before = pa.total_allocated_bytes()
+    try:
+        reader = pa.ipc.open_file(source)
+    except pa.ArrowInvalid:
+        # '.arrow' escrito en formato stream (sin footer)
+        source.seek(0)
+        reader = pa.ipc.open_stream(source)
+
+    available = reader.schema.names
+    selected = None
+    if columns is not None:
+        selected = _select_columns(available, columns)
+        _log_projection(audit, available, selected)
+
+    table = reader.read_all()
+    if selected is not None:
+        table = table.select(selected)
+    # Sin compresión IPC los buffers apuntan al mapeo y Arrow no asigna memoria
+    return table, pa.total_allocated_bytes() - allocated_before
+
+def _zero_copy_columns(table, allocated):
+    """Columnas que to_pandas puede exponer sin copia: numéricas, sin nulos y en un solo bloque"""
+    if allocated:
+        return 0  # Buffers descomprimidos en memoria: ya no son zero-copy sobre el archivo
+    import pyarrow.types as pat
+    return sum(
+        1 for column in table.columns
+        if (pat.is_integer(column.type) or pat.is_floating(column.type))
+        and column.null_count == 0 and column.num_chunks <= 1
+    )
+
+def read_feather_mapped(path, columns=None, audit=None):
+    """
+    Lee un archivo Feather/Arrow IPC memory-mapped, sin copiar los datos cuando es posible
+
+    Las columnas numéricas sin nulos de un archivo sin compresión se exponen en pandas
+    directamente sobre el mapeo (se cargan desde la page cache al accederlas); el
+    resto de columnas se convierte con copia.
+
+    Args:
+        path (str): Ruta al archivo .feather/.arrow
+        columns (iterable, optional): Columnas a cargar (None = todas)
+        audit (AuditLogger, optional): Audit donde registrar el mapeo
+
+    Returns:
+        pandas.DataFrame: DataFrame con los datos del archivo
+    """
+    table, allocated = _open_arrow_table(path, columns, audit)
+    df = table.to_pandas(split_blocks=True)
+    if audit:
+        audit.log_reading_detail(
+            "Memory map",
+            f"{os.path.getsize(path) / 1024 / 1024:.1f} MB mapped, "
+            f"{_zero_copy_columns(table, allocated)} of {table.num_columns} columns zero-copy"
+        )
+    return df
+
+# Tipos de variable del header VARIABLE_TYPES de un .rpt -> dtype de lectura ('T<ancho>' es texto)
+RPT_DTYPES = {
+    'I': 'int64',
+    'N': 'float64'
+}
+RPT_FOOTER = b"##END##"
+
+def _rpt_header(handle):
+    """
+    Leer las dos líneas de header de un .rpt (VARIABLE_TYPES y !1)
+
+    Returns:
+        tuple: (nombres de columna, tipos de variable)
+    """
+    types_line = handle.readline().decode("utf-8").rstrip("\r\n").split(",")
+    names_line = handle.readline().decode("utf-8").rstrip("\r\n").split(",")
+    if types_line[0] != "VARIABLE_TYPES" or names_line[0] != "!1":
+        raise ValueError("Not an .rpt file: missing VARIABLE_TYPES / !1 header")
+    return names_line[1:], types_line[1:]
+
+def _rpt_dtypes(names, kinds, text_dtype='object', nullable_int=False):
+    """dtypes de lectura según VARIABLE_TYPES; el tipo 'NA' (sin determinar) se deja a la inferencia de pandas"""
+    dtypes = {}
+    for name, kind in zip(names, kinds):
+        if kind == 'I':
+            dtypes[name] = 'Int64' if nullable_int else RPT_DTYPES['I']
+        elif kind in RPT_DTYPES:
+            dtypes[name] = RPT_DTYPES[kind]
+        elif kind.startswith('T'):
+            dtypes[name] = text_dtype
+    return dtypes
+
+class _RptBodyStream(io.RawIOBase):
+    """Stream de lectura de las filas de un .rpt: recorta el footer a nivel de bytes, sin procesar líneas"""
+
+    # Bytes retenidos al final de cada lectura: el footer solo se identifica al llegar al fin de archivo
+    _TAIL = 64
+
+    def __init__(self, handle):
+        self._handle = handle
+        self._pending = bytearray()
+        self._eof = False
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self._eof and len(self._pending) <= self._TAIL:
+            data = self._handle.read(max(len(buffer), 1024 * 1024))
+            if data:
+                self._pending += data
+                continue
+            self._eof = True
+            body = bytes(self._pending).rstrip(b"\r\n")
+            if body.endswith(RPT_FOOTER):
+                body = body[:-len(RPT_FOOTER)].rstrip(b"\r\n")
+            self._pending = bytearray(body + b"\n" if body else b"")
+
+        available = len(self._pending) if self._eof else len(self._pending) - self._TAIL
+        size = min(len(buffer), available)
+        buffer[:size] = self._pending[:size]
+        del self._pending[:size]
+        return size
+
+    def close(self):
+        if not self.closed:
+            self._handle.close()
+        super().close()
+
+def _open_rpt(path):
+    """
+    Abrir un .rpt (también .rpt.gz/.rpt.zst) y leer su header
+
+    Returns:
+        tuple: (nombres, tipos, stream de las filas, _DecompressedStream o None)
+    """
+    if _compression(path) is None:
+        handle, stream = open(path, "rb", buffering=1024 * 1024), None
+    else:
+        handle, stream = _open_csv_source(path)
+    try:
+        names, kinds = _rpt_header(handle)
+    except Exception:
+        handle.close()
+        raise
+    body = io.BufferedReader(_RptBodyStream(handle), buffer_size=1024 * 1024)
+    return names, kinds, body, stream
+
+def _rpt_csv_kwargs(names, kinds, columns=None, text_dtype='object', nullable_int=False):
+    """Argumentos de pd.read_csv para las filas de un .rpt (la columna '*' del prefijo no se parsea)"""
+    usecols = _select_columns(names, columns) or names
+    dtypes = _rpt_dtypes(names, kinds, text_dtype, nullable_int)
+    return {
+        'header': None,
+        'names': ['*'] + names,
+        'usecols': usecols,
+        'dtype': {col: dtypes[col] for col in usecols if col in dtypes},
+        'engine': 'c'
+    }
+
+def _empty_rpt_frame(kwargs):
+    """DataFrame vacío con las columnas y dtypes de un .rpt sin filas"""
+    return pd.DataFrame({col: pd.Series(dtype=kwargs['dtype'].get(col, 'object')) for col in kwargs['usecols']})
+
+def _read_rpt_frame(path, columns=None, text_dtype='object', audit=None, nullable_int=False):
+    names, kinds, body, stream = _open_rpt(path)
+    kwargs = _rpt_csv_kwargs(names, kinds, columns, text_dtype, nullable_int)
+    try:
+        df = pd.read_csv(body, **kwargs)
+    except pd.errors.EmptyDataError:
+        df = _empty_rpt_frame(kwargs)
+    except ValueError:
+        if nullable_int or 'I' not in kinds:
+            raise
+        # Enteros con nulos (Int64 nullable al escribir): se releen como Int64
+        body.close()
+        return _read_rpt_frame(path, columns, text_dtype, audit, nullable_int=True)
+    finally:
+        body.close()
+    if nullable_int:
+        # Solo quedan como Int64 las columnas que tienen nulos
+        complete = [col for col, dtype in kwargs['dtype'].items() if dtype == 'Int64' and not df[col].hasnans]
+        df = df.astype({col: RPT_DTYPES['I'] for col in complete})
+    _log_rpt(audit, names, kinds, kwargs, stream)
+    return df
+
+def _read_rpt_chunks(path, columns, chunk_size, text_dtype='object', audit=None):
+    rows = 0
+    nullable_int = False
+    while True:
+        names, kinds, body, stream = _open_rpt(path)
+        kwargs = _rpt_csv_kwargs(names, kinds, columns, text_dtype, nullable_int)
+        try:
+            # Tras un reintento se saltan las filas ya entregadas (el índice continúa donde quedó)
+            skipped = rows
+            with pd.read_csv(body, chunksize=chunk_size, skiprows=skipped, **kwargs) as reader:
+                for chunk in reader:
+                    if skipped:
+                        chunk.index = chunk.index + skipped
+                    rows += len(chunk)
+                    yield chunk
+            break
+        except pd.errors.EmptyDataError:
+            if not rows:
+                yield _empty_rpt_frame(kwargs)
+            break
+        except ValueError:
+            if nullable_int or 'I' not in kinds:
+                raise
+            nullable_int = True
+        finally:
+            body.close()
+    _log_rpt(audit, names, kinds, kwargs, stream)
+
+def _log_rpt(audit, names, kinds, kwargs, stream):
+    """Registrar en el audit los tipos leídos del header y la proyección de columnas"""
+    if not audit:
+        return
+    typed = sum(1 for kind in kinds if kind == 'I' or kind == 'N' or kind.startswith('T'))
+    audit.log_reading_detail("RPT header", f"{typed} of {len(names)} columns typed from VARIABLE_TYPES")
+    _log_projection(audit, names, kwargs['usecols'] if len(kwargs['usecols']) < len(names) else None)
+    _log_decompression(audit, stream)
+
+def read_rpt(path, columns=None, chunk_size=None, text_dtype='object', audit=None):
+    """
+    Lee un .rpt escrito por writer.write_rpt (también .rpt.gz/.rpt.zst)
+
+    Los tipos del header VARIABLE_TYPES se pasan como dtypes al parser de C
+    (I -> int64, N -> float64, T<ancho> -> text_dtype). La columna del prefijo '*'
+    no se parsea y el footer '##END##' se recorta sobre los bytes del stream, sin
+    trabajo por línea en Python. Los enteros con nulos se releen como Int64.
+
+    Args:
+        path (str): Ruta al archivo .rpt
+        columns (iterable, optional): Columnas a leer; las demás no se parsean (None = todas)
+        chunk_size (int, optional): Filas por bloque; si se indica devuelve un iterador de DataFrames
+        text_dtype (str): dtype de las columnas de texto ('object', 'category' o 'string')
+        audit (AuditLogger, optional): Audit donde registrar los detalles de lectura
+
+    Returns:
+        pandas.DataFrame, o un iterador de DataFrames si se indica chunk_size
+    """
+    if chunk_size:
+        if int(chunk_size) <= 0:
+            raise ValueError(f"chunk_size must be a positive integer, got: {chunk_size}")
+        return _read_rpt_chunks(path, columns, int(chunk_size), text_dtype, audit)
+    return _read_rpt_frame(path, columns, text_dtype, audit)
+
+def _csv_engine(file_config=None, streaming=False):
+    """
+    Resolver el motor de parseo CSV configurado ('engine' en input_file_config)
+
+    Returns:
+        tuple: (engine, motivo del fallback o None)
+    """
+    requested = (file_config or {}).get('engine') or 'c'
+    if requested != 'pyarrow':
+        return requested, None
+
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return 'c', "pyarrow is not installed"
+
+    if streaming:
+        return 'c', "chunked reads are not supported by the pyarrow engine"
+
+    delimiter = _csv_delimiter(file_config)
+    if delimiter is None or len(delimiter) != 1:
+        return 'c', f"delimiter {delimiter!r} is not supported by the pyarrow engine"
+
+    return 'pyarrow', None
+
+def _log_engine(audit, engine, fallback_reason):
+    """Registrar en el audit el motor de lectura utilizado"""
+    if not audit:
+        return
+    if fallback_reason:
+        audit.log_reading_detail("Engine", f"{engine} (fallback from pyarrow: {fallback_reason})")
+    else:
+        audit.log_reading_detail("Engine", engine)
+
+def _byte_ranges(path, parts):
+    """
+    Dividir un CSV en rangos de bytes que empiezan y terminan en un salto de línea
+
+    Returns:
+        list: tuplas (inicio, fin) en orden; el primer rango empieza después del header
+    """
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        header_end = len(f.readline())
+        boundaries = [header_end]
+        for i in range(1, parts):
+            f.seek(header_end + (size - header_end) * i // parts)
+            f.readline()  # avanzar hasta el próximo inicio de línea
+            position = f.tell()
+            if boundaries[-1] < position < size:
+                boundaries.append(position)
+    boundaries.append(size)
+    return [(start, end) for start, end in zip(boundaries[:-1], boundaries[1:]) if end > start]
+
+def _parse_byte_range(path, start, end, names, kwargs, engine='c'):
+    """
+    Parsear un rango de bytes de un CSV (se ejecuta en un proceso del pool)
+
+    Returns:
+        tuple: (DataFrame, segundos, motivo del fallback al motor C o None)
+    """
+    begin = time.perf_counter()
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    fallback_reason = None
+    if engine == 'pyarrow':
+        try:
+            df = pd.read_csv(io.BytesIO(data), header=None, names=names, engine='pyarrow', **kwargs)
+            return df, time.perf_counter() - begin, None
+        except ValueError as e:
+            # Opciones no soportadas por pyarrow: se repite el rango con el motor C
+            if "pyarrow" not in str(e):
+                raise
+            engine, fallback_reason = 'c', str(e)
+    df = pd.read_csv(io.BytesIO(data), header=None, names=names, engine=engine, **kwargs)
+    return df, time.perf_counter() - begin, fallback_reason
+
+def _read_csv_parallel(path, file_config, workers, columns=None, audit=None):
+    """
+    Leer un CSV sin comprimir parseando rangos de bytes en un process pool
+
+    Cada worker parsea su rango con el mismo motor, header, dtypes, dtype_backend y
+    proyección; las partes se concatenan en el orden del archivo. Supone que ningún
+    campo entrecomillado contiene saltos de línea.
+    """
+    engine, fallback_reason = _csv_engine(file_config)
+    kwargs = _csv_kwargs(path, file_config, columns, audit)
+    names = list(pd.read_csv(path, sep=kwargs['sep'], nrows=0).columns)
+    ranges = _byte_ranges(path, workers)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_parse_byte_range, path, start, end, names, kwargs, engine) for start, end in ranges]
+        results = [future.result() for future in futures]
+
+    if audit:
+        range_fallback = next((reason for _, _, reason in results if reason), None)
+        if range_fallback:
+            engine, fallback_reason = 'c', range_fallback
+        detail = f"{engine} (parallel: {workers} processes, {len(ranges)} byte ranges)"
+        if fallback_reason:
+            detail += f" (fallback from pyarrow: {fallback_reason})"
+        audit.log_reading_detail("Engine", detail)
+        for index, ((start, end), (df, seconds, _)) in enumerate(zip(ranges, results), start=1):
+            audit.log_reading_detail(f"Worker range {index}", f"{(end - start) / 1024 / 1024:.1f} MB, {len(df):,} rows parsed in {seconds:.3f}s")
+
+    if len(results) == 1:
+        return results[0][0]
+    return _concat_parts([df for df, _, _ in results])
+
+def _read_csv(path, file_config=None, columns=None, audit=None):
+    """Leer un CSV completo con el motor configurado, con fallback al motor C"""
+    workers = int((file_config or {}).get('parallel_workers') or 1)
+    if workers > 1 and _compression(path) is None:
+        return _read_csv_parallel(path, file_config, workers, columns, audit)
+
+    engine, fallback_reason = _csv_engine(file_config)
+    kwargs = _csv_kwargs(path, file_config, columns, audit)
+
+    if engine == 'pyarrow':
+        source, stream = _open_csv_source(path)
+        try:
+            df = pd.read_csv(source, engine='pyarrow', **kwargs)
+            _log_engine(audit, engine, None)
+            _log_decompression(audit, stream)
+            return df
+        except ValueError as e:
+            # Opciones no soportadas por pyarrow: se repite la lectura con el motor C
+            if "pyarrow" not in str(e):
+                raise
+            engine, fallback_reason = 'c', str(e)
+        finally:
+            if stream is not None:
+                source.close()
+
+    source, stream = _open_csv_source(path)
+    try:
+        df = pd.read_csv(source, engine=engine, **kwargs)
+    finally:
+        if stream is not None:
+            source.close()
+    _log_engine(audit, engine, fallback_reason)
+    _log_decompression(audit, stream)
+    return df
+
+def expand_input_paths(path):
+    """
+    Resolver los archivos de un input: archivo único, directorio o patrón glob
+
+    Returns:
+        list: rutas de los archivos, ordenadas
+    """
+    if os.path.isdir(path):
+        candidates = [os.path.join(path, name) for name in os.listdir(path) if not name.startswith('.')]
+        paths = []
+        for candidate in candidates:
+            try:
+                if os.path.isfile(candidate) and detect_file_type(candidate):
+                    paths.append(candidate)
+            except ValueError:
+                continue  # Archivos con formato no soportado dentro del directorio
+    elif glob.has_magic(path):
+        paths = [p for p in glob.glob(path) if os.path.isfile(p)]
+    else:
+        return [path]
+
+    if not paths:
+        raise FileNotFoundError(f"No input files found for: {path}")
+    return sorted(paths)
+
+class _ReadingDetails:
+    """Recolector de detalles de lectura de un archivo leído en un thread del pool"""
+
+    def __init__(self):
+        self.details = []
+
+    def log_reading_detail(self, name, value):
+        self.details.append((name, value))
+
+def _concat_parts(frames):
+    """Concatenar las partes alineando categorías (si no, pd.concat las convierte a object)"""
+    for col in frames[0].columns:
+        if all(col in f.columns and isinstance(f[col].dtype, pd.CategoricalDtype) for f in frames):
+            categories = union_categoricals([f[col] for f in frames]).categories
+            for f in frames:
+                f[col] = f[col].cat.set_categories(categories)
+    return pd.concat(frames, ignore_index=True)
+
+def _read_parts(paths, file_config=None, audit=None, columns=None):
+    """Leer varios archivos en paralelo (thread pool) y concatenarlos en orden"""
+    workers = int((file_config or {}).get('read_workers') or min(len(paths), os.cpu_count() or 1))
+
+    def read_part(part_path):
+        details = _ReadingDetails()
+        start = time.perf_counter()
+        df = _read_single(part_path, file_config, details, columns)
+        return df, details, time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(read_part, paths))
+
+    if audit:
+        audit.log_reading_detail("Files", f"{len(paths)} (read with {workers} thread(s))")
+        # Los ajustes (motor, esquema, proyección) son comunes: se registran los del primer archivo
+        for name, value in results[0][1].details:
+            audit.log_reading_detail(name, value)
+        for part_path, (df, _, seconds) in zip(paths, results):
+            audit.log_reading_detail(f"File {os.path.basename(part_path)}", f"{len(df):,} rows in {seconds:.3f}s")
+
+    return _concat_parts([df for df, _, _ in results])
+
+def _read_single(path, file_config=None, audit=None, columns=None):
+    """Leer un único archivo de input"""
+    file_type = _resolve_file_type(path, file_config)
+    _log_schema(audit, file_config)
+
     if file_type == 'excel':
-        return pd.read_excel(path)
-    
+        return _apply_schema(_read_excel(path, file_config, columns, audit), file_config)
+
     elif file_type == 'csv':
-        # Usar delimitador específico si está configurado
-        delimiter = file_config.get('delimiter', ',')
-        return pd.read_csv(path, sep=delimiter)
-    
+        return _read_csv(path, file_config, columns, audit)
+
+    elif file_type == 'rpt':
+        return _apply_schema(read_rpt(path, columns, audit=audit), file_config)
+
+    elif file_type == 'feather':
+        return _apply_schema(read_feather_mapped(path, columns, audit), file_config)
+
+    else:
+        selected = _parquet_columns(path, columns, audit)
+        return _apply_schema(pd.read_parquet(path, columns=selected), file_config)
+
+def read_input(path, file_config=None, audit=None, columns=None):
+    """
+    Lee un archivo de input usando la configuración especificada
+
+    Args:
+        path (str): Ruta al archivo, a un directorio o patrón glob (las partes se leen en paralelo)
+        file_config (dict, optional): Configuración del archivo con 'type', 'delimiter', 'engine' y 'schema'
+        audit (AuditLogger, optional): Audit donde registrar los detalles de lectura
+        columns (iterable, optional): Columnas a leer; las demás no se parsean (None = todas)
+
+    Returns:
+        pandas.DataFrame: DataFrame con los datos leídos
+    """
+    paths = expand_input_paths(path)
+    if len(paths) == 1 and paths[0] == path:
+        return _read_single(path, file_config, audit, columns)
+    return _read_parts(paths, file_config, audit, columns)
+
+def read_input_chunks(path, file_config, audit=None, columns=None):
+    """
+    Lee un archivo de input por bloques (modo streaming)
+
+    Con un directorio o patrón glob las partes se leen una tras otra, en orden.
+
+    Args:
+        path (str): Ruta al archivo, a un directorio o patrón glob
+        file_config (dict): Configuración del archivo; 'chunk_size' indica las filas por bloque
+        audit (AuditLogger, optional): Audit donde registrar los detalles de lectura
+        columns (iterable, optional): Columnas a leer; las demás no se parsean (None = todas)
+
+    Yields:
+        pandas.DataFrame: bloques de como máximo 'chunk_size' filas, en orden
+    """
+    chunk_size = int(file_config['chunk_size'])
+    if chunk_size <= 0:
+        raise ValueError(f"chunk_size must be a positive integer, got: {chunk_size}")
+
+    paths = expand_input_paths(path)
+    if len(paths) == 1:
+        yield from _read_single_chunks(paths[0], file_config, chunk_size, audit, columns)
+        return
+
+    if audit:
+        audit.log_reading_detail("Files", f"{len(paths)} (streamed part by part)")
+    for index, part_path in enumerate(paths):
+        start = time.perf_counter()
+        rows = 0
+        # Los detalles de lectura (motor, esquema...) se registran solo para la primera parte
+        for chunk in _read_single_chunks(part_path, file_config, chunk_size, audit if index == 0 else None, columns):
+            rows += len(chunk)
+            yield chunk
+        if audit:
+            # El tiempo incluye el procesamiento de los chunks de la parte en el pipeline
+            audit.log_reading_detail(f"File {os.path.basename(part_path)}", f"{rows:,} rows in {time.perf_counter() - start:.3f}s")
+
+def _read_single_chunks(path, file_config, chunk_size, audit=None, columns=None):
+    """Leer por bloques un único archivo de input"""
+    file_type = _resolve_file_type(path, file_config)
+
+    if file_type == 'csv':
+        engine, fallback_reason = _csv_engine(file_config, streaming=True)
+        _log_engine(audit, engine, fallback_reason)
+        _log_schema(audit, file_config)
+        kwargs = _csv_kwargs(path, file_config, columns, audit)
+        source, stream = _open_csv_source(path)
+        try:
+            with pd.read_csv(source, chunksize=chunk_size, engine=engine, **kwargs) as reader:
+                for chunk in reader:
+                    yield chunk
+        finally:
+            if stream is not None:
+                source.close()
+        _log_decompression(audit, stream)
+
+    elif file_type == 'rpt':
+        _log_schema(audit, file_config)
+        for chunk in read_rpt(path, columns, chunk_size, audit=audit):
+            yield _apply_schema(chunk, file_config)
+
     elif file_type == 'parquet':
-        return pd.read_parquet(path)
-    
+        import pyarrow.parquet as pq
+        parquet_file = pq.ParquetFile(path)
+        _log_schema(audit, file_config)
+        selected = _parquet_columns(path, columns, audit)
+        for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=selected):
+            yield _apply_schema(batch.to_pandas(), file_config)
+
+    elif file_type == 'feather':
+        _log_schema(audit, file_config)
+        table, _ = _open_arrow_table(path, columns, audit)
+        # Los bloques son vistas sobre el mapeo: solo se convierte a pandas el bloque en curso
+        for batch in table.to_batches(max_chunksize=chunk_size):
+            yield _apply_schema(batch.to_pandas(split_blocks=True), file_config)
+
     else:
-        raise ValueError(f"Unsupported file type in config: {file_type}")
\ No newline at end of file
+        # Excel no permite lectura parcial: se lee completo y se entrega por bloques
+        _log_schema(audit, file_config)
+        df = _apply_schema(_read_excel(path, file_config, columns, audit), file_config)
+        for start in range(0, len(df), chunk_size):
+            yield df.iloc[start:start + chunk_size]
+
+def _csv_metadata(path, file_config=None, exact=False):
+    """
+    Filas y columnas de un CSV: conteo de saltos de línea (exacto) o muestra + extrapolación
+
+    Returns:
+        tuple: (filas, exacto, columnas, bytes sin comprimir estimados)
+    """
+    source, stream = _open_csv_source(path)
+    handle = source if stream is not None else open(source, "rb")
+    try:
+        header = handle.readline()
+        columns = list(pd.read_csv(io.BytesIO(header), sep=_csv_delimiter(file_config)).columns)
+        header_bytes = len(header)
+
+        block_size = 16 * 1024 * 1024 if exact else METADATA_SAMPLE_BYTES
+        lines = data_bytes = 0
+        last = b"\n"
+        while True:
+            block = handle.read(block_size)
+            if not block:
+                # Fin de archivo: conteo exacto (una última línea sin salto también cuenta)
+                return lines + (last != b"\n"), True, columns, header_bytes + data_bytes
+            lines += block.count(b"\n")
+            data_bytes += len(block)
+            last = block[-1:]
+            # Muestra completa: solo se extrapola si queda archivo por leer (si no, la próxima lectura da el conteo exacto)
+            if not exact and data_bytes >= METADATA_SAMPLE_BYTES and handle.read(1):
+                break
+
+        # Muestra: se extrapola con el tamaño total (descomprimido estimado con el ratio de la muestra)
+        if stream is None:
+            total_bytes = os.path.getsize(path)
+        else:
+            total_bytes = stream.compressed_bytes * stream.uncompressed_bytes / max(1, stream._raw.tell())
+        rows = round(lines * (total_bytes - header_bytes) / max(1, data_bytes))
+        return rows, False, columns, total_bytes
+    finally:
+        handle.close()
+
+def _rpt_metadata(path, exact=False):
+    """
+    Filas y columnas de un .rpt: conteo de líneas como en CSV, descontando la línea !1, la línea en blanco y el footer
+
+    Returns:
+        tuple: (filas, exacto, columnas, bytes sin comprimir estimados)
+    """
+    rows, rows_exact, _, read_bytes = _csv_metadata(path, None, exact)
+    names, _, body, _ = _open_rpt(path)
+    body.close()
+    return max(0, rows - 3), rows_exact, names, read_bytes
+
+def _excel_metadata(path, file_config=None):
+    """
+    Filas y columnas de una hoja Excel: sidecar Feather, dimensiones de la hoja o lectura completa
+
+    Returns:
+        tuple: (filas, exacto, columnas)
+    """
+    sheet_name = (file_config or {}).get('sheet_name', 0)
+    sidecar = _excel_sidecar_path(path, sheet_name)
+    if os.path.exists(sidecar):
+        rows, columns = _feather_metadata(sidecar)
+        return rows, True, columns
+
+    if os.path.splitext(path)[-1].lower() == ".xlsx":
+        from openpyxl import load_workbook
+        workbook = load_workbook(path, read_only=True)
+        try:
+            sheet = workbook[sheet_name] if isinstance(sheet_name, str) else workbook.worksheets[sheet_name]
+            header = next(sheet.iter_rows(max_row=1, values_only=True), ())
+            columns = [c for c in header if c is not None]
+            if sheet.max_row is not None:
+                # Dimensión declarada en la hoja (puede incluir filas vacías con formato)
+                return max(0, sheet.max_row - 1), False, columns
+            return sum(1 for _ in sheet.iter_rows(min_row=2, values_only=True)), True, columns
+        finally:
+            workbook.close()
+
+    # .xls: sin dimensiones accesibles, se lee la hoja
+    df = pd.read_excel(path, sheet_name=sheet_name)
+    return len(df), True, list(df.columns)
+
+def _feather_metadata(path):
+    """Filas y columnas de un archivo Feather/Arrow IPC a partir de los metadatos de sus batches"""
+    import pyarrow as pa
+    with pa.memory_map(path) as source:
+        try:
+            reader = pa.ipc.open_file(source)
+            batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+        except pa.ArrowInvalid:
+            source.seek(0)
+            reader = pa.ipc.open_stream(source)
+            batches = reader
+        rows = sum(batch.num_rows for batch in batches)
+        return rows, reader.schema.names
+
+def _file_metadata(path, file_config=None, exact=False):
+    """Metadatos de un único archivo de input (ver read_input_metadata)"""
+    file_type = _resolve_file_type(path, file_config)
+    size = os.path.getsize(path)
+    read_bytes = size
+
+    if file_type == 'csv':
+        rows, rows_exact, columns, read_bytes = _csv_metadata(path, file_config, exact)
+    elif file_type == 'rpt':
+        rows, rows_exact, columns, read_bytes = _rpt_metadata(path, exact)
+    elif file_type == 'parquet':
+        import pyarrow.parquet as pq
+        metadata = pq.ParquetFile(path).metadata
+        rows, rows_exact = metadata.num_rows, True
+        columns = pq.read_schema(path).names
+        # Coste de parseo: bytes sin comprimir de los row groups según el footer
+        read_bytes = sum(metadata.row_group(i).total_byte_size for i in range(metadata.num_row_groups))
+    elif file_type == 'feather':
+        rows, columns = _feather_metadata(path)
+        rows_exact = True
+    else:
+        rows, rows_exact, columns = _excel_metadata(path, file_config)
+
+    return {
+        'file_type': file_type,
+        'rows': int(rows),
+        'rows_exact': rows_exact,
+        'columns': columns,
+        'bytes': size,
+        'estimated_read_seconds': read_bytes / 1024 / 1024 / READ_THROUGHPUT_MB_S[file_type]
+    }
+
+def read_input_metadata(path, file_config=None, exact=False):
+    """
+    Obtiene filas, columnas y tamaño de un input sin parsearlo completo
+
+    Parquet usa el footer, Feather/Arrow los metadatos de los batches y Excel las
+    dimensiones de la hoja (o su sidecar). En CSV se cuenta el primer MB y se
+    extrapola por tamaño; con exact=True se cuentan todos los saltos de línea
+    (no descuenta saltos dentro de campos entrecomillados).
+
+    Args:
+        path (str): Ruta al archivo, a un directorio o patrón glob
+        file_config (dict, optional): Configuración del archivo ('type', 'delimiter', 'sheet_name')
+        exact (bool): Contar las filas de los CSV en lugar de estimarlas
+
+    Returns:
+        dict: 'file_type', 'files', 'rows', 'rows_exact', 'columns', 'bytes' y
+            'estimated_read_seconds' (orientativo, según READ_THROUGHPUT_MB_S)
+    """
+    parts = [_file_metadata(p, file_config, exact) for p in expand_input_paths(path)]
+    return {
+        'file_type': parts[0]['file_type'],
+        'files': len(parts),
+        'rows': sum(p['rows'] for p in parts),
+        'rows_exact': all(p['rows_exact'] for p in parts),
+        'columns': parts[0]['columns'],
+        'bytes': sum(p['bytes'] for p in parts),
+        'estimated_read_seconds': sum(p['estimated_read_seconds'] for p in parts)
+    }
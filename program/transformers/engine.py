@@ -1,6 +1,162 @@
 from .functions import *
+from . import functions as rules_module
+from .memory import buffer_delta, frame_buffers
+from .spec import compile_rules
+import ast
+import inspect
 import os
 
+import numpy as np
+import pandas as pd
+
+# Métodos de pandas que agregan sobre varias filas (estadísticas, cuantiles, rankings, duplicados)
+AGGREGATE_METHODS = frozenset({
+    "groupby", "agg", "aggregate", "transform", "qcut", "quantile", "mean", "median", "std", "var", "sum",
+    "count", "nunique", "value_counts", "rank", "cumsum", "cumcount", "shift", "diff", "pct_change",
+    "rolling", "expanding", "duplicated", "drop_duplicates", "sort_values", "pivot_table", "idxmin", "idxmax"
+})
+
+def _rules_spec_path(config, script_dir):
+    """Ruta de la spec declarativa de reglas ('rules_spec' en config), o None para usar functions.py"""
+    spec = (config or {}).get("rules_spec")
+    if not spec:
+        return None
+    return spec if os.path.isabs(spec) else os.path.join(script_dir, "..", spec)
+
+def _compiled_rules(config, script_dir):
+    """Spec de reglas compilada (cacheada entre chunks), o None si no hay 'rules_spec'"""
+    spec_path = _rules_spec_path(config, script_dir)
+    if spec_path is None:
+        return None
+    prune = config.get("prune_dead_steps", True)
+    return compile_rules(spec_path, os.path.join(script_dir, "..", config["tables_path"]), prune)
+
+def required_input_columns(config=None, script_dir=None):
+    """
+    Columnas de input que usan las reglas de negocio activas (rules_spec o functions.py)
+
+    Con una spec declarativa se usan las columnas que lee su plan. Si el módulo de
+    reglas declara INPUT_COLUMNS se usa esa lista. Si no, se analiza
+    su código y se toman todos los literales string y nombres de atributo: es un
+    superconjunto seguro de las columnas referenciadas por run_business_rules.
+
+    Returns:
+        set: nombres de columnas candidatas, o None si no se puede determinar
+    """
+    rules = _compiled_rules(config, script_dir) if script_dir else None
+    if rules is not None:
+        return set(rules.input_columns)
+
+    declared = getattr(rules_module, "INPUT_COLUMNS", None)
+    if declared is not None:
+        return set(declared)
+
+    try:
+        source = inspect.getsource(rules_module)
+    except (OSError, TypeError):
+        return None
+
+    names = set()
+    for node in ast.walk(ast.parse(source)):
+        if isinstance(node, ast.Constant) and isinstance(node.value, str):
+            names.add(node.value)
+        elif isinstance(node, ast.Attribute):
+            names.add(node.attr)
+    return names
+
+def _module_aggregates(module):
+    """Métodos de agregación que usa el código de un módulo de reglas en Python (ROW_WISE declarado tiene prioridad)"""
+    declared = getattr(module, "ROW_WISE", None)
+    if declared is not None:
+        return [] if declared else ["run_business_rules (ROW_WISE = False)"]
+    try:
+        source = inspect.getsource(module)
+    except (OSError, TypeError):
+        return ["run_business_rules (source not available)"]
+    names = {node.attr for node in ast.walk(ast.parse(source)) if isinstance(node, ast.Attribute)}
+    return sorted(f"{name}()" for name in names & AGGREGATE_METHODS)
+
+def aggregate_rules(config=None, script_dir=None):
+    """
+    Reglas de negocio activas que agregan sobre varias filas (rules_spec o functions.py)
+
+    En streaming las reglas se aplican a cada chunk por separado, así que estas reglas
+    darían un resultado distinto que en bloque. Con una spec declarativa son los pasos
+    group_stat, los bin por cuantiles y los derive con mean/std/quantile. Si el módulo
+    de reglas declara ROW_WISE se usa esa marca; si no, se buscan en su código llamadas
+    a métodos de agregación de pandas (un superconjunto seguro, como INPUT_COLUMNS).
+
+    Returns:
+        list: descripción de las reglas que agregan, vacía si todas son fila a fila
+    """
+    rules = _compiled_rules(config, script_dir) if script_dir else None
+    if rules is not None:
+        return [f"step {step.index} ({step.kind}): {step.name}" for step in rules.aggregate_steps]
+    return _module_aggregates(rules_module)
+
+def estimate_pruned_time(df, config, script_dir, audit=None):
+    """
+    Estimar en el audit el tiempo ahorrado por los pasos eliminados de la spec
+
+    Solo con 'estimate_pruned_time: true' en config: vuelve a ejecutar los pasos sobre
+    muestras de *df* (el input de las transformaciones), así que se llama fuera de la
+    fase de transformaciones medida.
+    """
+    if not audit or not (config or {}).get("estimate_pruned_time"):
+        return
+    rules = _compiled_rules(config, script_dir)
+    if rules is not None:
+        rules.log_pruned_estimate(df, audit)
+
+def _numpy_column(series):
+    """Columna Arrow (ArrowDtype o string[pyarrow]) con el dtype que daría el backend numpy"""
+    import pyarrow as pa
+
+    arrow_type = pa.string() if isinstance(series.dtype, pd.StringDtype) else series.dtype.pyarrow_dtype
+    missing = series.isna()
+    if pa.types.is_integer(arrow_type):
+        # Como en numpy, una columna entera con vacíos se lee como float64
+        return series.astype(np.float64 if missing.any() else arrow_type.to_pandas_dtype())
+    if pa.types.is_floating(arrow_type):
+        return series.astype(arrow_type.to_pandas_dtype())
+    if pa.types.is_boolean(arrow_type) and not missing.any():
+        return series.astype(bool)
+    if pa.types.is_timestamp(arrow_type) or pa.types.is_date(arrow_type):
+        return series.astype("datetime64[ns]")
+    # Texto, booleanos con vacíos y demás tipos: objetos Python con NaN como vacío
+    return series.astype(object).where(~missing, np.nan)
+
+def numpy_backed(df):
+    """
+    *df* con los dtypes del backend numpy de pandas
+
+    Las reglas de negocio están escritas para dtypes numpy: con 'dtype_backend: pyarrow'
+    las columnas Arrow (y las categorías Arrow de las categóricas) se convierten al
+    dtype que habría dado la lectura con numpy, y las fechas a datetime64[ns], para
+    que la salida no dependa del backend de lectura.
+
+    Returns:
+        pandas.DataFrame: df tal cual si no hay nada que convertir
+    """
+    converted = {}
+    for name, series in df.items():
+        dtype = series.dtype
+        if isinstance(dtype, pd.CategoricalDtype):
+            if isinstance(dtype.categories.dtype, (pd.ArrowDtype, pd.StringDtype)):
+                categories = pd.Index(_numpy_column(pd.Series(dtype.categories)))
+                converted[name] = pd.Series(pd.Categorical.from_codes(series.cat.codes, categories, dtype.ordered),
+                                            index=series.index, name=name)
+        elif isinstance(dtype, (pd.ArrowDtype, pd.StringDtype)):
+            converted[name] = _numpy_column(series)
+        elif dtype.kind == "M" and dtype != np.dtype("datetime64[ns]"):
+            converted[name] = series.astype("datetime64[ns]")
+    if not converted:
+        return df
+    df = df.copy(deep=False)
+    for name, series in converted.items():
+        df[name] = series
+    return df
+
 def apply_transformations(df, config, logger, script_dir, audit=None):
     # Guardar el prefix original
     original_prefix = logger.prefix
@@ -11,11 +167,29 @@ def apply_transformations(df, config, logger, script_dir, audit=None):
 
     # Construir ruta relativa al script
     tables_path = os.path.join(script_dir, "..", config["tables_path"])
-    
-    df = run_business_rules(df, tables_path, logger, audit)
+
+    # Columnas Arrow ('dtype_backend: pyarrow') a dtypes numpy antes de las reglas
+    numpy_df = numpy_backed(df)
+    if numpy_df is not df:
+        logger.info("Arrow-backed columns converted to numpy dtypes for the business rules")
+        df = numpy_df
+
+    # Buffers del input: al final se cuentan los bytes de la salida nuevos y compartidos
+    input_buffers = frame_buffers(df) if audit else None
+
+    rules = _compiled_rules(config, script_dir)
+    if rules is not None:
+        # Spec declarativa compilada a un plan; functions.py queda como alternativa en Python
+        logger.info(f"Rule spec: {os.path.basename(rules.path)} ({len(rules.steps)} steps -> {len(rules.plan)} plan steps)")
+        df = rules.execute(df, logger, audit)
+    else:
+        df = run_business_rules(df, tables_path, logger, audit)
+
+    if audit:
+        audit.log_copies(*buffer_delta(input_buffers, frame_buffers(df)))
 
     logger.info("End of transformations")
-    
+
     # Restaurar prefix original
     logger.prefix = original_prefix
-    return df
\ No newline at end of file
+    return df
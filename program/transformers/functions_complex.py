@@ -1,30 +1,33 @@
 import pandas as pd
 import numpy as np
 import os
-import time
 from contextlib import contextmanager
 
+from .memory import copy_on_write_enabled, tracked_step
+from .tables import get_registry, lookup
+
+# Las estadísticas por país no llegan al output (selección final): el resultado es fila a fila
+ROW_WISE = True
+
 def run_business_rules(df, tables_path, logger, audit=None):
     # Guardar el prefix original
     original_prefix = logger.prefix
     # Cambiar al prefix específico del módulo
     logger.prefix = "Functions"
 
-    df = df.copy()
+    # Con Copy-on-Write basta una copia superficial: los datos se copian solo al modificarse
+    df = df.copy(deep=not copy_on_write_enabled())
+    # Tablas auxiliares: cargadas una vez por proceso y pedidas por nombre
+    tables = get_registry(tables_path)
 
     logger.debug(f"input data columns -> {df.columns.tolist()} ")
 
     # Helper: context manager para tracking automático
     @contextmanager
     def track(description):
-        """Context manager para medir tiempo de un bloque de código"""
-        start = time.time()
-        try:
+        """Context manager para medir tiempo y bytes copiados (nuevos vs compartidos) de un bloque de código"""
+        with tracked_step(audit, description, lambda: df):
             yield
-        finally:
-            elapsed = time.time() - start
-            if audit:
-                audit.log_transformation(description, elapsed)
     
     # =========================================================================
     # COMPLEJIDAD: COMPLEX
@@ -36,7 +39,7 @@ def run_business_rules(df, tables_path, logger, audit=None):
     # Mapear sexo
     with track("SEX mapping"):
         df["Sex"] = df["Sex"].map({"Female": 0, "Male": 1})
-        df = df.rename(columns={"Sex":"SEX"})
+        df.rename(columns={"Sex":"SEX"}, inplace=True)
         logger.success("SEX mapped")
 
     # Validación de datos de entrada
@@ -50,14 +53,13 @@ def run_business_rules(df, tables_path, logger, audit=None):
 
     # pol_term_y con merge
     with track("POL_TERM_Y assignment + merge"):
-        idx_map = pd.read_csv(os.path.join(tables_path, "temp_idx_map.csv"))
-        df = df.merge(idx_map, how="left", left_on="temp_idx", right_on="idx")
+        df = tables.lookup(df, "temp_idx_map", left_on="temp_idx", right_on="idx", audit=audit)
         df.loc[df["tipo_producto"] == "Vitalicio", "POL_TERM_Y"] = 100
         logger.success("POL_TERM_Y correctly assigned")
 
     # prod type column
     with track("PROD_TYPE mapping"):
-        df = df.rename(columns={"tipo_producto":"PROD_TYPE"})
+        df.rename(columns={"tipo_producto":"PROD_TYPE"}, inplace=True)
         df["PROD_TYPE"] = df["PROD_TYPE"].map({"Vitalicio":1, "Temporal":2})
         logger.success("PROD_TYPE column correctly assigned")
 
@@ -103,14 +105,12 @@ def run_business_rules(df, tables_path, logger, audit=None):
 
     # tariff grp
     with track("TARIFF merge"):
-        tariff_map = pd.read_csv(os.path.join(tables_path, "tariff_map.csv"))
-        df = df.merge(tariff_map, on="tariff_grp", how="left")
+        df = tables.lookup(df, "tariff_map", left_on="tariff_grp", audit=audit)
         logger.success("TARIFF column correctly assigned")
 
     # currency map
     with track("CURRENCY merge"):
-        currency_map = pd.read_csv(os.path.join(tables_path, "currency_map.csv"))
-        df = df.merge(currency_map, on="country", how="left")
+        df = tables.lookup(df, "currency_map", left_on="country", audit=audit)
         logger.success("CURRENCY column correctly assigned")
 
     # prem freq
@@ -126,11 +126,11 @@ def run_business_rules(df, tables_path, logger, audit=None):
 
     # reins company
     with track("REINS rename"):
-        df = df.rename(columns={"reins_name":"REINS"})
+        df.rename(columns={"reins_name":"REINS"}, inplace=True)
     
     # comm pc
     with track("COMM_PC rename"):
-        df = df.rename(columns={"comission_precentage":"COMM_PC"})
+        df.rename(columns={"comission_precentage":"COMM_PC"}, inplace=True)
 
     # Cálculo de comisión en valor absoluto
     with track("Commission amount calculation"):
@@ -156,7 +156,7 @@ def run_business_rules(df, tables_path, logger, audit=None):
             'ID': 'count'
         }).reset_index()
         country_stats.columns = ['country', 'AVG_SA_BY_COUNTRY', 'AVG_PREM_BY_COUNTRY', 'COUNT_BY_COUNTRY']
-        df = df.merge(country_stats, on='country', how='left')
+        df = lookup(df, country_stats, 'country')
         logger.success("Country statistics merged")
 
     # Validación de datos de salida
@@ -175,8 +175,8 @@ def run_business_rules(df, tables_path, logger, audit=None):
                         "SUM_ASSURED", "ANNUAL_PREM", "PREM_SA_RATIO", "PREM_FREQ", 
                         "REINS", "COMM_PC", "COMM_AMOUNT", "RISK_CLASS"]
         logger.info(f"Output variable list: {', '.join(map(str, output_vars))}")
-        df_out = df[output_vars]
+        df = df[output_vars]
 
     # Restaurar prefix original
     logger.prefix = original_prefix
-    return df_out
\ No newline at end of file
+    return df
\ No newline at end of file
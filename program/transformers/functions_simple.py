@@ -1,30 +1,27 @@
 import pandas as pd
 import numpy as np
 import os
-import time
 from contextlib import contextmanager
 
+from .memory import copy_on_write_enabled, tracked_step
+
 def run_business_rules(df, tables_path, logger, audit=None):
     # Guardar el prefix original
     original_prefix = logger.prefix
     # Cambiar al prefix específico del módulo
     logger.prefix = "Functions"
 
-    df = df.copy()
+    # Con Copy-on-Write basta una copia superficial: los datos se copian solo al modificarse
+    df = df.copy(deep=not copy_on_write_enabled())
 
     logger.debug(f"input data columns -> {df.columns.tolist()} ")
 
     # Helper: context manager para tracking automático
     @contextmanager
     def track(description):
-        """Context manager para medir tiempo de un bloque de código"""
-        start = time.time()
-        try:
+        """Context manager para medir tiempo y bytes copiados (nuevos vs compartidos) de un bloque de código"""
+        with tracked_step(audit, description, lambda: df):
             yield
-        finally:
-            elapsed = time.time() - start
-            if audit:
-                audit.log_transformation(description, elapsed)
     
     # =========================================================================
     # COMPLEJIDAD: SIMPLE
@@ -35,14 +32,14 @@ def run_business_rules(df, tables_path, logger, audit=None):
 
     # Renombrar columnas principales
     with track("Column renaming (batch 1)"):
-        df = df.rename(columns={
+        df.rename(columns={
             "Sex": "SEX",
             "tipo_producto": "PROD_TYPE",
             "sum_insured": "SUM_ASSURED",
             "annual_prem": "ANNUAL_PREM",
             "reins_name": "REINS",
             "comission_precentage": "COMM_PC"
-        })
+        }, inplace=True)
         logger.success("Main columns renamed")
 
     # Mapeo simple de sexo
@@ -76,8 +73,8 @@ def run_business_rules(df, tables_path, logger, audit=None):
         output_vars = ["ID", "PROD_TYPE", "SEX", "POL_TERM_Y", "SUM_ASSURED", 
                         "ANNUAL_PREM", "PREM_FREQ", "REINS", "COMM_PC"]
         logger.info(f"Output variable list: {', '.join(map(str, output_vars))}")
-        df_out = df[output_vars]
+        df = df[output_vars]
 
     # Restaurar prefix original
     logger.prefix = original_prefix
-    return df_out
\ No newline at end of file
+    return df
\ No newline at end of file
@@ -1,31 +1,31 @@
 import pandas as pd
 import numpy as np
 import os
-import time
 from contextlib import contextmanager
 from datetime import datetime
 
+from .memory import copy_on_write_enabled, tracked_step
+from .tables import get_registry, lookup
+
 def run_business_rules(df, tables_path, logger, audit=None):
     # Guardar el prefix original
     original_prefix = logger.prefix
     # Cambiar al prefix específico del módulo
     logger.prefix = "Functions"
 
-    df = df.copy()
+    # Con Copy-on-Write basta una copia superficial: los datos se copian solo al modificarse
+    df = df.copy(deep=not copy_on_write_enabled())
+    # Tablas auxiliares: cargadas una vez por proceso y pedidas por nombre
+    tables = get_registry(tables_path)
 
     logger.debug(f"input data columns -> {df.columns.tolist()} ")
 
     # Helper: context manager para tracking automático
     @contextmanager
     def track(description):
-        """Context manager para medir tiempo de un bloque de código"""
-        start = time.time()
-        try:
+        """Context manager para medir tiempo y bytes copiados (nuevos vs compartidos) de un bloque de código"""
+        with tracked_step(audit, description, lambda: df):
             yield
-        finally:
-            elapsed = time.time() - start
-            if audit:
-                audit.log_transformation(description, elapsed)
     
     # =========================================================================
     # COMPLEJIDAD: VERY COMPLEX
@@ -39,7 +39,7 @@ def run_business_rules(df, tables_path, logger, audit=None):
     # Mapear sexo
     with track("SEX mapping"):
         df["Sex"] = df["Sex"].map({"Female": 0, "Male": 1})
-        df = df.rename(columns={"Sex":"SEX"})
+        df.rename(columns={"Sex":"SEX"}, inplace=True)
         logger.success("SEX mapped")
 
     # Validación exhaustiva de entrada
@@ -52,14 +52,13 @@ def run_business_rules(df, tables_path, logger, audit=None):
 
     # pol_term_y con merge
     with track("POL_TERM_Y assignment + merge"):
-        idx_map = pd.read_csv(os.path.join(tables_path, "temp_idx_map.csv"))
-        df = df.merge(idx_map, how="left", left_on="temp_idx", right_on="idx")
+        df = tables.lookup(df, "temp_idx_map", left_on="temp_idx", right_on="idx", audit=audit)
         df.loc[df["tipo_producto"] == "Vitalicio", "POL_TERM_Y"] = 100
         logger.success("POL_TERM_Y correctly assigned")
 
     # prod type
     with track("PROD_TYPE mapping"):
-        df = df.rename(columns={"tipo_producto":"PROD_TYPE"})
+        df.rename(columns={"tipo_producto":"PROD_TYPE"}, inplace=True)
         df["PROD_TYPE"] = df["PROD_TYPE"].map({"Vitalicio":1, "Temporal":2})
         logger.success("PROD_TYPE mapped")
 
@@ -112,13 +111,11 @@ def run_business_rules(df, tables_path, logger, audit=None):
 
     # Multiple merges
     with track("TARIFF merge"):
-        tariff_map = pd.read_csv(os.path.join(tables_path, "tariff_map.csv"))
-        df = df.merge(tariff_map, on="tariff_grp", how="left")
+        df = tables.lookup(df, "tariff_map", left_on="tariff_grp", audit=audit)
         logger.success("TARIFF merged")
 
     with track("CURRENCY merge"):
-        currency_map = pd.read_csv(os.path.join(tables_path, "currency_map.csv"))
-        df = df.merge(currency_map, on="country", how="left")
+        df = tables.lookup(df, "currency_map", left_on="country", audit=audit)
         logger.success("CURRENCY merged")
 
     # prem freq
@@ -134,7 +131,7 @@ def run_business_rules(df, tables_path, logger, audit=None):
 
     # reins y comm
     with track("REINS and COMM columns"):
-        df = df.rename(columns={"reins_name":"REINS", "comission_precentage":"COMM_PC"})
+        df.rename(columns={"reins_name":"REINS", "comission_precentage":"COMM_PC"}, inplace=True)
         df["COMM_AMOUNT"] = (df["ANNUAL_PREM"] * df["COMM_PC"] / 100).round(2)
         df["NET_PREM"] = (df["ANNUAL_PREM"] - df["COMM_AMOUNT"]).round(2)
         logger.success("REINS and commission processed")
@@ -166,7 +163,7 @@ def run_business_rules(df, tables_path, logger, audit=None):
         }).reset_index()
         country_stats.columns = ['country', 'AVG_SA_COUNTRY', 'TOTAL_SA_COUNTRY', 'COUNT_COUNTRY',
                                 'AVG_PREM_COUNTRY', 'TOTAL_PREM_COUNTRY', 'AVG_RISK_COUNTRY']
-        df = df.merge(country_stats, on='country', how='left')
+        df = lookup(df, country_stats, 'country')
         
         # Por rango de edad
         age_stats = df.groupby('AGE_RANGE').agg({
@@ -174,7 +171,7 @@ def run_business_rules(df, tables_path, logger, audit=None):
             'SUM_ASSURED': 'mean'
         }).reset_index()
         age_stats.columns = ['AGE_RANGE', 'AVG_PREM_AGE', 'AVG_SA_AGE']
-        df = df.merge(age_stats, on='AGE_RANGE', how='left')
+        df = lookup(df, age_stats, 'AGE_RANGE')
         logger.success("Multi-dimensional aggregations completed")
 
     # Window functions - Ranking dentro de grupos
@@ -248,7 +245,7 @@ def run_business_rules(df, tables_path, logger, audit=None):
             "PREM_RANK_BY_COUNTRY", "IS_PREM_OUTLIER", "IS_SA_OUTLIER"
         ]
         logger.info(f"Output: {len(output_vars)} variables selected")
-        df_out = df[output_vars]
+        df = df[output_vars]
 
     # Validación exhaustiva de salida
     with track("Comprehensive output validation"):
@@ -280,7 +277,7 @@ def run_business_rules(df, tables_path, logger, audit=None):
             "PREM_RANK_BY_COUNTRY", "IS_PREM_OUTLIER", "IS_SA_OUTLIER"
         ]
         logger.info(f"Output: {len(output_vars)} variables selected")
-        df_out = df[output_vars]
+        df = df[output_vars]
 
     # Validación exhaustiva de salida
     with track("Comprehensive output validation"):
@@ -302,4 +299,4 @@ def run_business_rules(df, tables_path, logger, audit=None):
 
     # Restaurar prefix original
     logger.prefix = original_prefix
-    return df_out
\ No newline at end of file
+    return df
\ No newline at end of file
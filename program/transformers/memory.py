@@ -0,0 +1,90 @@
+"""
+Contabilidad de copias de las transformaciones: bytes nuevos vs compartidos
+
+Cada columna se identifica por los buffers (numpy o Arrow) que la respaldan y por el
+objeto dueño de esa memoria, referenciado con un weakref. Un buffer de después cuenta
+como compartido si su dirección ya estaba antes y su dueño de entonces sigue vivo
+(columnas no tocadas, vistas, renames sin copia, selecciones perezosas con
+Copy-on-Write); si el dueño se liberó, la dirección reutilizada cuenta como memoria
+nueva. En columnas object solo se cuentan los punteros, no los objetos Python.
+"""
+from contextlib import contextmanager
+import time
+import weakref
+
+import numpy as np
+import pandas as pd
+
+def copy_on_write_enabled():
+    """Si pandas Copy-on-Write está activo (el modo 'warn' no cuenta)"""
+    return pd.options.mode.copy_on_write is True
+
+def enable_copy_on_write(enabled=True):
+    """Activar (o desactivar) pandas Copy-on-Write para todo el proceso"""
+    pd.set_option("mode.copy_on_write", bool(enabled))
+
+def _owner(array):
+    """Objeto dueño de la memoria de un ndarray: el final de su cadena de .base"""
+    while isinstance(array.base, np.ndarray):
+        array = array.base
+    return array if array.base is None else array.base
+
+def _reference(owner):
+    """weakref a *owner*, o una referencia fuerte si no admite weakrefs"""
+    try:
+        return weakref.ref(owner)
+    except TypeError:
+        return lambda: owner
+
+def _array_buffers(values):
+    """(dirección, bytes, dueño) de los buffers que respaldan un array de columna"""
+    if isinstance(values, np.ndarray):
+        return [(values.__array_interface__['data'][0], values.nbytes, _owner(values))]
+    if isinstance(values, pd.Categorical):
+        return _array_buffers(values.codes)
+    arrow = getattr(values, '_pa_array', None)
+    if arrow is not None:
+        # Los wrappers de chunks y buffers son nuevos en cada acceso: el dueño es el ChunkedArray
+        return [(buffer.address, buffer.size, arrow) for chunk in arrow.chunks
+                for buffer in chunk.buffers() if buffer is not None]
+    # Arrays de extensión respaldados por numpy (fechas, enteros/booleanos con máscara)
+    arrays = [getattr(values, attr, None) for attr in ('_ndarray', '_data', '_mask')]
+    arrays = [array for array in arrays if isinstance(array, np.ndarray)]
+    if arrays:
+        return [buffer for array in arrays for buffer in _array_buffers(array)]
+    return _array_buffers(np.asarray(values))
+
+def frame_buffers(df):
+    """Buffers únicos de todas las columnas de *df*: {dirección: (bytes, referencia al dueño)}"""
+    buffers = {}
+    for position in range(df.shape[1]):
+        for address, size, owner in _array_buffers(df.iloc[:, position].array):
+            buffers[address] = (size, _reference(owner))
+    return buffers
+
+def buffer_delta(before, after):
+    """(bytes asignados, bytes compartidos) de *after* respecto a *before*"""
+    allocated = shared = 0
+    for address, (size, _) in after.items():
+        if address in before and before[address][1]() is not None:
+            shared += size
+        else:
+            allocated += size
+    return allocated, shared
+
+@contextmanager
+def tracked_step(audit, description, frame):
+    """
+    Medir un paso de transformación y registrarlo en el audit con sus bytes
+    asignados/compartidos. *frame* es una función que devuelve el DataFrame actual.
+    """
+    if not audit:
+        yield
+        return
+    before = frame_buffers(frame())
+    start = time.time()
+    try:
+        yield
+    finally:
+        elapsed = time.time() - start
+        audit.log_transformation(description, elapsed, buffer_delta(before, frame_buffers(frame())))
@@ -0,0 +1,706 @@
+"""
+Reglas de negocio declarativas: una spec YAML/JSON de pasos tipados compilada a un plan vectorizado
+
+Cada paso de la spec tiene un 'kind' y un 'name' opcional (descripción en el log y en el audit):
+
+    steps:
+      - kind: rename        # columns: {origen: destino}
+      - kind: map           # column, values: {valor: nuevo}, source (por defecto column), default
+      - kind: lookup        # table (en tables/), on | left_on + right_on, columns (por defecto todas)
+      - kind: derive        # column, expr: expresión vectorizada sobre columnas
+      - kind: bin           # column, source, bins + labels (pd.cut) o quantiles (pd.qcut)
+      - kind: group_stat    # column, source, by, stat (mean, sum, count, min, max, std, median, rank)
+      - kind: validate      # columns, checks (not_null, non_negative, unique): solo registra avisos
+      - kind: select        # columns: [columnas de output en orden]
+
+Al compilar se construye el grafo de dependencias por columnas y se eliminan los
+pasos cuyas columnas no llegan al select final ni a una validación. Después se
+fusionan los renames consecutivos, se agrupan los maps y las estadísticas por
+grupo consecutivos que no dependen entre sí y se ordenan los lookups
+independientes por coste (tamaño de la tabla).
+"""
+import ast
+import json
+import operator
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from .memory import tracked_step
+from .tables import TableError, get_registry
+
+STEP_KINDS = ("rename", "map", "lookup", "derive", "bin", "group_stat", "validate", "select")
+GROUP_STATS = ("mean", "sum", "count", "size", "min", "max", "std", "median", "rank")
+VALIDATION_CHECKS = ("not_null", "non_negative", "unique")
+# Funciones de 'derive' que agregan sobre todas las filas del DataFrame
+AGGREGATE_FUNCTIONS = ("mean", "std", "quantile")
+
+# Filas de muestra con las que se estima el tiempo de los pasos eliminados
+PRUNE_SAMPLE_ROWS = 20_000
+
+# Operadores y funciones admitidos en las expresiones de 'derive'
+_BINARY_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: operator.pow,
+    ast.BitAnd: operator.and_,
+    ast.BitOr: operator.or_
+}
+_COMPARE_OPERATORS = {
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge
+}
+
+def _clip(x, lower=None, upper=None):
+    return x.clip(lower=lower, upper=upper) if isinstance(x, pd.Series) else np.clip(x, lower, upper)
+
+def _series(x):
+    return x if isinstance(x, pd.Series) else pd.Series(x)
+
+EXPRESSION_FUNCTIONS = {
+    'where': np.where,
+    'round': lambda x, decimals=0: x.round(decimals) if isinstance(x, pd.Series) else np.round(x, decimals),
+    'clip': _clip,
+    'abs': np.abs,
+    'isnull': pd.isna,
+    'notnull': pd.notna,
+    'fillna': lambda x, value: _series(x).fillna(value),
+    'to_datetime': lambda x, format=None: pd.to_datetime(x, format=format),
+    'now': pd.Timestamp.now,
+    'year': lambda x: _series(x).dt.year,
+    'month': lambda x: _series(x).dt.month,
+    'day': lambda x: _series(x).dt.day,
+    'quarter': lambda x: _series(x).dt.quarter,
+    'week': lambda x: _series(x).dt.isocalendar().week,
+    'days': lambda x: _series(x).dt.days,
+    'int': lambda x: _series(x).astype('int64'),
+    'float': lambda x: _series(x).astype('float64'),
+    'mean': lambda x: _series(x).mean(),
+    'std': lambda x: _series(x).std(),
+    'quantile': lambda x, q: _series(x).quantile(q)
+}
+
+class RuleSpecError(ValueError):
+    """Error de validación o compilación de una spec de reglas"""
+
+def _compile_expression(text):
+    """
+    Compilar una expresión de 'derive' a una función vectorizada sobre el DataFrame
+
+    Los nombres son columnas (o col("nombre con espacios")); se admiten aritmética,
+    comparaciones, and/or/not, 'a if cond else b', 'x in [..]' y EXPRESSION_FUNCTIONS.
+
+    Returns:
+        tuple: (función df -> valores, set de columnas referenciadas)
+    """
+    try:
+        tree = ast.parse(str(text), mode='eval')
+    except SyntaxError as e:
+        raise RuleSpecError(f"Invalid expression '{text}': {e.msg}")
+    columns = set()
+
+    def build(node):
+        if isinstance(node, ast.Constant):
+            value = node.value
+            return lambda df: value
+        if isinstance(node, ast.Name):
+            name = node.id
+            columns.add(name)
+            return lambda df: df[name]
+        if isinstance(node, (ast.List, ast.Tuple)):
+            items = [build(item) for item in node.elts]
+            return lambda df: [item(df) for item in items]
+        if isinstance(node, ast.BinOp) and type(node.op) in _BINARY_OPERATORS:
+            op, left, right = _BINARY_OPERATORS[type(node.op)], build(node.left), build(node.right)
+            return lambda df: op(left(df), right(df))
+        if isinstance(node, ast.UnaryOp):
+            operand = build(node.operand)
+            if isinstance(node.op, ast.USub):
+                return lambda df: -operand(df)
+            if isinstance(node.op, ast.UAdd):
+                return operand
+            if isinstance(node.op, (ast.Not, ast.Invert)):
+                return lambda df: ~operand(df)
+        if isinstance(node, ast.BoolOp):
+            values = [build(value) for value in node.values]
+            op = operator.and_ if isinstance(node.op, ast.And) else operator.or_
+
+            def bool_op(df):
+                result = values[0](df)
+                for value in values[1:]:
+                    result = op(result, value(df))
+                return result
+            return bool_op
+        if isinstance(node, ast.Compare):
+            parts = [build(node.left)] + [build(comparator) for comparator in node.comparators]
+            ops = []
+            for op in node.ops:
+                if isinstance(op, (ast.In, ast.NotIn)):
+                    negate = isinstance(op, ast.NotIn)
+                    ops.append(lambda a, b, negate=negate: ~_series(a).isin(b) if negate else _series(a).isin(b))
+                elif type(op) in _COMPARE_OPERATORS:
+                    ops.append(_COMPARE_OPERATORS[type(op)])
+                else:
+                    raise RuleSpecError(f"Unsupported comparison in expression '{text}'")
+
+            def compare(df):
+                values = [part(df) for part in parts]
+                result = None
+                for op, left, right in zip(ops, values, values[1:]):
+                    current = op(left, right)
+                    result = current if result is None else result & current
+                return result
+            return compare
+        if isinstance(node, ast.IfExp):
+            test, body, orelse = build(node.test), build(node.body), build(node.orelse)
+            return lambda df: np.where(test(df), body(df), orelse(df))
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name):
+            name = node.func.id
+            if name == 'col' and len(node.args) == 1 and isinstance(node.args[0], ast.Constant):
+                column = node.args[0].value
+                columns.add(column)
+                return lambda df: df[column]
+            if name not in EXPRESSION_FUNCTIONS:
+                raise RuleSpecError(f"Unknown function '{name}' in expression '{text}'")
+            function = EXPRESSION_FUNCTIONS[name]
+            args = [build(arg) for arg in node.args]
+            kwargs = {keyword.arg: build(keyword.value) for keyword in node.keywords}
+            return lambda df: function(*[arg(df) for arg in args], **{k: v(df) for k, v in kwargs.items()})
+        raise RuleSpecError(f"Unsupported syntax in expression '{text}': {ast.dump(node)[:60]}")
+
+    return build(tree.body), columns
+
+class RuleStep:
+    """
+    Paso validado de una spec: columnas que lee (inputs), que crea o sobrescribe
+    (outputs) y que deja de existir (removed, p.ej. los orígenes de un rename)
+    """
+
+    def __init__(self, index, kind, name, options, inputs, outputs, removed=()):
+        self.index = index
+        self.kind = kind
+        self.name = name
+        self.options = options
+        self.inputs = set(inputs)
+        self.outputs = list(outputs)
+        self.removed = set(removed)
+
+    def __repr__(self):
+        return f"RuleStep({self.index}, {self.kind}, {self.name!r})"
+
+def _require(step, index, kind, *keys):
+    missing = [key for key in keys if key not in step]
+    if missing:
+        raise RuleSpecError(f"Rule spec step {index} ({kind}): missing {', '.join(missing)}")
+
+def _table_columns(tables_path, table):
+    """Columnas de una tabla auxiliar (desde el registro de tablas)"""
+    try:
+        return get_registry(tables_path).columns(table)
+    except TableError as e:
+        raise RuleSpecError(f"Lookup table not found: {e}") from e
+
+def _parse_step(index, step, tables_path):
+    """Validar un paso de la spec y resolver las columnas que lee y escribe"""
+    if not isinstance(step, dict) or step.get('kind') not in STEP_KINDS:
+        kind = step.get('kind') if isinstance(step, dict) else step
+        raise RuleSpecError(f"Rule spec step {index}: unknown kind '{kind}' (expected one of {', '.join(STEP_KINDS)})")
+    if True in step:
+        # YAML 1.1 lee la clave 'on' sin comillas como booleano
+        step = {('on' if key is True else key): value for key, value in step.items()}
+    kind = step['kind']
+    name = step.get('name')
+
+    if kind == 'rename':
+        _require(step, index, kind, 'columns')
+        columns = dict(step['columns'])
+        return RuleStep(index, kind, name or f"Column renaming ({len(columns)} columns)", {'columns': columns},
+                        columns.keys(), columns.values(), set(columns) - set(columns.values()))
+
+    if kind == 'map':
+        _require(step, index, kind, 'column', 'values')
+        source = step.get('source', step['column'])
+        options = {'column': step['column'], 'source': source, 'values': dict(step['values'])}
+        if 'default' in step:
+            options['default'] = step['default']
+        return RuleStep(index, kind, name or f"{step['column']} value mapping", options, [source], [step['column']])
+
+    if kind == 'lookup':
+        _require(step, index, kind, 'table')
+        if 'on' in step:
+            left_on = right_on = step['on']
+        else:
+            _require(step, index, kind, 'left_on', 'right_on')
+            left_on, right_on = step['left_on'], step['right_on']
+        table_columns = _table_columns(tables_path, step['table'])
+        if right_on not in table_columns:
+            raise RuleSpecError(f"Rule spec step {index} (lookup): key '{right_on}' not in {step['table']}")
+        columns = step.get('columns') or [col for col in table_columns if col != right_on]
+        unknown = [col for col in columns if col not in table_columns]
+        if unknown:
+            raise RuleSpecError(f"Rule spec step {index} (lookup): {', '.join(unknown)} not in {step['table']}")
+        registry = get_registry(tables_path)
+        # Con claves repetidas en la tabla el left join multiplica filas: el paso nunca se elimina
+        unique_key = registry.is_unique(step['table'], right_on)
+        # Clave única: lookup indexado (solo las columnas pedidas). Si no, el merge conserva
+        # también la clave de la tabla cuando las claves son distintas
+        outputs = ([right_on] if right_on != left_on and not unique_key else []) + list(columns)
+        options = {'table': step['table'], 'left_on': left_on, 'right_on': right_on, 'columns': list(columns),
+                   'cost': os.path.getsize(registry.path(step['table'])), 'unique_key': unique_key}
+        return RuleStep(index, kind, name or f"{', '.join(columns)} lookup ({step['table']})", options, [left_on], outputs)
+
+    if kind == 'derive':
+        _require(step, index, kind, 'column', 'expr')
+        function, columns = _compile_expression(step['expr'])
+        options = {'column': step['column'], 'expr': step['expr'], 'function': function}
+        return RuleStep(index, kind, name or f"{step['column']} derivation", options, columns, [step['column']])
+
+    if kind == 'bin':
+        _require(step, index, kind, 'column', 'source')
+        if 'quantiles' not in step:
+            _require(step, index, kind, 'bins')
+        options = {key: step[key] for key in ('column', 'source', 'bins', 'labels', 'quantiles', 'right') if key in step}
+        if 'bins' in options:
+            options['bins'] = [float(edge) for edge in options['bins']]  # Admite "inf" / "-inf"
+        return RuleStep(index, kind, name or f"{step['column']} binning", options, [step['source']], [step['column']])
+
+    if kind == 'group_stat':
+        _require(step, index, kind, 'column', 'source', 'by', 'stat')
+        if step['stat'] not in GROUP_STATS:
+            raise RuleSpecError(f"Rule spec step {index} (group_stat): unknown stat '{step['stat']}' "
+                                f"(expected one of {', '.join(GROUP_STATS)})")
+        by = [step['by']] if isinstance(step['by'], str) else list(step['by'])
+        options = {'column': step['column'], 'source': step['source'], 'by': by, 'stat': step['stat'],
+                   'method': step.get('method', 'average'), 'ascending': step.get('ascending', True)}
+        return RuleStep(index, kind, name or f"{step['column']} ({step['stat']} by {', '.join(by)})",
+                        options, [step['source']] + by, [step['column']])
+
+    if kind == 'validate':
+        _require(step, index, kind, 'columns', 'checks')
+        checks = [step['checks']] if isinstance(step['checks'], str) else list(step['checks'])
+        unknown = [check for check in checks if check not in VALIDATION_CHECKS]
+        if unknown:
+            raise RuleSpecError(f"Rule spec step {index} (validate): unknown check(s) {', '.join(unknown)} "
+                                f"(expected {', '.join(VALIDATION_CHECKS)})")
+        columns = list(step['columns'])
+        return RuleStep(index, kind, name or f"Validation ({', '.join(checks)})",
+                        {'columns': columns, 'checks': checks}, columns, [])
+
+    _require(step, index, kind, 'columns')
+    columns = list(step['columns'])
+    return RuleStep(index, kind, name or "Output column selection", {'columns': columns}, columns, columns)
+
+def load_rule_spec(path):
+    """Leer una spec de reglas YAML o JSON: lista de pasos o dict con 'steps'"""
+    with open(path, encoding='utf-8') as f:
+        if os.path.splitext(path)[-1].lower() == '.json':
+            spec = json.load(f)
+        else:
+            import yaml
+            spec = yaml.safe_load(f)
+    steps = spec.get('steps') if isinstance(spec, dict) else spec
+    if not isinstance(steps, list) or not steps:
+        raise RuleSpecError(f"Rule spec without steps: {path}")
+    return steps
+
+def parse_rule_spec(steps, tables_path):
+    """Validar los pasos de una spec y devolverlos como RuleStep"""
+    return [_parse_step(index, step, tables_path) for index, step in enumerate(steps, start=1)]
+
+class PlanStep:
+    """Paso del plan de ejecución: uno o varios RuleStep fusionados que se ejecutan juntos"""
+
+    def __init__(self, kind, steps, run, description=None):
+        self.kind = kind
+        self.steps = steps
+        self.run = run
+        self.description = description or " + ".join(step.name for step in steps)
+
+def _independent(group, step):
+    """Si *step* no lee ni pisa columnas escritas por los pasos de *group*"""
+    written = {col for other in group for col in other.outputs}
+    return not (step.inputs & written) and not (set(step.outputs) & written)
+
+def aggregates_rows(step):
+    """True si el resultado del paso depende de otras filas: group_stat, bin por cuantiles o derive con mean/std/quantile"""
+    if step.kind == 'group_stat':
+        return True
+    if step.kind == 'bin':
+        return 'quantiles' in step.options
+    if step.kind == 'derive':
+        tree = ast.parse(str(step.options['expr']), mode='eval')
+        return any(isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in AGGREGATE_FUNCTIONS
+                   for node in ast.walk(tree))
+    return False
+
+def _run_rename(mapping):
+    def run(df, context):
+        # En el sitio: el plan trabaja sobre su propia copia superficial del input, sin copiar datos
+        df.rename(columns=mapping, inplace=True)
+        return df
+    return run
+
+def _run_maps(steps):
+    def run(df, context):
+        # Todas las columnas se calculan sobre el DataFrame de entrada y se asignan juntas
+        mapped = {}
+        for step in steps:
+            options = step.options
+            values = df[options['source']].map(options['values'])
+            if 'default' in options:
+                values = values.where(df[options['source']].isin(options['values'].keys()), options['default'])
+            mapped[options['column']] = values
+        for column, values in mapped.items():
+            df[column] = values
+        return df
+    return run
+
+def _run_lookups(steps, restore_order):
+    # Lookups independientes: primero las tablas más baratas (menor tamaño)
+    ordered = sorted(steps, key=lambda step: step.options['cost'])
+
+    def run(df, context):
+        expected = list(df.columns)
+        for step in steps:
+            expected += [col for col in step.outputs if col not in expected]
+        for step in ordered:
+            options = step.options
+            columns = [col for col in options['columns'] if col != options['right_on']]
+            # Las columnas de la tabla que ya existen se sobrescriben (sin sufijos _x/_y)
+            overlap = [col for col in step.outputs if col in df.columns and col != options['left_on']]
+            if overlap:
+                df = df.drop(columns=overlap)
+            if options['unique_key']:
+                df = context.registry.lookup(df, options['table'], options['left_on'], options['right_on'],
+                                             columns, context.audit)
+                continue
+            table = context.table(options['table'], options['right_on'], unique=False)
+            table = table[[options['right_on']] + columns]
+            df = df.merge(table, how='left', left_on=options['left_on'], right_on=options['right_on'])
+        if restore_order and list(df.columns) != expected:
+            df = df[expected]
+        return df
+    return run
+
+def _run_derive(step):
+    column, function = step.options['column'], step.options['function']
+
+    def run(df, context):
+        result = function(df)
+        if isinstance(result, pd.Series) and not result.index.equals(df.index):
+            # Series creadas desde arrays (float(), int(), fillna()) traen un RangeIndex propio:
+            # se asignan por posición, no alineando por índice (chunks con índice desplazado)
+            result = result.to_numpy()
+        df[column] = result
+        return df
+    return run
+
+def _run_bin(step):
+    options = step.options
+
+    def run(df, context):
+        if 'quantiles' in options:
+            df[options['column']] = pd.qcut(df[options['source']], q=options['quantiles'],
+                                            labels=options.get('labels'), duplicates='drop')
+        else:
+            df[options['column']] = pd.cut(df[options['source']], bins=options['bins'],
+                                           labels=options.get('labels'), right=options.get('right', True))
+        return df
+    return run
+
+def _run_group_stats(steps):
+    by = steps[0].options['by']
+
+    def run(df, context):
+        # Un único groupby para todas las estadísticas con las mismas claves
+        grouped = df.groupby(by, observed=True, sort=False)
+        results = {}
+        for step in steps:
+            options = step.options
+            if options['stat'] == 'rank':
+                results[options['column']] = grouped[options['source']].rank(method=options['method'],
+                                                                             ascending=options['ascending'])
+            else:
+                results[options['column']] = grouped[options['source']].transform(options['stat'])
+        for column, values in results.items():
+            df[column] = values
+        return df
+    return run
+
+def _run_validate(step):
+    columns, checks = step.options['columns'], step.options['checks']
+
+    def run(df, context):
+        passed = True
+        for check in checks:
+            if check == 'not_null':
+                nulls = int(df[columns].isnull().sum().sum())
+                if nulls:
+                    context.logger.warning(f"{nulls} null values in {', '.join(columns)}")
+                    passed = False
+            elif check == 'non_negative':
+                for col in columns:
+                    if (df[col] < 0).any():
+                        context.logger.warning(f"Negative values in {col}")
+                        passed = False
+            else:
+                for col in columns:
+                    duplicates = int(df[col].duplicated().sum())
+                    if duplicates:
+                        context.logger.warning(f"{duplicates} duplicated values in {col}")
+                        passed = False
+        if not passed:
+            context.logger.warning(f"{step.name}: some validations failed - review data quality")
+        return df
+    return run
+
+def _run_select(columns):
+    # Con Copy-on-Write la selección es perezosa: comparte las columnas hasta que se modifiquen
+    return lambda df, context: df[columns]
+
+def _fuse_renames(steps):
+    """Componer renames consecutivos en un único mapping (A→B, B→C queda A→C)"""
+    mapping = {}
+    for step in steps:
+        for old, new in step.options['columns'].items():
+            sources = [src for src, dst in mapping.items() if dst == old]
+            if sources:
+                for src in sources:
+                    mapping[src] = new
+            else:
+                mapping[old] = new
+    return {old: new for old, new in mapping.items() if old != new}
+
+def build_plan(steps):
+    """
+    Compilar los RuleStep de una spec a un plan de ejecución
+
+    Returns:
+        list: PlanStep en orden de ejecución
+    """
+    plan = []
+    runs = []
+    # Pasos consecutivos agrupables: renames (siempre), maps/lookups independientes y group_stats con las mismas claves
+    for step in steps:
+        last = runs[-1] if runs else None
+        joinable = last is not None and last[0].kind == step.kind and (
+            step.kind == 'rename'
+            or (step.kind in ('map', 'lookup') and _independent(last, step))
+            or (step.kind == 'group_stat' and step.options['by'] == last[0].options['by'] and _independent(last, step))
+        )
+        if joinable:
+            last.append(step)
+        else:
+            runs.append([step])
+
+    has_select = [False] * len(runs)
+    seen_select = False
+    for position in range(len(runs) - 1, -1, -1):
+        has_select[position] = seen_select
+        seen_select = seen_select or runs[position][0].kind == 'select'
+
+    for position, run in enumerate(runs):
+        kind = run[0].kind
+        if kind == 'rename':
+            mapping = _fuse_renames(run)
+            description = run[0].name if len(run) == 1 else f"Column renaming ({len(mapping)} columns, {len(run)} steps fused)"
+            plan.append(PlanStep(kind, run, _run_rename(mapping), description))
+        elif kind == 'map':
+            plan.append(PlanStep(kind, run, _run_maps(run)))
+        elif kind == 'lookup':
+            # Si un select posterior fija el orden de columnas no hace falta restaurarlo tras reordenar
+            plan.append(PlanStep(kind, run, _run_lookups(run, restore_order=not has_select[position])))
+        elif kind == 'group_stat':
+            plan.append(PlanStep(kind, run, _run_group_stats(run)))
+        elif kind == 'derive':
+            plan.append(PlanStep(kind, run, _run_derive(run[0])))
+        elif kind == 'bin':
+            plan.append(PlanStep(kind, run, _run_bin(run[0])))
+        elif kind == 'validate':
+            plan.append(PlanStep(kind, run, _run_validate(run[0])))
+        else:
+            plan.append(PlanStep(kind, run, _run_select(run[0].options['columns'])))
+    return plan
+
+def dependency_graph(steps):
+    """
+    Grafo de dependencias por columnas: cada paso depende del último paso anterior que escribió cada columna que lee
+
+    Returns:
+        tuple: (dict índice -> set de índices de los que depende, dict columna -> último paso que la escribe)
+    """
+    writers, graph = {}, {}
+    for step in steps:
+        graph[step.index] = {writers[col].index for col in step.inputs if col in writers}
+        for col in step.removed:
+            writers.pop(col, None)
+        for col in step.outputs:
+            writers[col] = step
+    return graph, writers
+
+def prune_dead_steps(steps):
+    """
+    Eliminar los pasos cuyas columnas no llegan al select final ni a una validación
+
+    Se recorre el grafo de dependencias hacia atrás desde los sumideros: los select y
+    validate, los lookups que pueden multiplicar filas y, si la spec no termina en un
+    select, los últimos escritores de todas las columnas.
+
+    Returns:
+        tuple: (pasos vivos en orden, pasos eliminados en orden)
+    """
+    graph, writers = dependency_graph(steps)
+    sinks = {step.index for step in steps
+             if step.kind in ('select', 'validate') or (step.kind == 'lookup' and not step.options['unique_key'])}
+    if not any(step.kind == 'select' for step in steps):
+        sinks |= {step.index for step in writers.values()}
+
+    live, pending = set(), list(sinks)
+    while pending:
+        index = pending.pop()
+        if index not in live:
+            live.add(index)
+            pending.extend(graph[index])
+    return [step for step in steps if step.index in live], [step for step in steps if step.index not in live]
+
+def plan_input_columns(steps):
+    """Columnas de input que lee la spec: las referenciadas antes de que un paso las cree"""
+    produced, needed = set(), set()
+    for step in steps:
+        needed |= step.inputs - produced
+        produced |= set(step.outputs)
+        produced -= step.removed
+    return needed
+
+class ExecutionContext:
+    """Estado de ejecución de un plan: tablas auxiliares servidas por el registro del proceso"""
+
+    def __init__(self, tables_path, logger=None, audit=None):
+        self.tables_path = tables_path
+        self.logger = logger
+        self.audit = audit
+        self.registry = get_registry(tables_path)
+
+    def table(self, name, key=None, unique=True):
+        return self.registry.get(name, key, unique)
+
+class CompiledRules:
+    """Spec de reglas compilada: pasos validados, pasos eliminados, plan de ejecución y tablas auxiliares"""
+
+    def __init__(self, path, tables_path, prune=True):
+        start = time.perf_counter()
+        self.path = path
+        self.all_steps = parse_rule_spec(load_rule_spec(path), tables_path)
+        if prune:
+            self.steps, self.pruned = prune_dead_steps(self.all_steps)
+        else:
+            self.steps, self.pruned = self.all_steps, []
+        self.plan = build_plan(self.steps)
+        self.input_columns = plan_input_columns(self.steps)
+        # Pasos que agregan sobre filas: por chunks darían un resultado distinto que en bloque
+        self.aggregate_steps = [step for step in self.steps if aggregates_rows(step)]
+        self.context = ExecutionContext(tables_path)
+        self.compile_seconds = time.perf_counter() - start
+        self._pruning_logged = False
+
+    def _time_steps(self, sample):
+        """Segundos de cada paso eliminado ejecutando todos los pasos, uno a uno, sobre *sample*"""
+        pruned = {step.index for step in self.pruned}
+        sample = sample.copy(deep=False)
+        # Contexto propio: las muestras no se registran en el audit
+        context = ExecutionContext(self.context.tables_path)
+        seconds = {}
+        for step in self.all_steps:
+            if step.kind == 'validate':
+                continue
+            run = build_plan([step])[0].run
+            start = time.perf_counter()
+            try:
+                sample = run(sample, context)
+            except KeyError:
+                # Columnas que solo leen pasos eliminados no se leen del input (proyección)
+                if step.index in pruned:
+                    seconds[step.index] = None
+                continue
+            if step.index in pruned:
+                seconds[step.index] = time.perf_counter() - start
+        return seconds
+
+    def estimate_pruned_seconds(self, df):
+        """
+        Estimar el tiempo que costarían los pasos eliminados sobre *df*
+
+        Se ejecutan todos los pasos de la spec sobre dos muestras (PRUNE_SAMPLE_ROWS
+        filas y un cuarto) y se extrapola linealmente al total de filas, separando el
+        coste fijo de cada paso del coste por fila.
+
+        Returns:
+            dict: índice del paso eliminado -> segundos estimados (None si no se puede ejecutar)
+        """
+        if len(df) <= PRUNE_SAMPLE_ROWS:
+            return self._time_steps(df)
+        small_rows = PRUNE_SAMPLE_ROWS // 4
+        small = self._time_steps(df.iloc[:small_rows])
+        large = self._time_steps(df.iloc[:PRUNE_SAMPLE_ROWS])
+        estimates = {}
+        for index, seconds in large.items():
+            if seconds is None or small[index] is None:
+                estimates[index] = None
+                continue
+            per_row = max(0.0, seconds - small[index]) / (PRUNE_SAMPLE_ROWS - small_rows)
+            estimates[index] = seconds + per_row * (len(df) - PRUNE_SAMPLE_ROWS)
+        return estimates
+
+    def _log_pruning(self, logger, audit=None):
+        """Registrar una vez por ejecución los pasos eliminados (sin estimar su tiempo)"""
+        self._pruning_logged = True
+        if not self.pruned:
+            return
+        names = ', '.join(step.name for step in self.pruned)
+        logger.info(f"Dead steps pruned ({len(self.pruned)}): {names}")
+        if audit:
+            audit.log_pruned_steps([(step.name, step.outputs) for step in self.pruned])
+
+    def log_pruned_estimate(self, df, audit):
+        """
+        Registrar en el audit el tiempo estimado de los pasos eliminados sobre *df*
+
+        Vuelve a ejecutar los pasos sobre muestras: se llama fuera de la fase de
+        transformaciones medida y solo si se pide ('estimate_pruned_time').
+        """
+        if not self.pruned:
+            return
+        estimates = self.estimate_pruned_seconds(df)
+        audit.log_pruned_estimate([(step.name, estimates[step.index]) for step in self.pruned], len(df))
+
+    def execute(self, df, logger, audit=None):
+        """Ejecutar el plan sobre *df* (el DataFrame de entrada no se modifica)"""
+        self.context.logger = logger
+        self.context.audit = audit
+        if not self._pruning_logged:
+            self._log_pruning(logger, audit)
+        df = df.copy(deep=False)
+        for plan_step in self.plan:
+            with tracked_step(audit, plan_step.description, lambda: df):
+                df = plan_step.run(df, self.context)
+            logger.success(f"{plan_step.description} done")
+        return df
+
+_COMPILED = {}
+
+def compile_rules(path, tables_path, prune=True):
+    """Compilar (o reutilizar) la spec de *path*; se recompila si el archivo cambia"""
+    key = (os.path.abspath(path), os.path.getmtime(path), os.path.abspath(tables_path), prune)
+    if key not in _COMPILED:
+        _COMPILED[key] = CompiledRules(path, tables_path, prune)
+    return _COMPILED[key]
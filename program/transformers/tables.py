@@ -0,0 +1,319 @@
+"""
+Registro de tablas auxiliares (tables_path): cada tabla se carga una vez por proceso
+
+Las tablas se piden por nombre ('tariff_map' o 'tariff_map.csv'). La primera carga
+parsea el CSV (sin BOM en los nombres de columna) y guarda una caché binaria en
+'<tables_path>/.table_cache/<tabla>.<hash>.feather' (pickle si no hay pyarrow).
+La caché se identifica por el hash del contenido del CSV; el índice de la caché
+guarda tamaño y mtime de cada tabla para no recalcular el hash si no han cambiado.
+
+lookup() sustituye a df.merge(tabla, how='left') para tablas de dimensión con clave
+única: resuelve la posición de cada clave con un índice hash (o con los códigos si la
+columna es categórica) y añade solo las columnas pedidas por take posicional.
+"""
+import glob
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+CACHE_DIR = ".table_cache"
+CACHE_INDEX = "index.json"
+TABLE_EXTENSIONS = (".csv",)
+
+class TableError(ValueError):
+    """Tabla auxiliar inexistente o con claves inválidas"""
+
+def _cache_format():
+    """Formato de la caché binaria: Feather si pyarrow está disponible, si no pickle"""
+    try:
+        import pyarrow  # noqa: F401
+        return "feather"
+    except ImportError:
+        return "pkl"
+
+def _file_hash(path):
+    """Hash SHA-1 del contenido de un archivo, leído por bloques"""
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _clean_columns(df):
+    """Quitar BOM y espacios de los nombres de columna"""
+    df.columns = [str(col).lstrip("\ufeff").strip() for col in df.columns]
+    return df
+
+class TableRegistry:
+    """Tablas auxiliares de un directorio, cargadas una vez y servidas desde memoria"""
+
+    def __init__(self, tables_path, cache=True):
+        self.tables_path = os.path.abspath(tables_path)
+        self.cache = cache
+        self.cache_dir = os.path.join(self.tables_path, CACHE_DIR)
+        self._tables = {}
+        self._loads = {}  # nombre -> (origen, segundos, filas)
+        self._checked_keys = set()
+        self._indexes = {}  # (nombre, clave) -> pandas.Index de la clave
+
+    def _file_name(self, name):
+        return name if os.path.splitext(name)[-1].lower() in TABLE_EXTENSIONS else name + ".csv"
+
+    def names(self):
+        """Nombres de archivo de las tablas disponibles, ordenados"""
+        paths = []
+        for ext in TABLE_EXTENSIONS:
+            paths += glob.glob(os.path.join(glob.escape(self.tables_path), f"*{ext}"))
+        return sorted(os.path.basename(path) for path in paths)
+
+    def path(self, name):
+        """Ruta del CSV de una tabla"""
+        path = os.path.join(self.tables_path, self._file_name(name))
+        if not os.path.exists(path):
+            raise TableError(f"Table not found: {path}")
+        return path
+
+    def _read_index(self):
+        try:
+            with open(os.path.join(self.cache_dir, CACHE_INDEX), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_index(self, index):
+        tmp_path = os.path.join(self.cache_dir, CACHE_INDEX + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(index, f, indent=2)
+        os.replace(tmp_path, os.path.join(self.cache_dir, CACHE_INDEX))
+
+    def _remove_stale(self, file_name, keep):
+        """Eliminar las cachés de versiones anteriores de la misma tabla"""
+        for cached in glob.glob(os.path.join(glob.escape(self.cache_dir), f"{glob.escape(file_name)}.*")):
+            if cached != keep:
+                try:
+                    os.remove(cached)
+                except OSError:
+                    pass
+
+    def _load(self, name):
+        """Cargar una tabla desde la caché binaria o, si no es válida, desde el CSV"""
+        file_name = self._file_name(name)
+        path = self.path(file_name)
+        if not self.cache:
+            return _clean_columns(pd.read_csv(path)), "csv"
+
+        # El hash del contenido solo se recalcula si cambian tamaño o mtime
+        stat = os.stat(path)
+        index = self._read_index()
+        entry = index.get(file_name)
+        if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            content_hash = entry["hash"]
+        else:
+            content_hash = _file_hash(path)
+
+        cache_format = _cache_format()
+        cached = os.path.join(self.cache_dir, f"{file_name}.{content_hash[:16]}.{cache_format}")
+        if os.path.exists(cached):
+            df = pd.read_feather(cached) if cache_format == "feather" else pd.read_pickle(cached)
+            source = "cache"
+        else:
+            df = _clean_columns(pd.read_csv(path))
+            source = "csv"
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                tmp_path = cached + ".tmp"
+                if cache_format == "feather":
+                    df.to_feather(tmp_path)
+                else:
+                    df.to_pickle(tmp_path)
+                os.replace(tmp_path, cached)
+                self._remove_stale(file_name, keep=cached)
+            except Exception:
+                # Directorio de solo lectura o columnas no serializables: se sigue sin caché
+                if os.path.exists(cached + ".tmp"):
+                    os.remove(cached + ".tmp")
+                return df, source
+
+        if not entry or entry["hash"] != content_hash or entry["mtime_ns"] != stat.st_mtime_ns:
+            index[file_name] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "hash": content_hash}
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                self._write_index(index)
+            except OSError:
+                pass
+        return df, source
+
+    def _refresh(self, file_name):
+        """Descartar de memoria una tabla cuyo CSV ha cambiado desde que se cargó"""
+        loaded = self._loads.get(file_name)
+        if loaded and loaded[3] != os.stat(self.path(file_name)).st_mtime_ns:
+            self._tables.pop(file_name, None)
+            self._checked_keys = {key for key in self._checked_keys if key[0] != file_name}
+            self._indexes = {key: index for key, index in self._indexes.items() if key[0] != file_name}
+
+    def get(self, name, key=None, unique=True):
+        """
+        Tabla por nombre (se carga la primera vez y se sirve desde memoria después)
+
+        Args:
+            name (str): Nombre de la tabla, con o sin extensión
+            key (str|list, optional): Columna(s) clave a validar: deben existir y no tener nulos
+            unique (bool): Exigir además que la clave no tenga duplicados
+
+        Returns:
+            pandas.DataFrame: la tabla (compartida: no modificar en el sitio)
+        """
+        file_name = self._file_name(name)
+        self._refresh(file_name)
+        if file_name not in self._tables:
+            start = time.perf_counter()
+            df, source = self._load(file_name)
+            self._tables[file_name] = df
+            self._loads[file_name] = (source, time.perf_counter() - start, len(df),
+                                      os.stat(self.path(file_name)).st_mtime_ns)
+        df = self._tables[file_name]
+        if key is not None:
+            self.validate_key(file_name, key, unique)
+        return df
+
+    def columns(self, name):
+        """Columnas de una tabla"""
+        return list(self.get(name).columns)
+
+    def validate_key(self, name, key, unique=True):
+        """Comprobar que la clave existe en la tabla, sin nulos y (si unique) sin duplicados"""
+        file_name = self._file_name(name)
+        keys = [key] if isinstance(key, str) else list(key)
+        if (file_name, tuple(keys), unique) in self._checked_keys:
+            return
+        df = self._tables[file_name] if file_name in self._tables else self.get(file_name)
+        missing = [col for col in keys if col not in df.columns]
+        if missing:
+            raise TableError(f"Key column(s) {', '.join(missing)} not in table {file_name} "
+                             f"(columns: {', '.join(map(str, df.columns))})")
+        nulls = int(df[keys].isnull().any(axis=1).sum())
+        if nulls:
+            raise TableError(f"Table {file_name}: {nulls} row(s) with null key {', '.join(keys)}")
+        if unique:
+            duplicates = int(df.duplicated(subset=keys).sum())
+            if duplicates:
+                raise TableError(f"Table {file_name}: {duplicates} duplicated key value(s) in {', '.join(keys)}")
+        self._checked_keys.add((file_name, tuple(keys), unique))
+
+    def is_unique(self, name, key):
+        """Si la clave de una tabla no tiene duplicados"""
+        keys = [key] if isinstance(key, str) else list(key)
+        return not self.get(name).duplicated(subset=keys).any()
+
+    def key_index(self, name, key):
+        """Índice hash de la clave (única) de una tabla, construido una vez"""
+        file_name = self._file_name(name)
+        table = self.get(file_name, key=key)
+        if (file_name, key) not in self._indexes:
+            self._indexes[(file_name, key)] = pd.Index(table[key])
+        return self._indexes[(file_name, key)]
+
+    def lookup(self, df, name, left_on, right_on=None, columns=None, audit=None):
+        """
+        Left join de *df* con una tabla de clave única sin copiar *df* (ver lookup())
+
+        Args:
+            df (pandas.DataFrame): Datos; las columnas se añaden en el sitio
+            name (str): Nombre de la tabla
+            left_on (str): Columna clave en df
+            right_on (str, optional): Columna clave en la tabla (por defecto left_on)
+            columns (list, optional): Columnas de la tabla a añadir (por defecto todas salvo la clave)
+            audit (AuditLogger, optional): Registrar las claves sin correspondencia
+
+        Returns:
+            pandas.DataFrame: df con las columnas añadidas
+        """
+        file_name = self._file_name(name)
+        right_on = right_on or left_on
+        index = self.key_index(file_name, right_on)
+        table = self.get(file_name)
+        return lookup(df, table, left_on, right_on, columns, index=index, name=file_name, audit=audit)
+
+    def load_info(self):
+        """Tablas cargadas: nombre -> (origen 'cache'/'csv', segundos de carga, filas)"""
+        return {name: info[:3] for name, info in self._loads.items()}
+
+    def log(self, audit):
+        """Registrar en el audit el origen y el tiempo de carga de cada tabla"""
+        if not audit:
+            return
+        for name, (source, seconds, rows) in self.load_info().items():
+            audit.log_transformation(f"Table {name}: {rows:,} rows from {source}", seconds)
+
+def _key_positions(index, keys):
+    """Posición en la tabla de cada clave de *keys* (-1 si no existe)"""
+    if isinstance(keys.dtype, pd.CategoricalDtype):
+        # Solo se resuelven las categorías; cada fila toma la posición por su código
+        category_positions = index.get_indexer(keys.cat.categories)
+        codes = keys.cat.codes.to_numpy()
+        return np.where(codes >= 0, category_positions.take(codes), -1)
+    return index.get_indexer(keys)
+
+def lookup(df, table, left_on, right_on=None, columns=None, index=None, name=None, audit=None):
+    """
+    Equivalente a df.merge(table, how='left', left_on=..., right_on=...) para tablas de
+    clave única, sin copiar df: las columnas de la tabla se añaden por take posicional.
+    Las claves sin correspondencia quedan como NaN (con los mismos dtypes que el merge).
+    A diferencia del merge, no se añade la columna clave de la tabla, se conserva el
+    índice de df y las columnas que ya existen en df se sobrescriben. Como en el merge,
+    una clave categórica pasa al dtype de sus categorías.
+
+    Args:
+        df (pandas.DataFrame): Datos; las columnas se añaden en el sitio
+        table (pandas.DataFrame): Tabla de dimensión
+        left_on (str): Columna clave en df
+        right_on (str, optional): Columna clave en la tabla (por defecto left_on)
+        columns (list, optional): Columnas de la tabla a añadir (por defecto todas salvo la clave)
+        index (pandas.Index, optional): Índice de la clave ya construido
+        name (str, optional): Nombre de la tabla para el audit
+        audit (AuditLogger, optional): Registrar las claves sin correspondencia
+
+    Returns:
+        pandas.DataFrame: df con las columnas añadidas
+    """
+    right_on = right_on or left_on
+    if columns is None:
+        columns = [col for col in table.columns if col != right_on]
+    if index is None:
+        index = pd.Index(table[right_on])
+    if not index.is_unique:
+        raise TableError(f"Lookup on {name or 'table'}: key {right_on} is not unique")
+    keys = df[left_on]
+    key_dtype = keys.cat.categories.dtype if isinstance(keys.dtype, pd.CategoricalDtype) else keys.dtype
+    if pd.api.types.is_numeric_dtype(key_dtype) != pd.api.types.is_numeric_dtype(index.dtype):
+        # Mismo error que daría el merge en lugar de no encontrar ninguna clave
+        raise TableError(f"Lookup on {name or 'table'}: key {left_on} ({key_dtype}) "
+                         f"and {right_on} ({index.dtype}) have incompatible types")
+
+    positions = _key_positions(index, keys)
+    unmatched = int((positions < 0).sum())
+    if isinstance(keys.dtype, pd.CategoricalDtype) and not isinstance(index.dtype, pd.CategoricalDtype):
+        # El merge convierte la clave categórica al dtype de sus categorías
+        df[left_on] = keys.astype(key_dtype)
+    for col in columns:
+        # take con allow_fill: -1 -> NaN y promoción de dtype igual que el left join
+        source = table[col]
+        source = source.array if isinstance(source.dtype, pd.api.extensions.ExtensionDtype) else source.to_numpy()
+        values = pd.api.extensions.take(source, positions, allow_fill=True)
+        df[col] = pd.Series(values, index=df.index, name=col)
+    if audit:
+        audit.log_lookup(name or right_on, left_on, len(df), unmatched)
+    return df
+
+_REGISTRIES = {}
+
+def get_registry(tables_path, cache=True):
+    """Registro de tablas del proceso para *tables_path* (uno por directorio)"""
+    key = (os.path.abspath(tables_path), cache)
+    if key not in _REGISTRIES:
+        _REGISTRIES[key] = TableRegistry(tables_path, cache)
+    return _REGISTRIES[key]
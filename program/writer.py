@@ -1,21 +1,654 @@
+import json
 import os
+import re
+import shutil
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Iterable, Optional, Union
+import numpy as np
 import pandas as pd
 import pandas.api.types as ptypes
 
-def _get_variable_type(series: pd.Series) -> str:
-    """Return encoded variable type according to custom MPF‐style rules."""
-    if ptypes.is_integer_dtype(series):
+def _dtype_kind(dtype) -> str:
+    """Return the MPF variable kind of a column of *dtype*: "I", "N", "T" (text) or "NA"."""
+    if ptypes.is_integer_dtype(dtype):
         return "I"
-    if ptypes.is_float_dtype(series):
+    if ptypes.is_float_dtype(dtype):
         return "N"
-    if ptypes.is_object_dtype(series):
-        max_len = series.dropna().astype(str).str.len().max()
-        return f"T{max_len}"
+    if ptypes.is_object_dtype(dtype):
+        return "T"
     return "NA"
 
-def write_rpt(df: pd.DataFrame, output_path: str) -> None:
+def _variable_kind(series: pd.Series) -> str:
+    """Return the MPF variable kind of *series*: "I", "N", "T" (text) or "NA".
+
+    Ordered categoricals (pd.cut/pd.qcut bins) are typed "NA", as they always were
+    in the .rpt header. Unordered ones, such as columns declared 'category' in an
+    input schema, are typed by their categories, like the plain column they replace.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        if series.dtype.ordered:
+            return "NA"
+        return _dtype_kind(series.dtype.categories.dtype)
+    return _dtype_kind(series.dtype)
+
+def _text_width(series: pd.Series, formatted: np.ndarray, prefix: str = ",") -> Optional[int]:
+    """Return the longest non-null value of *series* as text, measured on its *formatted* strings."""
+    mask = series.notna().to_numpy()
+    if not mask.any():
+        return None
+    return int(np.fromiter(map(len, formatted[mask]), dtype=np.int64).max()) - len(prefix)
+
+class _RptTypeStats:
+    """Variable kinds and text widths of the .rpt columns, accumulated block by block.
+
+    Merging follows what concatenating the blocks would give: text wins, and
+    integer plus float becomes float.
+    """
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        self.kinds = [None] * len(self.columns)
+        self.widths = [None] * len(self.columns)
+
+    def update(self, i: int, series: pd.Series, formatted: np.ndarray) -> None:
+        kind = _variable_kind(series)
+        self._merge_column(i, kind, _text_width(series, formatted) if kind == "T" else None)
+
+    def merge(self, other: "_RptTypeStats") -> None:
+        """Fold the statistics of a later block (e.g. formatted in a worker process) into these."""
+        for i in range(len(self.columns)):
+            if other.kinds[i] is not None:
+                self._merge_column(i, other.kinds[i], other.widths[i])
+
+    def _merge_column(self, i: int, kind: str, width: Optional[int]) -> None:
+        current = self.kinds[i]
+        if current is None or current == kind:
+            self.kinds[i] = kind
+        elif "T" in (current, kind):
+            self.kinds[i] = "T"
+        elif {current, kind} == {"I", "N"}:
+            self.kinds[i] = "N"
+
+        if width is not None and (self.widths[i] is None or width > self.widths[i]):
+            self.widths[i] = width
+
+    def variable_type(self, i: int) -> str:
+        if self.kinds[i] != "T":
+            return self.kinds[i]
+        # No non-null values: the width is undefined, like max() of an empty Series
+        return f"T{self.widths[i] if self.widths[i] is not None else np.nan}"
+
+    def header_lines(self) -> list:
+        """Return the VARIABLE_TYPES and !1 header lines."""
+        types_line = ["VARIABLE_TYPES"] + [self.variable_type(i) for i in range(len(self.columns))]
+        header_line = ["!1"] + self.columns
+        return [",".join(types_line), ",".join(header_line)]
+
+# Rows formatted per block when writing (bounds the memory of the text lines)
+WRITE_BLOCK_ROWS = 100_000
+WRITE_BUFFER_BYTES = 1024 * 1024
+
+# Columns whose sampled distinct-value ratio is below this are formatted per unique value
+_FACTORIZE_MAX_RATIO = 0.5
+_FACTORIZE_SAMPLE = 10_000
+
+def _prefixed(values: np.ndarray, prefix: str) -> np.ndarray:
+    """Return *values* (an object array of str) with *prefix* prepended element-wise."""
+    return np.add(prefix, values, dtype=object)
+
+def _rpt_column_strings(series: pd.Series, prefix: str = ",") -> np.ndarray:
+    """Format *series* exactly like ``astype(str)`` as an object array of *prefix*-ed strings.
+
+    Categoricals are formatted once per category and expanded by code; low-cardinality
+    columns are factorized and formatted once per unique value. Floats holding -0.0 are
+    never factorized, since -0.0 and 0.0 hash equal but print differently.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        labels = _prefixed(pd.Series(series.cat.categories).astype(str).to_numpy(dtype=object), prefix)
+        # Code -1 (missing) takes the last slot, which holds the formatted NaN
+        labels = np.append(labels, prefix + str(np.nan))
+        return labels[series.cat.codes.to_numpy()]
+
+    values = series.to_numpy()
+    if len(values) > _FACTORIZE_SAMPLE and values.dtype.kind in "iufb":
+        sample = values[:: max(1, len(values) // _FACTORIZE_SAMPLE)]
+        low_cardinality = len(pd.unique(sample)) < _FACTORIZE_MAX_RATIO * len(sample)
+        has_negative_zero = values.dtype.kind == "f" and np.signbit(values[values == 0]).any()
+        if low_cardinality and not has_negative_zero:
+            codes, uniques = pd.factorize(values, use_na_sentinel=False)
+            labels = _prefixed(pd.Series(uniques, dtype=series.dtype).astype(str).to_numpy(dtype=object), prefix)
+            return labels[codes]
+
+    return _prefixed(series.astype(str).to_numpy(dtype=object), prefix)
+
+def _rpt_data_lines(df: pd.DataFrame, stats: Optional[_RptTypeStats] = None) -> list:
+    """Return the "*"-prefixed data lines for *df*, built column by column.
+
+    When *stats* is given, the header statistics are updated from the same formatted values.
+    """
+    lines = np.full(len(df), "*", dtype=object)
+    for i in range(df.shape[1]):
+        series = df.iloc[:, i]
+        formatted = _rpt_column_strings(series)
+        if stats is not None:
+            stats.update(i, series, formatted)
+        lines = np.add(lines, formatted, dtype=object)
+    return lines.tolist()
+
+def _encode(text: str) -> bytes:
+    """Encode *text* as the text-mode file writes used to (platform newlines, UTF-8)."""
+    if os.linesep != "\n":
+        text = text.replace("\n", os.linesep)
+    return text.encode("utf-8")
+
+def _format_rpt_block(block: pd.DataFrame) -> tuple:
+    """Format a block of .rpt rows; runs in-process or in a worker of the pool."""
+    start = time.perf_counter()
+    stats = _RptTypeStats(block.columns)
+    data = _encode("\n" + "\n".join(_rpt_data_lines(block, stats)))
+    return data, stats, len(block), time.perf_counter() - start, os.getpid()
+
+def _format_csv_block(block: pd.DataFrame) -> tuple:
+    """Format a block of .csv rows (no header); runs in-process or in a worker of the pool."""
+    start = time.perf_counter()
+    data = block.to_csv(index=False, header=False).encode("utf-8")
+    return data, None, len(block), time.perf_counter() - start, os.getpid()
+
+def _arrow_csv_array(series: pd.Series):
+    """Arrow array of *series* as the CSV writer should render it.
+
+    Integer columns go to Arrow as they are. Everything else (floats, text, bools,
+    datetimes, categoricals, mixed objects) is converted to the ``astype(str)`` text
+    to_csv writes, with missing values left null: Arrow would write integral floats
+    without ".0", bools as true/false and datetimes with nanoseconds.
+    """
+    import pyarrow as pa
+
+    if series.dtype.kind in "iu" and not isinstance(series.dtype, pd.CategoricalDtype):
+        return pa.array(series, from_pandas=True)
+    if series.dtype == np.float64:
+        text = series.to_numpy().astype(str).astype(object)
+    else:
+        text = series.astype(str).to_numpy(dtype=object)
+    missing = series.isna().to_numpy()
+    if missing.any():
+        text[missing] = None
+    return pa.array(text, type=pa.string())
+
+def _format_csv_block_arrow(block: pd.DataFrame) -> tuple:
+    """Format a block of .csv rows (no header) with the Arrow CSV writer.
+
+    Several times faster than to_csv. Columns other than integers are pre-formatted
+    as to_csv formats them, so the text matches the pandas engine byte for byte.
+    Arrow never quotes here: a block whose text needs quoting (delimiter, quotes or
+    line breaks), or that Arrow cannot convert, is formatted by the pandas engine.
+    So are single-column blocks, where to_csv quotes empty values ('""').
+    """
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+
+    if block.shape[1] < 2:
+        return _format_csv_block(block)
+    start = time.perf_counter()
+    try:
+        arrays = [_arrow_csv_array(block.iloc[:, i]) for i in range(block.shape[1])]
+        table = pa.Table.from_arrays(arrays, names=[str(i) for i in range(block.shape[1])])
+        sink = pa.BufferOutputStream()
+        pa_csv.write_csv(table, sink, pa_csv.WriteOptions(include_header=False, quoting_style="none"))
+    except pa.ArrowException:
+        return _format_csv_block(block)
+    data = sink.getvalue().to_pybytes()
+    if os.linesep != "\n":
+        data = data.replace(b"\n", os.linesep.encode("ascii"))
+    return data, None, len(block), time.perf_counter() - start, os.getpid()
+
+CSV_ENGINES = {"pandas": _format_csv_block, "pyarrow": _format_csv_block_arrow}
+
+def _csv_block_formatter(engine: str):
+    """Return the .csv block formatter of *engine* ("pandas" or "pyarrow")."""
+    engine = (engine or "pandas").lower()
+    if engine not in CSV_ENGINES:
+        raise ValueError(f"Unsupported CSV engine: {engine} (expected one of {', '.join(CSV_ENGINES)})")
+    if engine == "pyarrow":
+        try:
+            import pyarrow.csv  # noqa: F401
+        except ImportError:
+            return _format_csv_block  # Without pyarrow fall back to the pandas writer
+    return CSV_ENGINES[engine]
+
+COLUMN_FORMAT_KEYS = {"decimals", "integer", "date_format"}
+
+def apply_column_formats(df: pd.DataFrame, spec: Optional[dict]) -> pd.DataFrame:
+    """Apply a per-column output format *spec* to *df* before it is written.
+
+    *spec* maps column names to options: ``decimals`` (round a float column),
+    ``integer`` (cast to int64, or nullable Int64 when there are nulls) and
+    ``date_format`` (strftime a datetime column into text). The ``"*"`` entry is
+    the default for every float column without its own entry. Types are kept
+    numeric where possible, so the .rpt header and every output share the spec.
+    """
+    if not spec:
+        return df
+    default = spec.get("*") or {}
+    columns = {}
+    for column in df.columns:
+        options = spec.get(column)
+        if options is None and default and ptypes.is_float_dtype(df[column]):
+            options = default
+        if options:
+            columns[column] = options
+    for column, options in spec.items():
+        unknown = set(options or {}) - COLUMN_FORMAT_KEYS
+        if unknown:
+            raise ValueError(f"Unknown column format option(s) for {column}: {', '.join(sorted(unknown))}")
+    if not columns:
+        return df
+
+    df = df.copy(deep=False)
+    for column, options in columns.items():
+        series = df[column]
+        if options.get("date_format"):
+            if not ptypes.is_datetime64_any_dtype(series):
+                raise ValueError(f"date_format needs a datetime column: {column} is {series.dtype}")
+            df[column] = series.dt.strftime(options["date_format"])
+            continue
+        if not (ptypes.is_float_dtype(series) or ptypes.is_integer_dtype(series)):
+            raise ValueError(f"decimals/integer need a numeric column: {column} is {series.dtype}")
+        if options.get("integer"):
+            if ptypes.is_integer_dtype(series):
+                continue
+            rounded = series.round(0)
+            df[column] = rounded.astype("Int64") if rounded.isna().any() else rounded.astype(np.int64)
+        elif options.get("decimals") is not None and ptypes.is_float_dtype(series):
+            df[column] = series.round(int(options["decimals"]))
+    return df
+
+# Characters that make pandas/csv (QUOTE_MINIMAL) quote a field
+_CSV_SPECIAL = re.compile("[" + re.escape(',"' + os.linesep) + "]")
+
+def _csv_shareable(df: pd.DataFrame) -> bool:
+    """Whether the CSV text of *df* can be derived from its .rpt column strings."""
+    if df.shape[1] < 2:
+        return False  # A lone empty field is quoted by the csv module
+    for dtype in df.dtypes:
+        if isinstance(dtype, pd.CategoricalDtype):
+            continue
+        if dtype.kind not in "iubO" and dtype != np.float64:
+            return False
+    return True
+
+def _csv_quote(values: pd.Series) -> pd.Series:
+    """Quote the str *values* that need it, as csv.QUOTE_MINIMAL does."""
+    needs = values.str.contains(_CSV_SPECIAL)
+    if not needs.any():
+        return values
+    quoted = '"' + values.str.replace('"', '""', regex=False) + '"'
+    return values.where(~needs, quoted)
+
+def _csv_column_strings(series: pd.Series, formatted: np.ndarray, prefix: str = ",") -> np.ndarray:
+    """Derive the *prefix*-ed CSV strings of *series* from its .rpt *formatted* strings.
+
+    Missing values become empty fields and text that contains the delimiter, quotes
+    or line breaks is quoted, matching DataFrame.to_csv.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        labels = pd.Series(series.cat.categories).astype(str)
+        if not (ptypes.is_integer_dtype(series.cat.categories) or ptypes.is_float_dtype(series.cat.categories)):
+            labels = _csv_quote(labels)
+        labels = np.append(_prefixed(labels.to_numpy(dtype=object), prefix), prefix)
+        return labels[series.cat.codes.to_numpy()]
+
+    result = formatted
+    if series.dtype.kind == "O":
+        text = _csv_quote(pd.Series(formatted).str.slice(len(prefix)))
+        result = _prefixed(text.to_numpy(dtype=object), prefix)
+    missing = series.isna().to_numpy()
+    if missing.any():
+        result = np.where(missing, prefix, result)
+    return result
+
+def _format_rpt_csv_block(block: pd.DataFrame) -> tuple:
+    """Format a block once for both .rpt and .csv, deriving the CSV text from the .rpt strings."""
+    start = time.perf_counter()
+    stats = _RptTypeStats(block.columns)
+    shareable = _csv_shareable(block)
+    rpt_lines = np.full(len(block), "*", dtype=object)
+    csv_lines = None
+    for i in range(block.shape[1]):
+        series = block.iloc[:, i]
+        formatted = _rpt_column_strings(series)
+        stats.update(i, series, formatted)
+        rpt_lines = np.add(rpt_lines, formatted, dtype=object)
+        if shareable:
+            column = _csv_column_strings(series, formatted)
+            if csv_lines is None:
+                csv_lines = pd.Series(column).str.slice(1).to_numpy(dtype=object)  # No delimiter before the first field
+            else:
+                csv_lines = np.add(csv_lines, column, dtype=object)
+
+    rpt_data = _encode("\n" + "\n".join(rpt_lines.tolist()))
+    if shareable and len(block):
+        csv_data = _encode("\n".join(csv_lines.tolist()) + "\n")
+    else:
+        csv_data = block.to_csv(index=False, header=False).encode("utf-8")
+    return (rpt_data, csv_data), stats, len(block), time.perf_counter() - start, os.getpid()
+
+# Compression suffixes accepted after .rpt/.csv; the text is compressed as it is written
+OUTPUT_COMPRESSION = {".gz": "gzip", ".zst": "zstd"}
+TEXT_EXTENSIONS = (".rpt", ".csv")
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+# Level of the temporary .rpt body of an uncompressed output (decompressed behind the header on close)
+STAGING_LEVEL = 1
+
+def split_output_ext(path: str) -> tuple:
+    """Return the format extension and compression codec of *path*: "res.csv.zst" -> (".csv", "zstd")."""
+    stem, ext = os.path.splitext(path)
+    ext = ext.lower()
+    codec = OUTPUT_COMPRESSION.get(ext)
+    if codec is None:
+        return ext, None
+    base = os.path.splitext(stem)[-1].lower()
+    if base not in TEXT_EXTENSIONS:
+        raise ValueError(f"Unsupported compressed output format: {base}{ext}")
+    return base, codec
+
+def _import_zstandard():
+    """Import the optional zstandard package, naming it in the error when it is missing."""
+    try:
+        import zstandard
+    except ImportError as e:
+        raise ImportError("Writing .zst outputs requires the optional 'zstandard' package "
+                          "(pip install zstandard); use a .gz output otherwise") from e
+    return zstandard
+
+class _CompressedOutput:
+    """Binary output file that compresses on the fly, counting bytes and compression time.
+
+    zstd runs with *threads* compression threads (all CPUs by default), so the
+    compression overlaps with the formatting of the next blocks; gzip is single-threaded.
+    *level* defaults to GZIP_LEVEL / ZSTD_LEVEL.
+    """
+
+    def __init__(self, path: str, codec: str, threads: Optional[int] = None, level: Optional[int] = None):
+        self.path = path
+        self.codec = codec
+        self.raw_bytes = 0
+        self.seconds = 0.0
+        if codec == "zstd":
+            zstandard = _import_zstandard()
+        self._file = open(path, "wb", buffering=WRITE_BUFFER_BYTES)
+        if codec == "gzip":
+            import gzip
+            self.threads = 1
+            self._stream = gzip.GzipFile(filename="", mode="wb", compresslevel=level or GZIP_LEVEL,
+                                         fileobj=self._file, mtime=0)
+        else:
+            self.threads = max(1, int(threads or os.cpu_count() or 1))
+            compressor = zstandard.ZstdCompressor(level=level or ZSTD_LEVEL, threads=self.threads)
+            self._stream = compressor.stream_writer(self._file, closefd=False)
+
+    def write(self, data) -> int:
+        start = time.perf_counter()
+        self._stream.write(data)
+        self.seconds += time.perf_counter() - start
+        self.raw_bytes += len(data)
+        return len(data)
+
+    def close(self) -> None:
+        if self._stream is None:
+            return
+        start = time.perf_counter()
+        try:
+            self._stream.close()
+        finally:
+            self._file.close()
+            self._stream = None
+            self.seconds += time.perf_counter() - start
+
+    def log(self, audit, path: Optional[str] = None) -> None:
+        """Log the compression ratio and throughput of the closed file (or of *path*) to *audit*."""
+        if not audit:
+            return
+        path = path or self.path
+        size = os.path.getsize(path)
+        raw_mb = self.raw_bytes / 1024 / 1024
+        ratio = self.raw_bytes / size if size else 0
+        rate = raw_mb / self.seconds if self.seconds > 0 else 0
+        threads = f"{self.threads} thread{'s' if self.threads > 1 else ''}"
+        audit.log_writing_detail(
+            f"Compression {os.path.basename(path)}",
+            f"{self.codec} ({threads}): {raw_mb:.1f} MB -> {size / 1024 / 1024:.1f} MB "
+            f"(ratio {ratio:.2f}x) in {self.seconds:.3f}s ({rate:.1f} MB/s)"
+        )
+
+def _open_output(path: str, compression_threads: Optional[int] = None):
+    """Open *path* for binary writing, compressed when its extension asks for it (.gz/.zst)."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    codec = split_output_ext(path)[1]
+    if codec is None:
+        return open(path, "wb", buffering=WRITE_BUFFER_BYTES)
+    return _CompressedOutput(path, codec, compression_threads)
+
+def _remove_partial(path: str) -> None:
+    """Remove the partial file left at *path* by an aborted writer, if there is one."""
+    if os.path.exists(path):
+        os.remove(path)
+
+def _staging_codec() -> str:
+    """Codec of the temporary .rpt body of an uncompressed output: zstd, or gzip without zstandard."""
+    try:
+        import zstandard  # noqa: F401
+    except ImportError:
+        return "gzip"
+    return "zstd"
+
+def _compress_member(data: bytes, codec: str) -> bytes:
+    """Compress *data* as one standalone gzip member / zstd frame (to go before other members)."""
+    if codec == "gzip":
+        import gzip
+        return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+    return _import_zstandard().ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+
+def _decompress_into(source, codec: str, out) -> None:
+    """Decompress every gzip member / zstd frame of the binary file *source* into *out*."""
+    if codec == "gzip":
+        import gzip
+        stream = gzip.GzipFile(fileobj=source, mode="rb")
+    else:
+        stream = _import_zstandard().ZstdDecompressor().stream_reader(source, read_across_frames=True)
+    with stream:
+        shutil.copyfileobj(stream, out, WRITE_BUFFER_BYTES)
+
+def _close_output(out, audit=None) -> None:
+    """Close an output opened with _open_output, logging its compression to *audit*."""
+    out.close()
+    if isinstance(out, _CompressedOutput):
+        out.log(audit)
+
+class _BlockWriter:
+    """Base for the stream writers: formats row blocks and appends the encoded bytes in order.
+
+    With *workers* > 1 the blocks are formatted in a process pool; at most two
+    blocks per worker are in flight, and results are written in submission order.
+    The formatting throughput of each worker process is logged to *audit* on close.
+    """
+
+    def __init__(self, format_block, workers: int = 1, block_rows: int = WRITE_BLOCK_ROWS, audit=None):
+        self.block_rows = block_rows
+        self.workers = max(1, int(workers or 1))
+        self.audit = audit
+        self._format_block = format_block
+        self._out = None
+        self._pool = None
+        self._pending = deque()
+        self._throughput = {}
+
+    def _write_blocks(self, df: pd.DataFrame) -> None:
+        for start in range(0, len(df), self.block_rows):
+            block = df.iloc[start:start + self.block_rows]
+            if self.workers == 1:
+                self._collect(self._format_block(block))
+                continue
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            self._pending.append(self._pool.submit(self._format_block, block))
+            while len(self._pending) >= 2 * self.workers:
+                self._collect(self._pending.popleft().result())
+
+    def _collect(self, result: tuple) -> None:
+        data, stats, rows, seconds, pid = result
+        size = self._write_data(data)
+        self._merge_stats(stats)
+        totals = self._throughput.setdefault(pid, [0, 0, 0.0])
+        totals[0] += rows
+        totals[1] += size
+        totals[2] += seconds
+
+    def _write_data(self, data) -> int:
+        """Write the encoded output of one block and return its size in bytes."""
+        self._out.write(data)
+        return len(data)
+
+    def _merge_stats(self, stats) -> None:
+        pass
+
+    def _drain(self) -> None:
+        """Write every pending block and shut the pool down."""
+        try:
+            while self._pending:
+                self._collect(self._pending.popleft().result())
+        finally:
+            if self._pool is not None:
+                self._pool.shutdown(cancel_futures=True)
+                self._pool = None
+        self._log_throughput()
+
+    def _log_throughput(self) -> None:
+        if not self.audit or self.workers == 1:
+            return
+        self.audit.log_writing_detail("Format workers", f"{self.workers} processes")
+        for index, (rows, size, seconds) in enumerate(self._throughput.values(), start=1):
+            mb = size / 1024 / 1024
+            rate = mb / seconds if seconds > 0 else 0
+            self.audit.log_writing_detail(f"Worker {index}", f"{rows:,} rows, {mb:.1f} MB formatted in {seconds:.3f}s ({rate:.1f} MB/s)")
+
+    def write_chunks(self, chunks: Iterable[pd.DataFrame]) -> None:
+        """Write every DataFrame of *chunks* in order."""
+        for chunk in chunks:
+            self.write(chunk)
+
+    def abort(self) -> None:
+        """Stop after an error: drop the pending blocks and remove the partial output."""
+        self._pending.clear()
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+        self._discard()
+
+    def _discard(self) -> None:
+        """Close and remove the files opened by this writer."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # On an exception the output is not finished (no footer) and the error propagates
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
+
+class RptStreamWriter(_BlockWriter):
+    """Incremental .rpt writer: rows per chunk, header and footer on close.
+
+    Rows are formatted and written in blocks of *block_rows* through a buffered
+    handle, so memory does not grow with the number of rows written. The header
+    statistics (variable types and text widths) are collected while the rows are
+    formatted, so the header is only known on close. Until then the rows go to a
+    compressed body file next to the output, never an uncompressed copy:
+
+    - .rpt.gz / .rpt.zst: the body is compressed with the output codec, and on
+      close the header is written as its own gzip member / zstd frame followed by
+      the compressed body bytes as they are (concatenated members decompress to
+      the whole file).
+    - .rpt: the body is compressed at STAGING_LEVEL (zstd, or gzip without
+      zstandard) and decompressed behind the header on close.
+    """
+
+    def __init__(self, output_path: str, block_rows: int = WRITE_BLOCK_ROWS, workers: int = 1, audit=None,
+                 compression_threads: Optional[int] = None):
+        super().__init__(_format_rpt_block, workers, block_rows, audit)
+        self.output_path = output_path
+        self.compression_threads = compression_threads
+        self._body_path = output_path + ".body.tmp"
+        self._stats = None
+
+    def write(self, df: pd.DataFrame) -> None:
+        if self._out is None:
+            self._open(df)
+        if not len(df):
+            _rpt_data_lines(df, self._stats)  # Collects the column types only
+        self._write_blocks(df)
+
+    def _open(self, df: pd.DataFrame) -> None:
+        os.makedirs(os.path.dirname(self.output_path) or ".", exist_ok=True)
+        codec = split_output_ext(self.output_path)[1]
+        if codec is None:
+            self._out = _CompressedOutput(self._body_path, _staging_codec(), self.compression_threads, STAGING_LEVEL)
+        else:
+            self._out = _CompressedOutput(self._body_path, codec, self.compression_threads)
+        self._stats = _RptTypeStats(df.columns)
+
+    def _merge_stats(self, stats) -> None:
+        self._stats.merge(stats)
+
+    def close(self) -> None:
+        if self._out is None:
+            return
+        try:
+            self._drain()
+            # Footer: blank line + "##END##"
+            self._out.write(_encode("\n\n##END##"))
+            self._out.close()
+            header = _encode("\n".join(self._stats.header_lines()))
+            compressed = split_output_ext(self.output_path)[1] is not None
+            with open(self.output_path, "wb", buffering=WRITE_BUFFER_BYTES) as out, \
+                    open(self._body_path, "rb") as body:
+                if compressed:
+                    out.write(_compress_member(header, self._out.codec))
+                    shutil.copyfileobj(body, out, WRITE_BUFFER_BYTES)
+                else:
+                    out.write(header)
+                    _decompress_into(body, self._out.codec, out)
+            if compressed:
+                self._out.raw_bytes += len(header)
+                self._out.log(self.audit, self.output_path)
+        finally:
+            self._out.close()
+            self._out = None
+            if os.path.exists(self._body_path):
+                os.remove(self._body_path)
+
+    def _discard(self) -> None:
+        if self._out is None:
+            return
+        self._out.close()
+        self._out = None
+        _remove_partial(self._body_path)
+        _remove_partial(self.output_path)
+
+def write_rpt(df: Union[pd.DataFrame, Iterable[pd.DataFrame]], output_path: str, workers: int = 1, audit=None,
+              compression_threads: Optional[int] = None) -> None:
     """Write *df* to *output_path* in custom .rpt format.
 
+    *df* may also be an iterator of DataFrame chunks with the same columns; they
+    are streamed to the file in order and the footer is written once at the end.
+    With *workers* > 1 the rows are formatted in a process pool. A ".gz" or ".zst"
+    suffix (e.g. "res.rpt.zst") compresses the file as it is written.
+
     Format rules
     ------------
     1. First line  : VARIABLE_TYPES,<encoded-types>
@@ -23,24 +656,649 @@ def write_rpt(df: pd.DataFrame, output_path: str) -> None:
     3. Data lines  : *,<row values>
     4. Footer      : blank line + "##END##"
     """
-    # Build header lines
-    types_line = ["VARIABLE_TYPES"] + [_get_variable_type(df[c]) for c in df.columns]
-    header_line = ["!1"] + list(df.columns)
+    with RptStreamWriter(output_path, workers=workers, audit=audit, compression_threads=compression_threads) as writer:
+        if isinstance(df, pd.DataFrame):
+            writer.write(df)
+        else:
+            writer.write_chunks(df)
 
-    # Data lines prefixed with "*"
-    data_lines = df.astype(str).apply(lambda r: ["*"] + r.tolist(), axis=1)
+class CsvStreamWriter(_BlockWriter):
+    """Incremental .csv writer: header with the first chunk, rows appended per chunk."""
 
-    # Convert to CSV strings
-    to_csv = lambda items: ",".join(items)
-    lines = [to_csv(types_line), to_csv(header_line)] + [to_csv(row) for row in data_lines]
+    def __init__(self, path: str, block_rows: int = WRITE_BLOCK_ROWS, workers: int = 1, audit=None,
+                 engine: str = "pandas", compression_threads: Optional[int] = None):
+        super().__init__(_csv_block_formatter(engine), workers, block_rows, audit)
+        self.path = path
+        self.compression_threads = compression_threads
 
-    # Footer
-    lines += ["", "##END##"]
+    def write(self, df: pd.DataFrame) -> None:
+        if self._out is None:
+            self._out = _open_output(self.path, self.compression_threads)
+            self._out.write(df.iloc[:0].to_csv(index=False).encode("utf-8"))
+        self._write_blocks(df)
 
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    with open(output_path, "w", encoding="utf-8") as f:
-        f.write("\n".join(lines))
+    def close(self) -> None:
+        if self._out is None:
+            return
+        try:
+            self._drain()
+        finally:
+            _close_output(self._out, self.audit)
+            self._out = None
 
-def write_csv(df, path):
+    def _discard(self) -> None:
+        if self._out is None:
+            return
+        try:
+            self._out.close()
+        finally:
+            self._out = None
+            _remove_partial(self.path)
+
+def write_csv(df, path, workers=1, audit=None, engine="pandas", compression_threads=None):
+    if (workers and workers > 1) or (engine or "pandas").lower() != "pandas" or split_output_ext(path)[1]:
+        with CsvStreamWriter(path, workers=workers, audit=audit, engine=engine,
+                             compression_threads=compression_threads) as writer:
+            writer.write(df)
+        return
     os.makedirs(os.path.dirname(path), exist_ok=True)
     df.to_csv(path, index=False)
+
+class RptCsvStreamWriter(RptStreamWriter):
+    """Writes the same rows to a .rpt and a .csv file, formatting every column to text once.
+
+    The CSV fields are derived from the .rpt strings (missing values emptied, text
+    quoted where needed); blocks whose dtypes do not allow it fall back to to_csv.
+    """
+
+    def __init__(self, rpt_path: str, csv_path: str, block_rows: int = WRITE_BLOCK_ROWS, workers: int = 1, audit=None,
+                 compression_threads: Optional[int] = None):
+        super().__init__(rpt_path, block_rows, workers, audit, compression_threads)
+        self._format_block = _format_rpt_csv_block
+        self.csv_path = csv_path
+        self._csv_out = None
+
+    def _open(self, df: pd.DataFrame) -> None:
+        super()._open(df)
+        self._csv_out = _open_output(self.csv_path, self.compression_threads)
+        self._csv_out.write(df.iloc[:0].to_csv(index=False).encode("utf-8"))
+
+    def _write_data(self, data) -> int:
+        rpt_data, csv_data = data
+        self._out.write(rpt_data)
+        self._csv_out.write(csv_data)
+        return len(rpt_data) + len(csv_data)
+
+    def close(self) -> None:
+        try:
+            super().close()
+        finally:
+            if self._csv_out is not None:
+                _close_output(self._csv_out, self.audit)
+                self._csv_out = None
+
+    def _discard(self) -> None:
+        try:
+            super()._discard()
+        finally:
+            if self._csv_out is not None:
+                try:
+                    self._csv_out.close()
+                finally:
+                    self._csv_out = None
+                    _remove_partial(self.csv_path)
+
+# Codecs accepted per columnar format (Arrow IPC/Feather only compresses with lz4 or zstd)
+PARQUET_CODECS = ("zstd", "lz4", "snappy", "gzip", "brotli", "none")
+ARROW_CODECS = ("zstd", "lz4", "none")
+
+def _codec(compression: Optional[str], allowed: tuple, fmt: str) -> str:
+    """Validate *compression* for *fmt* and return it in pyarrow's spelling."""
+    codec = (compression or "none").lower()
+    if codec not in allowed:
+        raise ValueError(f"Compression '{compression}' is not supported for {fmt} output (use one of: {', '.join(allowed)})")
+    return codec
+
+def _arrow_table(df: pd.DataFrame, use_dictionary=False, decode_dictionaries: bool = False):
+    """Convert *df* to an Arrow table, optionally dictionary-encoding string columns.
+
+    *use_dictionary* may be a bool (all string columns) or a list of column names.
+    With *decode_dictionaries* categorical columns are written as plain values, which
+    lets chunks with different category sets share one IPC file schema.
+    """
+    import pyarrow as pa
+    import pyarrow.types as pat
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    for i, field in enumerate(table.schema):
+        column = table.column(i)
+        if decode_dictionaries and pat.is_dictionary(field.type):
+            column = column.cast(field.type.value_type)
+        elif pat.is_string(field.type) and (use_dictionary is True or (
+                isinstance(use_dictionary, (list, tuple)) and field.name in use_dictionary)):
+            column = column.dictionary_encode()
+        else:
+            continue
+        table = table.set_column(i, field.name, column)
+    return table
+
+def write_parquet(df: pd.DataFrame, path: str, compression: str = "zstd", row_group_size: Optional[int] = None,
+                  use_dictionary=True) -> None:
+    """Write *df* to *path* as Parquet with the given codec, row-group size and dictionary encoding.
+
+    *use_dictionary* follows pyarrow: a bool for all columns or a list of column names.
+    """
+    import pyarrow.parquet as pq
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    pq.write_table(
+        _arrow_table(df),
+        path,
+        compression=_codec(compression, PARQUET_CODECS, "parquet"),
+        row_group_size=row_group_size,
+        use_dictionary=use_dictionary,
+    )
+
+def write_arrow(df: pd.DataFrame, path: str, compression: str = "zstd", row_group_size: Optional[int] = None,
+                use_dictionary=False) -> None:
+    """Write *df* to *path* as an Arrow IPC file (Feather V2; used for .feather and .arrow).
+
+    *row_group_size* bounds the rows per record batch; *use_dictionary* dictionary-encodes
+    string columns (categoricals are always stored as dictionaries).
+    """
+    import pyarrow.feather as feather
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    codec = _codec(compression, ARROW_CODECS, "feather/arrow")
+    feather.write_feather(
+        _arrow_table(df, use_dictionary),
+        path,
+        compression="uncompressed" if codec == "none" else codec,
+        chunksize=row_group_size,
+    )
+
+def _widened_type(current, new):
+    """Arrow type that holds the values of both *current* and *new*, or None if there is none."""
+    import pyarrow as pa
+    import pyarrow.types as pat
+
+    if current == new or pat.is_null(new):
+        return current
+    if pat.is_null(current):
+        return new
+    if (pat.is_integer(current) or pat.is_floating(current)) and (pat.is_integer(new) or pat.is_floating(new)):
+        # Integer columns turn float when a chunk has missing values
+        return pa.float64() if pat.is_floating(current) or pat.is_floating(new) else pa.int64()
+    if pat.is_timestamp(current) and pat.is_timestamp(new) and current.tz == new.tz:
+        units = ("s", "ms", "us", "ns")
+        return pa.timestamp(max(current.unit, new.unit, key=units.index), current.tz)
+    return None
+
+def _widened_schema(schema, table, path: str):
+    """File *schema* widened to hold the chunk *table*; raise ValueError when a column cannot be widened."""
+    import pyarrow as pa
+
+    if schema.names != table.schema.names:
+        raise ValueError(f"{path}: chunk columns {table.schema.names} do not match the file columns {schema.names}")
+    fields = []
+    for field, new in zip(schema, table.schema):
+        widened = _widened_type(field.type, new.type)
+        if widened is None:
+            raise ValueError(f"{path}: column '{field.name}' is {field.type} in earlier chunks but {new.type} "
+                             f"in this one; declare its type in the input schema or column_formats")
+        fields.append(field.with_type(widened))
+    return pa.schema(fields, metadata=schema.metadata)
+
+def _staged_rewrite(path: str) -> str:
+    """Move the file written so far aside, to be copied back with a wider schema."""
+    staged = path + ".widen.tmp"
+    os.replace(path, staged)
+    return staged
+
+class ParquetStreamWriter:
+    """Incremental Parquet writer: each chunk is appended as one or more row groups.
+
+    The file schema is taken from the first chunk and later chunks are cast to it.
+    When a chunk needs a wider type (an all-null column that gets values, integers
+    that turn float) the row groups written so far are rewritten with the wider
+    schema; incompatible changes raise ValueError.
+    """
+
+    def __init__(self, path: str, compression: str = "zstd", row_group_size: Optional[int] = None,
+                 use_dictionary=True):
+        self.path = path
+        self.compression = _codec(compression, PARQUET_CODECS, "parquet")
+        self.row_group_size = row_group_size
+        self.use_dictionary = use_dictionary
+        self._writer = None
+        self._schema = None
+
+    def write(self, df: pd.DataFrame) -> None:
+        # Chunks may carry different category sets: the values are written, Parquet re-encodes them
+        table = _arrow_table(df, decode_dictionaries=True)
+        if self._writer is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._open(table.schema)
+        else:
+            schema = _widened_schema(self._schema, table, self.path)
+            if schema != self._schema:
+                self._widen(schema)
+        self._writer.write_table(table.cast(self._schema), row_group_size=self.row_group_size)
+
+    def _open(self, schema) -> None:
+        import pyarrow.parquet as pq
+
+        self._schema = schema
+        self._writer = pq.ParquetWriter(self.path, schema, compression=self.compression,
+                                        use_dictionary=self.use_dictionary)
+
+    def _widen(self, schema) -> None:
+        """Rewrite the row groups written so far with the wider *schema*, one at a time."""
+        import pyarrow.parquet as pq
+
+        self._writer.close()
+        staged = _staged_rewrite(self.path)
+        try:
+            self._open(schema)
+            with pq.ParquetFile(staged) as written:
+                for i in range(written.num_row_groups):
+                    self._writer.write_table(written.read_row_group(i).cast(schema))
+        finally:
+            os.remove(staged)
+
+    def write_chunks(self, chunks: Iterable[pd.DataFrame]) -> None:
+        """Write every DataFrame of *chunks* in order."""
+        for chunk in chunks:
+            self.write(chunk)
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def abort(self) -> None:
+        """Stop after an error: close and remove the partial file."""
+        if self._writer is None:
+            return
+        try:
+            self._writer.close()
+        finally:
+            self._writer = None
+            _remove_partial(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
+
+class ArrowStreamWriter:
+    """Incremental Arrow IPC file writer (.feather/.arrow): each chunk becomes record batches.
+
+    The IPC file format does not allow replacing dictionaries between batches, so
+    categoricals are written as plain values and no dictionary encoding is applied.
+    Chunks that need a wider type are handled as in ParquetStreamWriter.
+    """
+
+    def __init__(self, path: str, compression: str = "zstd", row_group_size: Optional[int] = None):
+        self.path = path
+        self.compression = _codec(compression, ARROW_CODECS, "feather/arrow")
+        self.row_group_size = row_group_size
+        self._sink = None
+        self._writer = None
+        self._schema = None
+
+    def write(self, df: pd.DataFrame) -> None:
+        table = _arrow_table(df, decode_dictionaries=True)
+        if self._writer is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._open(table.schema)
+        else:
+            schema = _widened_schema(self._schema, table, self.path)
+            if schema != self._schema:
+                self._widen(schema)
+        self._writer.write_table(table.cast(self._schema), max_chunksize=self.row_group_size)
+
+    def _open(self, schema) -> None:
+        import pyarrow as pa
+
+        options = pa.ipc.IpcWriteOptions(compression=None if self.compression == "none" else self.compression)
+        self._schema = schema
+        self._sink = pa.OSFile(self.path, "wb")
+        self._writer = pa.ipc.new_file(self._sink, schema, options=options)
+
+    def _widen(self, schema) -> None:
+        """Rewrite the record batches written so far with the wider *schema*, one at a time."""
+        import pyarrow as pa
+
+        self._writer.close()
+        self._sink.close()
+        staged = _staged_rewrite(self.path)
+        try:
+            self._open(schema)
+            with pa.memory_map(staged) as source:
+                written = pa.ipc.open_file(source)
+                for i in range(written.num_record_batches):
+                    self._writer.write_table(pa.Table.from_batches([written.get_batch(i)]).cast(schema))
+        finally:
+            os.remove(staged)
+
+    def write_chunks(self, chunks: Iterable[pd.DataFrame]) -> None:
+        """Write every DataFrame of *chunks* in order."""
+        for chunk in chunks:
+            self.write(chunk)
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._sink.close()
+            self._writer = self._sink = None
+
+    def abort(self) -> None:
+        """Stop after an error: close and remove the partial file."""
+        if self._writer is None:
+            return
+        try:
+            self._sink.close()
+        finally:
+            self._writer = self._sink = None
+            _remove_partial(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
+
+class OutputFanout:
+    """Writes every chunk to several output targets, timing each one for the audit.
+
+    Text targets are written in the calling thread while the columnar targets
+    (Parquet/Arrow, which release the GIL) are written concurrently in threads.
+    """
+
+    def __init__(self, targets: dict, columnar: Iterable[str] = (), audit=None):
+        self.targets = targets
+        self.columnar = set(columnar)
+        self.audit = audit
+        self.seconds = {name: 0.0 for name in targets}
+        self._threads = ThreadPoolExecutor(max_workers=len(self.columnar)) if self.columnar else None
+
+    def _timed(self, name: str, action) -> None:
+        start = time.perf_counter()
+        action()
+        self.seconds[name] += time.perf_counter() - start
+
+    def write(self, df: pd.DataFrame) -> None:
+        futures = [self._threads.submit(self._timed, name, lambda w=self.targets[name]: w.write(df))
+                   for name in self.columnar]
+        for name, writer in self.targets.items():
+            if name not in self.columnar:
+                self._timed(name, lambda w=writer: w.write(df))
+        for future in futures:
+            future.result()
+
+    def write_chunks(self, chunks: Iterable[pd.DataFrame]) -> None:
+        """Write every DataFrame of *chunks* in order."""
+        for chunk in chunks:
+            self.write(chunk)
+
+    def close(self) -> None:
+        try:
+            for name, writer in self.targets.items():
+                self._timed(name, writer.close)
+        finally:
+            if self._threads is not None:
+                self._threads.shutdown()
+                self._threads = None
+        if self.audit:
+            for name, seconds in self.seconds.items():
+                self.audit.log_writing_detail(f"Target {name}", f"{seconds:.3f}s")
+
+    def abort(self) -> None:
+        """Stop after an error: abort every target, removing their partial files."""
+        try:
+            for writer in self.targets.values():
+                writer.abort()
+        finally:
+            if self._threads is not None:
+                self._threads.shutdown(cancel_futures=True)
+                self._threads = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
+
+OUTPUT_EXTENSIONS = (".rpt", ".csv", ".parquet", ".feather", ".arrow")
+COLUMNAR_EXTENSIONS = (".parquet", ".feather", ".arrow")
+
+def open_stream_writer(path: str, workers: int = 1, audit=None, compression: str = "zstd",
+                       row_group_size: Optional[int] = None, use_dictionary=True, csv_engine: str = "pandas",
+                       compression_threads: Optional[int] = None):
+    """Open the stream writer that matches the extension of *path* (.rpt/.csv may end in .gz/.zst)."""
+    ext = split_output_ext(path)[0]
+    if ext == ".rpt":
+        return RptStreamWriter(path, workers=workers, audit=audit, compression_threads=compression_threads)
+    if ext == ".csv":
+        return CsvStreamWriter(path, workers=workers, audit=audit, engine=csv_engine,
+                               compression_threads=compression_threads)
+    if ext == ".parquet":
+        return ParquetStreamWriter(path, compression, row_group_size, use_dictionary)
+    if ext in (".feather", ".arrow"):
+        return ArrowStreamWriter(path, compression, row_group_size)
+    raise ValueError(f"Unsupported output format: {ext}")
+
+def open_output_writers(paths: Iterable[str], workers: int = 1, audit=None, compression: str = "zstd",
+                        row_group_size: Optional[int] = None, use_dictionary=True,
+                        csv_engine: str = "pandas", compression_threads: Optional[int] = None) -> OutputFanout:
+    """Open one stream writer per output path behind an OutputFanout.
+
+    The first .rpt and the first .csv target share a RptCsvStreamWriter, so their
+    text formatting is done once (pandas CSV engine only). Columnar options apply
+    to .parquet/.feather/.arrow.
+    """
+    paths = list(paths)
+    by_ext = {}
+    for path in paths:
+        ext = split_output_ext(path)[0]
+        if ext not in OUTPUT_EXTENSIONS:
+            raise ValueError(f"Unsupported output format: {ext}")
+        by_ext.setdefault(ext, []).append(path)
+
+    targets, columnar = {}, []
+    if by_ext.get(".rpt") and by_ext.get(".csv") and (csv_engine or "pandas").lower() == "pandas":
+        rpt_path, csv_path = by_ext[".rpt"].pop(0), by_ext[".csv"].pop(0)
+        name = f"{os.path.basename(rpt_path)} + {os.path.basename(csv_path)} (shared text formatting)"
+        targets[name] = RptCsvStreamWriter(rpt_path, csv_path, workers=workers, audit=audit,
+                                           compression_threads=compression_threads)
+
+    for path in paths:
+        ext = split_output_ext(path)[0]
+        if path not in by_ext[ext]:
+            continue  # Already covered by the shared text writer
+        name = os.path.basename(path)
+        targets[name] = open_stream_writer(path, workers, audit, compression, row_group_size, use_dictionary,
+                                           csv_engine, compression_threads)
+        if ext in COLUMNAR_EXTENSIONS:
+            columnar.append(name)
+    return OutputFanout(targets, columnar, audit)
+
+def write_outputs(df: pd.DataFrame, paths: Iterable[str], workers: int = 1, audit=None, **columnar_options) -> None:
+    """Write *df* to every path of *paths* in a single pass (see open_output_writers)."""
+    with open_output_writers(paths, workers, audit, **columnar_options) as writer:
+        writer.write(df)
+
+def _partition_dir_name(column: str, value) -> str:
+    """Directory name of a partition value, Hive style: <column>=<value>.
+
+    Path separators and characters invalid on Windows become ``_``, so distinct
+    values can share a name (``a/b`` and ``a_b``); PartitionedStreamWriter adds
+    a ``~<n>`` suffix to the later ones.
+    """
+    if pd.isna(value):
+        text = "_null_"
+    else:
+        text = re.sub(r'[\\/:*?"<>|]', "_", str(value))
+    return f"{column}={text}"
+
+class PartitionedStreamWriter:
+    """Splits the output by key columns and/or a maximum row count per file.
+
+    Files go to a directory named after *output_path* without its extension:
+    ``<stem>/<col>=<value>/.../part-00000<ext>``. Each file gets its own stream
+    writer, and the partitions of a chunk are written concurrently in threads.
+    On close a ``_manifest.json`` with the rows and bytes of every file is written
+    next to them.
+    """
+
+    def __init__(self, output_path: str, partition_by: Optional[Iterable[str]] = None,
+                 max_rows_per_file: Optional[int] = None, workers: Optional[int] = None, audit=None,
+                 **writer_options):
+        if not partition_by and not max_rows_per_file:
+            raise ValueError("Partitioned output needs partition_by and/or max_rows_per_file")
+        self.ext, self.compression = split_output_ext(output_path)
+        if self.ext not in OUTPUT_EXTENSIONS:
+            raise ValueError(f"Unsupported output format: {self.ext}")
+        # Full file suffix, compression included (".csv.zst")
+        self.suffix = self.ext + (os.path.splitext(output_path)[-1].lower() if self.compression else "")
+        self.root = output_path[:-len(self.suffix)]
+        self.partition_by = [partition_by] if isinstance(partition_by, str) else list(partition_by or [])
+        self.max_rows_per_file = int(max_rows_per_file) if max_rows_per_file else None
+        self.workers = workers or os.cpu_count() or 1
+        self.audit = audit
+        self.writer_options = writer_options
+        self.manifest_path = os.path.join(self.root, "_manifest.json")
+        self._partitions = {}  # key -> {"values", "dir", "files": [...], "writer", "rows_in_file"}
+        self._dirs = set()  # Directories in use, case-folded (case-insensitive file systems)
+
+    def _partition(self, key, values: dict) -> dict:
+        if key not in self._partitions:
+            parts = [_partition_dir_name(col, values[col]) for col in self.partition_by]
+            directory = os.path.join(self.root, *parts)
+            # Distinct values with the same sanitized name must not share (and overwrite) files
+            base, n = directory, 0
+            while os.path.normcase(directory).casefold() in self._dirs:
+                n += 1
+                directory = f"{base}~{n}"
+            self._dirs.add(os.path.normcase(directory).casefold())
+            self._partitions[key] = {
+                "values": values,
+                "dir": directory,
+                "files": [],
+                "writer": None,
+                "rows_in_file": 0,
+            }
+        return self._partitions[key]
+
+    def _roll(self, partition: dict) -> None:
+        """Close the current file of *partition* (if any) and open the next one."""
+        if partition["writer"] is not None:
+            partition["writer"].close()
+        path = os.path.join(partition["dir"], f"part-{len(partition['files']):05d}{self.suffix}")
+        partition["files"].append({"path": path, "rows": 0})
+        partition["writer"] = open_stream_writer(path, **self.writer_options)
+        partition["rows_in_file"] = 0
+
+    def _write_partition(self, partition: dict, df: pd.DataFrame) -> None:
+        start = 0
+        while start < len(df):
+            if partition["writer"] is None or (
+                    self.max_rows_per_file and partition["rows_in_file"] >= self.max_rows_per_file):
+                self._roll(partition)
+            room = self.max_rows_per_file - partition["rows_in_file"] if self.max_rows_per_file else len(df)
+            piece = df.iloc[start:start + room]
+            partition["writer"].write(piece)
+            partition["rows_in_file"] += len(piece)
+            partition["files"][-1]["rows"] += len(piece)
+            start += len(piece)
+
+    def write(self, df: pd.DataFrame) -> None:
+        if self.partition_by:
+            groups = df.groupby(self.partition_by, observed=True, sort=False, dropna=False)
+            work = []
+            for key, group in groups:
+                key = key if isinstance(key, tuple) else (key,)
+                values = dict(zip(self.partition_by, key))
+                work.append((self._partition(key, values), group))
+        else:
+            work = [(self._partition((), {}), df)]
+
+        if len(work) == 1 or self.workers == 1:
+            for partition, group in work:
+                self._write_partition(partition, group)
+            return
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(work))) as pool:
+            for future in [pool.submit(self._write_partition, partition, group) for partition, group in work]:
+                future.result()
+
+    def write_chunks(self, chunks: Iterable[pd.DataFrame]) -> None:
+        """Write every DataFrame of *chunks* in order."""
+        for chunk in chunks:
+            self.write(chunk)
+
+    def close(self) -> None:
+        if not self._partitions:
+            return
+        files = []
+        for partition in self._partitions.values():
+            if partition["writer"] is not None:
+                partition["writer"].close()
+                partition["writer"] = None
+            for entry in partition["files"]:
+                files.append({
+                    "path": os.path.relpath(entry["path"], self.root).replace(os.sep, "/"),
+                    "partition": {col: (None if pd.isna(v) else str(v)) for col, v in partition["values"].items()},
+                    "rows": entry["rows"],
+                    "bytes": os.path.getsize(entry["path"]),
+                })
+        manifest = {
+            "format": self.ext.lstrip("."),
+            "compression": self.compression,
+            "partition_by": self.partition_by,
+            "max_rows_per_file": self.max_rows_per_file,
+            "partitions": len(self._partitions),
+            "total_rows": sum(f["rows"] for f in files),
+            "total_bytes": sum(f["bytes"] for f in files),
+            "files": files,
+        }
+        with open(self.manifest_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2, ensure_ascii=False)
+        if self.audit:
+            self.audit.log_writing_detail(
+                "Partitions",
+                f"{manifest['partitions']} partition(s), {len(files)} file(s), "
+                f"{manifest['total_bytes'] / 1024 / 1024:.1f} MB (manifest: {self.manifest_path})"
+            )
+        self._partitions = {}
+        self._dirs = set()
+
+    def abort(self) -> None:
+        """Stop after an error: remove every file written so far; no manifest is written."""
+        for partition in self._partitions.values():
+            if partition["writer"] is not None:
+                partition["writer"].abort()
+                partition["writer"] = None
+            for entry in partition["files"]:
+                _remove_partial(entry["path"])
+        self._partitions = {}
+        self._dirs = set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
@@ -0,0 +1,77 @@
+"""
+Fixtures comunes: datos de seguros sintéticos (mismo layout que inputs/csv_generator.py),
+las tablas auxiliares del repo y un logger mudo para las reglas de negocio
+"""
+import csv
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+PROGRAM_DIR = os.path.join(ROOT_DIR, "program")
+TABLES_PATH = os.path.join(ROOT_DIR, "tables")
+SPECS_DIR = os.path.join(PROGRAM_DIR, "transformers", "specs")
+COMPLEXITIES = ("simple", "medium", "complex", "very_complex")
+
+sys.path.insert(0, PROGRAM_DIR)
+
+FIELDNAMES = ['ID', 'tipo_producto', 'temp_idx', 'Sex', 'inception_date', 'birth_date', 'sum_insured',
+              'tariff_grp', 'country', 'reins_name', 'annual_prem', 'prem_frecuency', 'comission_precentage']
+
+def _random_date(rng, start, end):
+    return start + timedelta(days=rng.randrange((end - start).days))
+
+def write_insurance_csv(path, rows, seed=0):
+    """Escribir *rows* registros con el generador de inputs/csv_generator.py (semilla fija)"""
+    rng = random.Random(seed)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDNAMES)
+        writer.writeheader()
+        for i in range(1, rows + 1):
+            tipo_producto = rng.choice(['Vitalicio', 'Temporal'])
+            writer.writerow({
+                'ID': i,
+                'tipo_producto': tipo_producto,
+                'temp_idx': rng.randint(1, 5) if tipo_producto == 'Temporal' else '',
+                'Sex': rng.choice(['Male', 'Female']),
+                'inception_date': _random_date(rng, datetime(2020, 1, 1), datetime(2024, 12, 31)).strftime('%d/%m/%Y'),
+                'birth_date': _random_date(rng, datetime(1950, 1, 1), datetime(1990, 12, 31)).strftime('%d/%m/%Y'),
+                'sum_insured': rng.randint(10000, 1000000),
+                'tariff_grp': rng.randint(1, 10),
+                'country': rng.choice(['Argentina', 'Chile', 'Colombia', 'Mexico', 'Peru', 'Uruguay', 'Brasil', 'Ecuador']),
+                'reins_name': rng.choice(['Munich Re', 'Swiss Re', 'Hannover Re', 'SCOR', 'Lloyds', 'Berkshire Re',
+                                          'Partner Re', 'Everest Re']),
+                'annual_prem': round(rng.uniform(500, 50000), 2),
+                'prem_frecuency': rng.choice(['Mensual', 'Trimestral', 'Semestral', 'Anual']),
+                'comission_precentage': round(rng.uniform(5, 25), 1),
+            })
+    return path
+
+class QuietLogger:
+    """Logger sin salida con la interfaz de logger.Logger"""
+    prefix = ""
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+@pytest.fixture(scope="session")
+def insurance_csv(tmp_path_factory):
+    return write_insurance_csv(str(tmp_path_factory.mktemp("data") / "data_5k.csv"), 5000)
+
+@pytest.fixture(scope="session")
+def insurance_df(insurance_csv):
+    from reader import read_input
+    return read_input(insurance_csv)
+
+@pytest.fixture
+def logger():
+    return QuietLogger()
+
+def rules_output(name, df):
+    """Salida de las reglas en Python functions_<name>.py sobre *df*"""
+    import importlib
+    module = importlib.import_module(f"transformers.functions_{name}")
+    return module.run_business_rules(df, TABLES_PATH, QuietLogger())
@@ -0,0 +1,125 @@
+"""Outputs e inputs comprimidos: mismo contenido que sin comprimir y error claro sin zstandard"""
+import gzip
+import sys
+
+import pandas as pd
+import pytest
+
+import writer
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame({"ID": range(1, 2001), "NAME": [f"n{i % 7}" for i in range(2000)],
+                         "VALUE": [i / 3 for i in range(2000)]})
+
+@pytest.mark.parametrize("ext", [".csv", ".rpt"])
+def test_compressed_outputs_decompress_to_plain_output(frame, tmp_path, ext):
+    write = writer.write_csv if ext == ".csv" else writer.write_rpt
+    write(frame, str(tmp_path / f"plain{ext}"))
+    plain = (tmp_path / f"plain{ext}").read_bytes()
+
+    write(frame, str(tmp_path / f"out{ext}.gz"))
+    assert gzip.decompress((tmp_path / f"out{ext}.gz").read_bytes()) == plain
+
+    zstandard = pytest.importorskip("zstandard")
+    write(frame, str(tmp_path / f"out{ext}.zst"))
+    with open(tmp_path / f"out{ext}.zst", "rb") as f:
+        reader = zstandard.ZstdDecompressor().stream_reader(f, read_across_frames=True)
+        assert reader.read() == plain
+
+@pytest.mark.parametrize("suffix", ["", ".gz", ".zst"])
+def test_rpt_body_is_staged_compressed(frame, tmp_path, suffix, monkeypatch):
+    if suffix == ".zst":
+        pytest.importorskip("zstandard")
+    writer.write_rpt(frame, str(tmp_path / "plain.rpt"))
+    plain = (tmp_path / "plain.rpt").read_bytes()
+
+    # Conservar el cuerpo temporal para inspeccionarlo
+    removed = []
+    monkeypatch.setattr(writer.os, "remove", removed.append)
+    path = str(tmp_path / f"out.rpt{suffix}")
+    writer.write_rpt(frame, path)
+    monkeypatch.undo()
+
+    body = tmp_path / f"out.rpt{suffix}.body.tmp"
+    assert removed == [str(body)]
+    assert 0 < body.stat().st_size < len(plain) / 2
+    with open(path, "rb") as f:
+        if suffix == ".zst":
+            import zstandard
+            output = zstandard.ZstdDecompressor().stream_reader(f, read_across_frames=True).read()
+        else:
+            output = gzip.GzipFile(fileobj=f).read() if suffix else f.read()
+    assert output == plain
+
+    # El reader lee todos los members/frames, no solo el del header (ver RptStreamWriter)
+    from reader import read_input
+    pd.testing.assert_frame_equal(read_input(path), read_input(str(tmp_path / "plain.rpt")))
+
+def test_plain_rpt_without_zstandard_stages_with_gzip(frame, tmp_path, monkeypatch):
+    writer.write_rpt(frame, str(tmp_path / "expected.rpt"))
+    monkeypatch.setitem(sys.modules, "zstandard", None)
+    writer.write_rpt(frame, str(tmp_path / "out.rpt"))
+    assert (tmp_path / "out.rpt").read_bytes() == (tmp_path / "expected.rpt").read_bytes()
+
+def test_zst_output_without_zstandard_names_the_package(frame, tmp_path, monkeypatch):
+    monkeypatch.setitem(sys.modules, "zstandard", None)
+    with pytest.raises(ImportError, match="zstandard"):
+        writer.write_csv(frame, str(tmp_path / "out.csv.zst"))
+    assert not (tmp_path / "out.csv.zst").exists()
+
+def test_compressed_inputs_read_like_plain_input(insurance_csv, tmp_path):
+    from reader import read_input
+    with open(insurance_csv, "rb") as f:
+        data = f.read()
+    (tmp_path / "data.csv.gz").write_bytes(gzip.compress(data))
+    expected = read_input(insurance_csv)
+    pd.testing.assert_frame_equal(read_input(str(tmp_path / "data.csv.gz")), expected)
+
+    zstandard = pytest.importorskip("zstandard")
+    (tmp_path / "data.csv.zst").write_bytes(zstandard.ZstdCompressor().compress(data))
+    pd.testing.assert_frame_equal(read_input(str(tmp_path / "data.csv.zst")), expected)
+
+def test_zst_input_without_zstandard_names_the_package(insurance_csv, tmp_path, monkeypatch):
+    from reader import read_input
+    (tmp_path / "data.csv.zst").write_bytes(b"\x28\xb5\x2f\xfd")
+    monkeypatch.setitem(sys.modules, "zstandard", None)
+    with pytest.raises(ImportError, match="zstandard"):
+        read_input(str(tmp_path / "data.csv.zst"))
+
+def _write_compressed_parts(source, directory):
+    """Partir el CSV *source* en tres archivos (.csv.gz, .csv.zst en dos frames y .csv) con su header"""
+    zstandard = pytest.importorskip("zstandard")
+    with open(source, "rb") as f:
+        header, *lines = f.readlines()
+    thirds = [b"".join(lines[i * len(lines) // 3:(i + 1) * len(lines) // 3]) for i in range(3)]
+    middle = len(thirds[1]) // 2
+    (directory / "part1.csv.gz").write_bytes(gzip.compress(header + thirds[0]))
+    (directory / "part2.csv.zst").write_bytes(zstandard.ZstdCompressor().compress(header + thirds[1][:middle])
+                                              + zstandard.ZstdCompressor().compress(thirds[1][middle:]))
+    (directory / "part3.csv").write_bytes(header + thirds[2])
+
+@pytest.mark.parametrize("pattern", ["", "part*.csv*"], ids=["directory", "glob"])
+@pytest.mark.parametrize("file_config", [{}, {"type": "csv", "delimiter": ",", "schema": "insurance"}],
+                         ids=["plain", "schema"])
+def test_compressed_parts_read_in_chunks_like_plain_input(insurance_csv, tmp_path, pattern, file_config):
+    from reader import read_input, read_input_chunks
+    _write_compressed_parts(insurance_csv, tmp_path)
+    path = str(tmp_path / pattern) if pattern else str(tmp_path)
+    expected = read_input(insurance_csv, file_config or None)
+
+    pd.testing.assert_frame_equal(read_input(path, file_config or None), expected)
+    chunks = list(read_input_chunks(path, dict(file_config, chunk_size=700)))
+    assert all(len(chunk) <= 700 for chunk in chunks)
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), expected)
+
+@pytest.mark.parametrize("suffix", [".gz", ".zst"])
+def test_compressed_rpt_input_reads_in_chunks(insurance_df, tmp_path, suffix):
+    from reader import read_input, read_input_chunks
+    if suffix == ".zst":
+        pytest.importorskip("zstandard")
+    writer.write_rpt(insurance_df, str(tmp_path / "res.rpt"))
+    writer.write_rpt(insurance_df, str(tmp_path / f"res.rpt{suffix}"))
+    expected = read_input(str(tmp_path / "res.rpt"))
+    chunks = list(read_input_chunks(str(tmp_path / f"res.rpt{suffix}"), {"chunk_size": 1000}))
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), expected)
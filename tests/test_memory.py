@@ -0,0 +1,55 @@
+"""Contabilidad de copias: buffers identificados por dirección y dueño vivo"""
+import os
+import weakref
+
+import numpy as np
+import pandas as pd
+
+from conftest import SPECS_DIR, TABLES_PATH, QuietLogger
+from transformers.engine import apply_transformations
+from transformers.memory import buffer_delta, frame_buffers
+
+class _Gone:
+    pass
+
+def _frame():
+    return pd.DataFrame({"A": np.arange(1000, dtype="int64"), "B": np.linspace(0, 1, 1000),
+                         "C": pd.array(range(1000), dtype="Int64")})
+
+def _total(buffers):
+    return sum(size for size, _ in buffers.values())
+
+def test_shallow_copy_is_shared_and_deep_copy_allocated():
+    df = _frame()
+    before = frame_buffers(df)
+    shallow = frame_buffers(df.copy(deep=False))
+    deep = frame_buffers(df.copy(deep=True))
+    assert buffer_delta(before, shallow) == (0, _total(before))
+    assert buffer_delta(before, deep) == (_total(before), 0)
+
+def test_reused_address_of_freed_buffer_is_not_shared():
+    after = frame_buffers(_frame())
+    # Mismas direcciones que *after*, pero de dueños ya liberados
+    dead = weakref.ref(_Gone())
+    before = {address: (size, dead) for address, (size, _) in after.items()}
+    assert dead() is None
+    assert buffer_delta(before, after) == (_total(after), 0)
+
+class RecordingAudit:
+    def __init__(self):
+        self.copies = []
+
+    def log_copies(self, allocated, shared):
+        self.copies.append((allocated, shared))
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+def test_copies_summary_counts_unique_output_bytes(insurance_df):
+    config = {"rules_spec": os.path.join(SPECS_DIR, "very_complex.yaml"), "tables_path": TABLES_PATH}
+    audit = RecordingAudit()
+    output = apply_transformations(insurance_df, config, QuietLogger(), SPECS_DIR, audit)
+    assert len(audit.copies) == 1
+    allocated, shared = audit.copies[0]
+    assert allocated + shared == _total(frame_buffers(output))
+    assert shared <= _total(frame_buffers(insurance_df))
@@ -0,0 +1,237 @@
+"""Lectura del input: los caminos optimizados deben dar el mismo DataFrame que read_input"""
+import gzip
+
+import pandas as pd
+import pytest
+
+from conftest import COMPLEXITIES, rules_output, write_insurance_csv
+from reader import _byte_ranges, read_input, read_input_metadata
+import writer
+
+SCHEMA_CONFIG = {"type": "csv", "delimiter": ",", "schema": "insurance"}
+
+@pytest.mark.parametrize("workers", [2, 3, 8])
+@pytest.mark.parametrize("engine", ["c", "pyarrow"])
+@pytest.mark.parametrize("file_config", [
+    {"type": "csv", "delimiter": ","},
+    SCHEMA_CONFIG,
+    dict(SCHEMA_CONFIG, dtype_backend="pyarrow"),
+], ids=["plain", "schema", "arrow_backend"])
+def test_parallel_parse_matches_single_read(insurance_csv, file_config, engine, workers):
+    if engine == "pyarrow" or "dtype_backend" in file_config:
+        pytest.importorskip("pyarrow")
+    file_config = dict(file_config, engine=engine)
+    expected = read_input(insurance_csv, file_config)
+    result = read_input(insurance_csv, dict(file_config, parallel_workers=workers))
+    pd.testing.assert_frame_equal(result, expected)
+
+def test_parallel_parse_with_projection(insurance_csv):
+    columns = ["ID", "country", "annual_prem"]
+    expected = read_input(insurance_csv, SCHEMA_CONFIG, columns=columns)
+    result = read_input(insurance_csv, dict(SCHEMA_CONFIG, parallel_workers=2), columns=columns)
+    pd.testing.assert_frame_equal(result, expected)
+
+def test_byte_ranges_cover_every_line_once(tmp_path):
+    path = write_insurance_csv(str(tmp_path / "small.csv"), 7)
+    with open(path, "rb") as f:
+        header, body = f.readline(), f.read()
+    for parts in (1, 2, 5, 20):
+        ranges = _byte_ranges(path, parts)
+        assert ranges[0][0] == len(header) and ranges[-1][1] == len(header) + len(body)
+        with open(path, "rb") as f:
+            pieces = [(f.seek(start), f.read(end - start))[1] for start, end in ranges]
+        assert b"".join(pieces) == body
+        assert all(piece.endswith(b"\n") for piece in pieces)
+
+@pytest.mark.parametrize("name", COMPLEXITIES)
+@pytest.mark.parametrize("engine", ["c", "pyarrow"])
+@pytest.mark.parametrize("schema", [None, "insurance"])
+def test_arrow_backend_output_matches_numpy(name, engine, schema, insurance_csv, tmp_path):
+    pytest.importorskip("pyarrow")
+    from transformers.engine import numpy_backed
+    file_config = {"type": "csv", "delimiter": ",", "engine": engine, "schema": schema}
+    expected = rules_output(name, read_input(insurance_csv, file_config))
+    arrow_df = read_input(insurance_csv, dict(file_config, dtype_backend="pyarrow"))
+    result = rules_output(name, numpy_backed(arrow_df))
+    for suffix, write in ((".csv", writer.write_csv), (".rpt", writer.write_rpt)):
+        write(expected, str(tmp_path / f"numpy{suffix}"))
+        write(result, str(tmp_path / f"arrow{suffix}"))
+        assert (tmp_path / f"arrow{suffix}").read_bytes() == (tmp_path / f"numpy{suffix}").read_bytes()
+
+def _without_final_newline(path):
+    with open(path, "rb+") as f:
+        f.seek(-1, 2)
+        assert f.read(1) == b"\n"
+        f.seek(-1, 2)
+        f.truncate()
+    return path
+
+@pytest.mark.parametrize("name", ["input.csv", "no_newline.csv", "no_newline.csv.gz", "input.rpt"])
+def test_metadata_counts_small_files_exactly(name, tmp_path):
+    source = write_insurance_csv(str(tmp_path / "source.csv"), 3000)
+    path = str(tmp_path / name)
+    if name.endswith(".rpt"):
+        writer.write_rpt(read_input(source), path)  # Termina en el footer, sin salto de línea
+    else:
+        if name.startswith("no_newline"):
+            _without_final_newline(source)
+        with open(source, "rb") as f:
+            data = f.read()
+        with open(path, "wb") as f:
+            f.write(gzip.compress(data) if name.endswith(".gz") else data)
+    metadata = read_input_metadata(path)
+    assert (metadata["rows"], metadata["rows_exact"]) == (3000, True)
+    assert read_input_metadata(path, exact=True)["rows"] == 3000
+
+def test_metadata_estimates_large_files(tmp_path):
+    path = _without_final_newline(write_insurance_csv(str(tmp_path / "large.csv"), 15000))
+    metadata = read_input_metadata(path)
+    assert not metadata["rows_exact"] and abs(metadata["rows"] - 15000) < 15000 * 0.05
+    exact = read_input_metadata(path, exact=True)
+    assert (exact["rows"], exact["rows_exact"]) == (15000, True)
+
+class ReadingAudit:
+    """Audit que guarda los detalles de lectura (log_reading_detail)"""
+
+    def __init__(self):
+        self.details = {}
+
+    def log_reading_detail(self, key, value):
+        self.details[key] = value
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+def _sidecars(directory):
+    return sorted(p.name for p in directory.iterdir() if p.name.endswith(".feather"))
+
+def test_excel_sidecar_cache_miss_hit_and_invalidation(insurance_df, tmp_path):
+    pytest.importorskip("pyarrow")
+    pytest.importorskip("openpyxl")
+    path = str(tmp_path / "input.xlsx")
+    df = insurance_df.head(200)
+    df.to_excel(path, index=False)
+    expected = pd.read_excel(path)
+
+    audit = ReadingAudit()
+    pd.testing.assert_frame_equal(read_input(path, audit=audit), expected)
+    assert audit.details["Excel cache"] == "miss, sidecar written"
+    (sidecar,) = _sidecars(tmp_path)
+
+    audit = ReadingAudit()
+    pd.testing.assert_frame_equal(read_input(path, audit=audit), expected)
+    assert audit.details["Excel cache"] == f"hit ({sidecar})"
+    pd.testing.assert_frame_equal(read_input(path, columns=["ID", "country"]), expected[["ID", "country"]])
+
+    # Un workbook modificado cambia la clave: se regenera el sidecar y se elimina el anterior
+    df.head(50).to_excel(path, index=False)
+    audit = ReadingAudit()
+    pd.testing.assert_frame_equal(read_input(path, audit=audit), pd.read_excel(path))
+    assert audit.details["Excel cache"] == "miss, sidecar written"
+    assert len(_sidecars(tmp_path)) == 1 and _sidecars(tmp_path) != [sidecar]
+
+def test_excel_cache_can_be_disabled(insurance_df, tmp_path):
+    pytest.importorskip("openpyxl")
+    path = str(tmp_path / "input.xlsx")
+    insurance_df.head(20).to_excel(path, index=False)
+    result = read_input(path, {"type": "excel", "excel_cache": False})
+    pd.testing.assert_frame_equal(result, pd.read_excel(path))
+    assert _sidecars(tmp_path) == []
+
+def _split_csv(source, directory, parts):
+    """Partir el CSV *source* en *parts* archivos con header (part0.csv, part1.csv, ...)"""
+    with open(source, "rb") as f:
+        header, *lines = f.readlines()
+    for i in range(parts):
+        (directory / f"part{i}.csv").write_bytes(header + b"".join(lines[i * len(lines) // parts:(i + 1) * len(lines) // parts]))
+
+@pytest.mark.parametrize("read_workers", [1, 4])
+@pytest.mark.parametrize("file_config", [{"type": "csv", "delimiter": ","}, SCHEMA_CONFIG], ids=["plain", "schema"])
+def test_multi_file_inputs_match_single_read(insurance_csv, tmp_path, file_config, read_workers):
+    _split_csv(insurance_csv, tmp_path, 4)
+    (tmp_path / "notes.txt").write_text("not an input")
+    expected = read_input(insurance_csv, file_config)
+    config = dict(file_config, read_workers=read_workers)
+    audit = ReadingAudit()
+    # Las categorías de cada parte son distintas: se unifican al concatenar
+    pd.testing.assert_frame_equal(read_input(str(tmp_path), config, audit=audit), expected)
+    assert audit.details["Files"] == f"4 (read with {read_workers} thread(s))"
+    pd.testing.assert_frame_equal(read_input(str(tmp_path / "part*.csv"), config), expected)
+    columns = ["ID", "country"]
+    pd.testing.assert_frame_equal(read_input(str(tmp_path / "part*.csv"), config, columns=columns),
+                                  read_input(insurance_csv, file_config, columns=columns))
+
+def test_columnar_multi_file_inputs(insurance_df, tmp_path):
+    pytest.importorskip("pyarrow")
+    for i, start in enumerate(range(0, len(insurance_df), 2000)):
+        part = insurance_df.iloc[start:start + 2000].reset_index(drop=True)
+        part.to_parquet(tmp_path / f"part{i}.parquet")
+        part.to_feather(tmp_path / f"part{i}.feather")
+    pd.testing.assert_frame_equal(read_input(str(tmp_path / "*.parquet")), insurance_df)
+    pd.testing.assert_frame_equal(read_input(str(tmp_path / "*.feather")), insurance_df)
+
+def test_glob_without_matches_raises(tmp_path):
+    with pytest.raises(FileNotFoundError, match="No input files found"):
+        read_input(str(tmp_path / "*.csv"))
+
+@pytest.mark.parametrize("compression", ["uncompressed", "zstd", "lz4"])
+def test_feather_mapped_matches_read_feather(insurance_df, tmp_path, compression):
+    pytest.importorskip("pyarrow")
+    from reader import read_feather_mapped
+    path = str(tmp_path / "input.feather")
+    insurance_df.to_feather(path, compression=compression)
+    audit = ReadingAudit()
+    pd.testing.assert_frame_equal(read_feather_mapped(path, audit=audit), pd.read_feather(path))
+    # Sin compresión las columnas numéricas sin nulos se exponen sobre el mapeo
+    zero_copy = 5 if compression == "uncompressed" else 0
+    assert audit.details["Memory map"].endswith(f"{zero_copy} of 13 columns zero-copy")
+    columns = ["ID", "country", "annual_prem"]
+    pd.testing.assert_frame_equal(read_feather_mapped(path, columns), pd.read_feather(path, columns=columns))
+
+def test_feather_mapped_reads_arrow_stream_format(insurance_df, tmp_path):
+    pa = pytest.importorskip("pyarrow")
+    from reader import read_feather_mapped
+    path = str(tmp_path / "input.arrow")
+    table = pa.Table.from_pandas(insurance_df, preserve_index=False)
+    with pa.OSFile(path, "wb") as sink, pa.ipc.new_stream(sink, table.schema) as stream:
+        stream.write_table(table, max_chunksize=1000)
+    pd.testing.assert_frame_equal(read_feather_mapped(path), insurance_df)
+    pd.testing.assert_frame_equal(read_input(path), insurance_df)
+
+@pytest.mark.parametrize("name", COMPLEXITIES)
+def test_rpt_round_trip_is_byte_identical(name, insurance_df, tmp_path):
+    from reader import read_rpt
+    df = rules_output(name, insurance_df)
+    writer.write_rpt(df, str(tmp_path / "first.rpt"))
+    again = read_rpt(str(tmp_path / "first.rpt"))
+    assert list(again.columns) == list(df.columns) and len(again) == len(df)
+    writer.write_rpt(again, str(tmp_path / "second.rpt"))
+    first_types, *first_body = (tmp_path / "first.rpt").read_bytes().split(b"\n")
+    second_types, *second_body = (tmp_path / "second.rpt").read_bytes().split(b"\n")
+    assert second_body == first_body
+    # Las columnas 'NA' (intervalos de pd.cut, fechas) se releen como texto
+    for first, second in zip(first_types.split(b","), second_types.split(b",")):
+        assert second == first or (first == b"NA" and second.startswith(b"T"))
+
+    chunks = list(read_rpt(str(tmp_path / "first.rpt"), chunk_size=700))
+    assert all(len(chunk) <= 700 for chunk in chunks)
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), again)
+    columns = list(df.columns[::3])
+    pd.testing.assert_frame_equal(read_rpt(str(tmp_path / "first.rpt"), columns=columns), again[columns])
+
+def test_rpt_reader_types(tmp_path):
+    from reader import read_rpt
+    df = pd.DataFrame({
+        "I": [1, 2, 3],
+        "NI": pd.array([1, None, 3], dtype="Int64"),
+        "N": [0.5, None, 2.25],
+        "T": ["Swiss Re", None, "SCOR"],
+    })
+    path = str(tmp_path / "types.rpt")
+    writer.write_rpt(df, path)
+    result = read_rpt(path)
+    assert result.dtypes.astype(str).tolist() == ["int64", "Int64", "float64", "object"]
+    assert result["NI"].isna().tolist() == [False, True, False]
+    assert result["T"].tolist()[::2] == ["Swiss Re", "SCOR"]
+    assert isinstance(read_rpt(path, text_dtype="category")["T"].dtype, pd.CategoricalDtype)
+    pd.testing.assert_frame_equal(read_input(path), result)
@@ -0,0 +1,103 @@
+"""Specs declarativas de reglas: el plan compilado debe producir la misma salida que la referencia"""
+import os
+from collections import defaultdict
+
+import pandas as pd
+import pytest
+
+from conftest import COMPLEXITIES, SPECS_DIR, TABLES_PATH, QuietLogger, rules_output
+from transformers.engine import estimate_pruned_time
+from transformers.spec import compile_rules
+
+class RecordingAudit:
+    """Audit mínimo que guarda las llamadas de registro"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.calls.append(name)
+
+def _spec(name):
+    return os.path.join(SPECS_DIR, f"{name}.yaml")
+
+@pytest.mark.parametrize("name", COMPLEXITIES)
+def test_spec_matches_python_rules(name, insurance_df):
+    rules = compile_rules(_spec(name), TABLES_PATH)
+    pd.testing.assert_frame_equal(rules.execute(insurance_df, QuietLogger()), rules_output(name, insurance_df))
+
+@pytest.mark.parametrize("name", COMPLEXITIES)
+def test_spec_matches_python_rules_with_schema(name, insurance_csv):
+    from reader import read_input
+    df = read_input(insurance_csv, {"type": "csv", "delimiter": ",", "schema": "insurance"})
+    rules = compile_rules(_spec(name), TABLES_PATH)
+    pd.testing.assert_frame_equal(rules.execute(df, QuietLogger()), rules_output(name, df))
+
+@pytest.mark.parametrize("name", COMPLEXITIES)
+def test_pruning_leaves_output_unchanged(name, insurance_df):
+    pruned = compile_rules(_spec(name), TABLES_PATH, prune=True)
+    full = compile_rules(_spec(name), TABLES_PATH, prune=False)
+    pd.testing.assert_frame_equal(pruned.execute(insurance_df, QuietLogger()),
+                                  full.execute(insurance_df, QuietLogger()))
+
+def test_pruned_time_estimated_only_on_request(insurance_df, monkeypatch):
+    rules = compile_rules(_spec("very_complex"), TABLES_PATH)
+    assert rules.pruned
+    estimated = []
+    monkeypatch.setattr(rules, "estimate_pruned_seconds", lambda df: estimated.append(len(df)) or defaultdict(float))
+    monkeypatch.setattr(rules, "_pruning_logged", False)
+
+    audit = RecordingAudit()
+    rules.execute(insurance_df, QuietLogger(), audit)
+    assert "log_pruned_steps" in audit.calls and not estimated
+
+    config = {"rules_spec": _spec("very_complex"), "tables_path": TABLES_PATH}
+    estimate_pruned_time(insurance_df, config, SPECS_DIR, audit)
+    assert not estimated
+    estimate_pruned_time(insurance_df, dict(config, estimate_pruned_time=True), SPECS_DIR, audit)
+    assert estimated == [len(insurance_df)]
+
+@pytest.mark.parametrize("name", ["complex", "very_complex"])
+@pytest.mark.parametrize("sample_rows", [20_000, 2_000], ids=["full_sample", "extrapolated"])
+def test_pruned_time_estimate_covers_every_pruned_step(name, sample_rows, insurance_df, monkeypatch):
+    import transformers.spec as spec
+    monkeypatch.setattr(spec, "PRUNE_SAMPLE_ROWS", sample_rows)
+    rules = compile_rules(_spec(name), TABLES_PATH)
+    before = insurance_df.copy()
+    estimates = rules.estimate_pruned_seconds(insurance_df)
+    assert sorted(estimates) == [step.index for step in rules.pruned]
+    assert all(seconds is not None and seconds >= 0 for seconds in estimates.values())
+    pd.testing.assert_frame_equal(insurance_df, before)
+
+PRUNED_SPEC = """
+steps:
+  - kind: derive
+    column: BIRTH_YEAR
+    expr: year(to_datetime(birth_date, format="%d/%m/%Y"))
+  - kind: derive
+    column: DOUBLE_PREM
+    expr: annual_prem * 2
+  - kind: select
+    columns: [ID, DOUBLE_PREM]
+"""
+
+def test_pruned_time_estimate_written_to_audit(insurance_csv, tmp_path):
+    from audit import AuditLogger
+    from reader import read_input
+    from transformers.engine import required_input_columns
+    spec_path = tmp_path / "pruned.yaml"
+    spec_path.write_text(PRUNED_SPEC)
+    config = {"rules_spec": str(spec_path), "tables_path": TABLES_PATH, "estimate_pruned_time": True}
+    columns = required_input_columns(config, SPECS_DIR)
+    assert columns == {"ID", "annual_prem"}
+
+    audit = AuditLogger(log_dir=str(tmp_path))
+    audit.log_path = str(tmp_path / "audit.txt")
+    # Con proyección el paso eliminado no tiene su columna de input: no se puede estimar
+    estimate_pruned_time(read_input(insurance_csv, columns=columns), config, SPECS_DIR, audit)
+    estimate_pruned_time(read_input(insurance_csv), config, SPECS_DIR, audit)
+    lines = (tmp_path / "audit.txt").read_text(encoding="utf-8").splitlines()
+    estimates = [line for line in lines if "BIRTH_YEAR derivation" in line]
+    assert estimates[0].endswith("n/a (input columns not read)")
+    assert estimates[1].split(": ")[-1].startswith("~") and estimates[1].endswith("s")
+    assert audit.metrics["pruned_estimated_seconds"] > 0
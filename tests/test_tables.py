@@ -0,0 +1,57 @@
+"""lookup() debe dar las mismas columnas que el left merge al que sustituye"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import TABLES_PATH
+from transformers.tables import TableError, TableRegistry, lookup
+
+def _merged(df, table, left_on, right_on):
+    """Referencia: el left merge original, con el índice de df y sin la clave de la tabla"""
+    merged = df.merge(table, how="left", left_on=left_on, right_on=right_on)
+    if right_on != left_on:
+        merged = merged.drop(columns=right_on)
+    merged.index = df.index
+    return merged
+
+TABLE = pd.DataFrame({"code": [1, 2, 3], "label": ["one", "two", "three"], "rate": [0.5, 1.5, 2.5],
+                      "count": [10, 20, 30], "flag": pd.array([True, False, None], dtype="boolean")})
+
+@pytest.mark.parametrize("keys", [
+    np.array([1, 2, 3, 2, 1]),
+    np.array([3, 4, 1, 9, 2]),                    # claves sin correspondencia
+    np.array([1.0, np.nan, 2.0, 5.0, 3.0]),       # claves NaN
+    pd.array([1, None, 3, 7, 2], dtype="Int64"),
+    pd.Categorical([2, 1, 4, 2, 3]),
+], ids=["matched", "unmatched", "nan", "nullable", "categorical"])
+def test_lookup_matches_left_merge(keys):
+    df = pd.DataFrame({"key": keys, "value": range(len(keys))}, index=[10, 11, 12, 13, 14])
+    expected = _merged(df, TABLE, "key", "code")
+    result = lookup(df.copy(), TABLE, left_on="key", right_on="code")
+    pd.testing.assert_frame_equal(result, expected)
+
+def test_lookup_string_keys_match_left_merge():
+    table = pd.DataFrame({"country": ["Chile", "Peru"], "currency": ["CLP", "PEN"]})
+    df = pd.DataFrame({"country": ["Peru", "Brasil", None, "Chile"]})
+    pd.testing.assert_frame_equal(lookup(df.copy(), table, "country"), _merged(df, table, "country", "country"))
+    df = df.astype("category")
+    pd.testing.assert_frame_equal(lookup(df.copy(), table, "country"), _merged(df, table, "country", "country"))
+
+def test_lookup_rejects_duplicate_and_incompatible_keys():
+    df = pd.DataFrame({"key": [1, 2]})
+    with pytest.raises(TableError):
+        lookup(df, pd.DataFrame({"key": [1, 1], "v": [0, 1]}), "key")
+    with pytest.raises(TableError):
+        lookup(df, pd.DataFrame({"key": ["1", "2"], "v": [0, 1]}), "key")
+
+@pytest.mark.parametrize("name, left_on, right_on", [
+    ("tariff_map", "tariff_grp", "tariff_grp"),
+    ("currency_map", "country", "country"),
+    ("temp_idx_map", "temp_idx", "idx"),
+])
+def test_registry_lookup_matches_merge_on_repo_tables(name, left_on, right_on, insurance_df):
+    registry = TableRegistry(TABLES_PATH, cache=False)
+    table = registry.get(name)
+    df = insurance_df[[left_on]].copy()
+    expected = _merged(df, table, left_on, right_on)
+    pd.testing.assert_frame_equal(registry.lookup(df.copy(), name, left_on, right_on), expected)
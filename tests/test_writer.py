@@ -0,0 +1,262 @@
+"""Escritura de outputs: el .rpt y el .csv deben coincidir byte a byte con los writers originales"""
+import gzip
+
+import pandas as pd
+import pandas.api.types as ptypes
+import pytest
+
+from conftest import COMPLEXITIES, rules_output
+import writer
+
+def _baseline_rpt(df):
+    """Texto .rpt del writer original (d90236c), referencia del formato"""
+    def variable_type(series):
+        if ptypes.is_integer_dtype(series):
+            return "I"
+        if ptypes.is_float_dtype(series):
+            return "N"
+        if ptypes.is_object_dtype(series):
+            return f"T{series.dropna().astype(str).str.len().max()}"
+        return "NA"
+
+    lines = [",".join(["VARIABLE_TYPES"] + [variable_type(df[c]) for c in df.columns]),
+             ",".join(["!1"] + list(df.columns))]
+    lines += [",".join(["*"] + row) for row in df.astype(str).values.tolist()]
+    return "\n".join(lines + ["", "##END##"])
+
+def _read(path):
+    with open(path, encoding="utf-8", newline="") as f:
+        return f.read()
+
+@pytest.mark.parametrize("name", COMPLEXITIES)
+def test_rpt_matches_baseline_writer(name, insurance_df, tmp_path):
+    df = rules_output(name, insurance_df)
+    writer.write_rpt(df, str(tmp_path / "out.rpt"))
+    assert _read(tmp_path / "out.rpt") == _baseline_rpt(df)
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_rpt_from_chunks_matches_baseline_writer(workers, insurance_df, tmp_path):
+    df = rules_output("very_complex", insurance_df)
+    chunks = (df.iloc[start:start + 1300] for start in range(0, len(df), 1300))
+    writer.write_rpt(chunks, str(tmp_path / "chunks.rpt"), workers=workers)
+    assert _read(tmp_path / "chunks.rpt") == _baseline_rpt(df)
+
+def test_rpt_serializes_values_like_astype_str(tmp_path):
+    df = pd.DataFrame({
+        "F": [0.1 + 0.2, float("nan"), 1e22, -0.0],
+        "T": ["with, comma", None, "", "ñandú"],
+        "B": [True, False, True, False],
+        "D": pd.to_datetime(["2020-01-01", None, "2021-06-30 12:30", "1999-12-31"], format="mixed"),
+        "I": pd.array([1, None, 3, 4], dtype="Int64"),
+        "MIXED": [1, "a", 2.5, None],
+    })
+    writer.write_rpt(df, str(tmp_path / "values.rpt"))
+    assert _read(tmp_path / "values.rpt") == _baseline_rpt(df)
+
+def test_rpt_header_types_categoricals(tmp_path):
+    df = pd.DataFrame({
+        "I": [1, 2, 3],
+        "N": [1.5, None, 2.0],
+        "T": ["a", "bbb", None],
+        "BINS": pd.cut([1, 5, 9], bins=[0, 3, 6, 10], labels=["LOW", "MEDIUM", "HIGH"]),
+        "INTERVALS": pd.cut([1, 5, 9], bins=[0, 3, 6, 10]),
+        "CODES": pd.Categorical([1, 2, 1]),
+        "NAMES": pd.Categorical(["Swiss Re", None, "SCOR"]),
+        "D": pd.to_datetime(["2020-01-01", "2021-06-30", None]),
+    })
+    writer.write_rpt(df, str(tmp_path / "types.rpt"))
+    assert _read(tmp_path / "types.rpt").split("\n")[0] == "VARIABLE_TYPES,I,N,T3,NA,NA,I,T8,NA"
+
+@pytest.mark.parametrize("name", COMPLEXITIES)
+def test_rpt_same_with_and_without_schema(name, insurance_csv, tmp_path):
+    from reader import read_input
+    plain = rules_output(name, read_input(insurance_csv))
+    typed = rules_output(name, read_input(insurance_csv, {"type": "csv", "delimiter": ",", "schema": "insurance"}))
+    writer.write_rpt(plain, str(tmp_path / "plain.rpt"))
+    writer.write_rpt(typed, str(tmp_path / "typed.rpt"))
+    assert _read(tmp_path / "typed.rpt") == _read(tmp_path / "plain.rpt")
+
+@pytest.mark.parametrize("name", COMPLEXITIES)
+def test_csv_arrow_engine_matches_pandas(name, insurance_df, tmp_path):
+    pytest.importorskip("pyarrow")
+    df = rules_output(name, insurance_df)
+    writer.write_csv(df, str(tmp_path / "pandas.csv"), engine="pandas")
+    writer.write_csv(df, str(tmp_path / "arrow.csv"), engine="pyarrow")
+    assert _read(tmp_path / "arrow.csv") == _read(tmp_path / "pandas.csv")
+
+def test_csv_arrow_engine_formats_like_to_csv(tmp_path):
+    pytest.importorskip("pyarrow")
+    df = pd.DataFrame({
+        "B": [True, False, True],
+        "NB": pd.array([True, None, False], dtype="boolean"),
+        "D": pd.to_datetime(["2020-01-01", None, "2021-06-30 12:30"], format="mixed"),
+        "F": [20.0, 1e-05, float("nan")],
+        "I": pd.array([1, None, 3], dtype="Int64"),
+        "C": pd.Categorical(["LOW", None, "HIGH"]),
+        "MIXED": [1, "a", 2.5],
+        "T": ["plain", None, "text"],
+    })
+    quoted = df.assign(T=["with, comma", 'with "quotes"', None])
+    for frame in (df, quoted, df[["F"]]):
+        writer.write_csv(frame, str(tmp_path / "pandas.csv"), engine="pandas")
+        writer.write_csv(frame, str(tmp_path / "arrow.csv"), engine="pyarrow")
+        assert _read(tmp_path / "arrow.csv") == _read(tmp_path / "pandas.csv")
+
+class _TransformError(Exception):
+    pass
+
+def _fail_after_first_chunk(out, df):
+    with pytest.raises(_TransformError):
+        with out:
+            out.write(df.iloc[:1000])
+            raise _TransformError("transform failed mid-stream")
+
+@pytest.mark.parametrize("workers", [1, 2])
+@pytest.mark.parametrize("file_name", ["res.rpt", "res.rpt.gz", "res.csv", "res.csv.zst"])
+def test_stream_writer_failure_leaves_no_output(file_name, workers, insurance_df, tmp_path):
+    path = str(tmp_path / file_name)
+    _fail_after_first_chunk(writer.open_stream_writer(path, workers=workers), insurance_df)
+    assert sorted(p.name for p in tmp_path.iterdir()) == []
+
+def test_fanout_failure_leaves_no_output(insurance_df, tmp_path):
+    pytest.importorskip("pyarrow")
+    paths = [str(tmp_path / name) for name in ("res.rpt", "res.csv", "res.parquet", "res.feather")]
+    _fail_after_first_chunk(writer.open_output_writers(paths), insurance_df)
+    assert sorted(p.name for p in tmp_path.iterdir()) == []
+
+def test_partitioned_failure_leaves_no_files_or_manifest(insurance_df, tmp_path):
+    out = writer.PartitionedStreamWriter(str(tmp_path / "res.csv"), partition_by="country", max_rows_per_file=50)
+    _fail_after_first_chunk(out, insurance_df)
+    assert not [p for p in tmp_path.rglob("*") if p.is_file()]
+
+def test_partitions_with_the_same_dir_name_do_not_overwrite(tmp_path):
+    import json
+    df = pd.DataFrame({"KEY": ["a/b", "a_b", "A_B", "a:b", None, "_null_"], "V": range(6)})
+    with writer.PartitionedStreamWriter(str(tmp_path / "res.csv"), partition_by="KEY") as out:
+        out.write(df.iloc[:3])
+        out.write(df.iloc[3:])
+    with open(tmp_path / "res" / "_manifest.json", encoding="utf-8") as f:
+        files = json.load(f)["files"]
+    assert len({entry["path"].casefold() for entry in files}) == len(files) == 6
+    for entry in files:
+        written = pd.read_csv(tmp_path / "res" / entry["path"], keep_default_na=False)
+        value = entry["partition"]["KEY"]
+        expected = df[df["KEY"].isna()] if value is None else df[df["KEY"] == value]
+        assert written["V"].tolist() == expected["V"].tolist()
+
+def _drifting_chunks():
+    """Chunks whose Arrow types change: all-null columns that get values, integers that turn float"""
+    return [
+        pd.DataFrame({"A": [1, 2], "N": [None, None], "D": pd.to_datetime(["2020-01-01", "2021-06-30"]).as_unit("s")}),
+        pd.DataFrame({"A": [1.5, float("nan")], "N": ["x", None], "D": pd.to_datetime(["2022-01-01", None])}),
+        pd.DataFrame({"A": [3, 4], "N": [None, None], "D": pd.to_datetime(["2023-01-01", "2024-01-01"])}),
+    ]
+
+@pytest.mark.parametrize("file_name", ["res.parquet", "res.feather"])
+def test_columnar_stream_writer_widens_drifting_chunks(file_name, tmp_path):
+    pytest.importorskip("pyarrow")
+    chunks = _drifting_chunks()
+    path = str(tmp_path / file_name)
+    with writer.open_stream_writer(path, row_group_size=1) as out:
+        out.write_chunks(chunks)
+    read = pd.read_parquet if file_name.endswith(".parquet") else pd.read_feather
+    expected = pd.concat(chunks, ignore_index=True)
+    pd.testing.assert_frame_equal(read(path), expected.astype({"D": "datetime64[ns]"}))
+    assert sorted(p.name for p in tmp_path.iterdir()) == [file_name]
+
+@pytest.mark.parametrize("file_name", ["res.parquet", "res.feather"])
+def test_columnar_stream_writer_rejects_incompatible_chunks(file_name, tmp_path):
+    pytest.importorskip("pyarrow")
+    path = str(tmp_path / file_name)
+    with pytest.raises(ValueError, match="column 'A' is int64 in earlier chunks but string"):
+        with writer.open_stream_writer(path) as out:
+            out.write(pd.DataFrame({"A": [1, 2]}))
+            out.write(pd.DataFrame({"A": ["x", "y"]}))
+    assert sorted(p.name for p in tmp_path.iterdir()) == []
+
+@pytest.mark.parametrize("name", COMPLEXITIES)
+@pytest.mark.parametrize("ext", [".parquet", ".feather"])
+def test_columnar_outputs_round_trip(name, ext, insurance_df, tmp_path):
+    pytest.importorskip("pyarrow")
+    df = rules_output(name, insurance_df)
+    write, read = (writer.write_parquet, pd.read_parquet) if ext == ".parquet" else (writer.write_arrow, pd.read_feather)
+    write(df, str(tmp_path / f"batch{ext}"))
+    pd.testing.assert_frame_equal(read(tmp_path / f"batch{ext}"), df.reset_index(drop=True))
+    with writer.open_stream_writer(str(tmp_path / f"stream{ext}")) as out:
+        for start in range(0, len(df), 1200):
+            out.write(df.iloc[start:start + 1200])
+    # En streaming las categóricas se escriben como valores (cada chunk tiene sus categorías)
+    expected = df.reset_index(drop=True)
+    expected = expected.astype({col: expected[col].cat.categories.dtype
+                                for col in expected.select_dtypes("category").columns})
+    streamed = read(tmp_path / f"stream{ext}")
+    pd.testing.assert_frame_equal(streamed, expected)
+
+@pytest.mark.parametrize("compression", ["zstd", "snappy", "gzip", "none"])
+def test_parquet_output_codec_and_row_groups(compression, insurance_df, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = str(tmp_path / "res.parquet")
+    writer.write_parquet(insurance_df, path, compression=compression, row_group_size=1000,
+                         use_dictionary=["country"])
+    metadata = pq.ParquetFile(path).metadata
+    assert metadata.num_row_groups == 5
+    column = metadata.row_group(0).column(0)
+    assert column.compression == ("UNCOMPRESSED" if compression == "none" else compression.upper())
+    country = metadata.schema.names.index("country")
+    assert "RLE_DICTIONARY" in metadata.row_group(0).column(country).encodings
+    assert "RLE_DICTIONARY" not in metadata.row_group(0).column(metadata.schema.names.index("reins_name")).encodings
+
+@pytest.mark.parametrize("compression", ["zstd", "lz4", "none"])
+def test_arrow_output_codec_and_batches(compression, insurance_df, tmp_path):
+    pa = pytest.importorskip("pyarrow")
+    path = str(tmp_path / "res.arrow")
+    writer.write_arrow(insurance_df, path, compression=compression, row_group_size=1000)
+    with pa.memory_map(path) as source:
+        assert pa.ipc.open_file(source).num_record_batches == 5
+    pd.testing.assert_frame_equal(pd.read_feather(path), insurance_df)
+
+def test_columnar_outputs_reject_unknown_codecs(insurance_df, tmp_path):
+    with pytest.raises(ValueError, match="brotli"):
+        writer.write_arrow(insurance_df, str(tmp_path / "res.feather"), compression="brotli")
+    with pytest.raises(ValueError, match="lzma"):
+        writer.ParquetStreamWriter(str(tmp_path / "res.parquet"), compression="lzma")
+
+class RecordingWriteAudit:
+    """Audit que guarda los detalles de escritura (log_writing_detail)"""
+
+    def __init__(self):
+        self.details = {}
+
+    def log_writing_detail(self, key, value):
+        self.details[key] = value
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+@pytest.mark.parametrize("name", COMPLEXITIES)
+@pytest.mark.parametrize("workers", [1, 2])
+def test_fanout_outputs_match_single_format_writers(name, workers, insurance_df, tmp_path):
+    pytest.importorskip("pyarrow")
+    df = rules_output(name, insurance_df)
+    writer.write_rpt(df, str(tmp_path / "expected.rpt"))
+    writer.write_csv(df, str(tmp_path / "expected.csv"))
+    names = ["res.rpt", "res.csv", "copy.csv", "res.parquet", "res.feather"]
+    audit = RecordingWriteAudit()
+    with writer.open_output_writers([str(tmp_path / n) for n in names], workers=workers, audit=audit) as out:
+        assert "res.rpt + res.csv (shared text formatting)" in out.targets
+        for start in range(0, len(df), 1500):
+            out.write(df.iloc[start:start + 1500])
+    assert _read(tmp_path / "res.rpt") == _read(tmp_path / "expected.rpt")
+    assert _read(tmp_path / "res.csv") == _read(tmp_path / "copy.csv") == _read(tmp_path / "expected.csv")
+    pd.testing.assert_frame_equal(pd.read_parquet(tmp_path / "res.parquet"), pd.read_feather(tmp_path / "res.feather"))
+    assert len(pd.read_parquet(tmp_path / "res.parquet")) == len(df)
+    assert {key for key in audit.details if key.startswith("Target ")} == {f"Target {target}" for target in out.targets}
+
+def test_write_outputs_matches_single_format_writers(insurance_df, tmp_path):
+    df = rules_output("medium", insurance_df)
+    writer.write_rpt(df, str(tmp_path / "expected.rpt"))
+    writer.write_csv(df, str(tmp_path / "expected.csv"))
+    writer.write_outputs(df, [str(tmp_path / "res.rpt"), str(tmp_path / "res.csv.gz")])
+    assert _read(tmp_path / "res.rpt") == _read(tmp_path / "expected.rpt")
+    with gzip.open(tmp_path / "res.csv.gz", "rt", encoding="utf-8", newline="") as f:
+        assert f.read() == _read(tmp_path / "expected.csv")
@@ -65,7 +65,8 @@ def run_pipeline(self):
         },
         "output_file_config": {
             "type": output_config.get("file_type"),
-            "format": output_config.get("file_type").replace(".", "").upper()
+            "format": output_config.get("file_type").replace(".", "").upper(),
+            **({"compression": output_config["compression"]} if output_config.get("compression") else {})
         },
         "enable_audit": self.state.get('enable_audit', True)
     }
@@ -4,6 +4,9 @@ import pandas as pd
 from views.components import create_data_preview
 from components.corporate_colors import CorporateColors
 
+# Filas leídas para el preview (los totales se obtienen de los metadatos del archivo)
+PREVIEW_ROWS = 1000
+
 
 class InputTab:
     """Tab para configuración de archivos de entrada - Diseño Corporativo"""
@@ -83,7 +86,7 @@ class InputTab:
             ft.Row([
                 ft.TextField(
                     label="File Path",
-                    hint_text="Enter file path or browse",
+                    hint_text="Enter file path, directory or glob pattern (e.g. inputs/*.csv)",
                     expand=True,
                     on_change=self.input_path_changed,
                     ref=self.input_path_field,
@@ -100,7 +103,7 @@ class InputTab:
             ], spacing=10),
             
             ft.Text(
-                "Supported formats: CSV, Excel (.xlsx, .xls), Parquet",
+                "Supported formats: CSV (also .gz, .bz2, .xz, .zst), Excel (.xlsx, .xls), Parquet, Feather/Arrow (.feather, .arrow)",
                 size=11,
                 color=CorporateColors.TEXT_SECONDARY,
                 italic=True
@@ -118,6 +121,7 @@ class InputTab:
                     ft.dropdown.Option("csv", "CSV/Delimited"),
                     ft.dropdown.Option("excel", "Excel (xlsx/xls)"),
                     ft.dropdown.Option("parquet", "Parquet"),
+                    ft.dropdown.Option("feather", "Feather/Arrow"),
                 ],
                 value="auto",
                 on_change=self.file_type_changed,
@@ -223,22 +227,26 @@ class InputTab:
             self.toast.warning("⚠️ Please enter a file path first")
             return
         
-        if not os.path.exists(input_path):
+        # Directorios y patrones glob: se valida y previsualiza el primer archivo
+        from reader import detect_file_type, expand_input_paths, read_input_metadata
+        try:
+            input_files = expand_input_paths(input_path)
+        except FileNotFoundError:
+            input_files = []
+        
+        if not input_files or not os.path.exists(input_files[0]):
             self.toast.error("⛔ File not found! Please check the path")
             return
         
+        preview_path = input_files[0]
+        
         try:
-            # Determinar tipo de archivo
-            file_ext = os.path.splitext(input_path)[1].lower()
-            
+            # Determinar tipo de archivo (misma detección que el pipeline, incluye .csv.gz/.zst...)
             if file_type == "auto":
-                if file_ext == '.csv':
-                    final_file_type = "csv"
-                elif file_ext in ['.xlsx', '.xls']:
-                    final_file_type = "excel"
-                elif file_ext == '.parquet':
-                    final_file_type = "parquet"
-                else:
+                try:
+                    final_file_type = detect_file_type(preview_path)
+                except ValueError:
+                    file_ext = os.path.splitext(preview_path)[1].lower()
                     self.toast.error(f"⛔ Cannot auto-detect file format: {file_ext}")
                     return
             else:
@@ -255,8 +263,11 @@ class InputTab:
                     delimiter = self.delimiter_field.current.value or ","
                 read_params = {"sep": delimiter}
             
-            # Leer archivo
-            df_preview = self.read_file(input_path, final_file_type, read_params)
+            # Filas y columnas desde los metadatos (sin parsear el archivo completo)
+            metadata = read_input_metadata(input_path, {"type": final_file_type, "delimiter": delimiter})
+            
+            # Leer solo las primeras filas para el preview
+            df_preview = self.read_file(preview_path, final_file_type, read_params, nrows=PREVIEW_ROWS)
             
             if df_preview is not None:
                 # Guardar configuración validada
@@ -268,8 +279,12 @@ class InputTab:
                 })
                 
                 # Success y preview
-                self.toast.success(f"✅ File validated: {df_preview.shape[0]:,} rows × {df_preview.shape[1]} cols")
-                self.update_preview(df_preview, input_path, final_file_type)
+                rows = f"{'' if metadata['rows_exact'] else '~'}{metadata['rows']:,} rows × {len(metadata['columns'])} cols"
+                if len(input_files) > 1:
+                    self.toast.success(f"✅ {len(input_files)} files validated ({rows}, preview of {os.path.basename(preview_path)})")
+                else:
+                    self.toast.success(f"✅ File validated: {rows}")
+                self.update_preview(df_preview, preview_path, final_file_type, metadata)
 
         except Exception as ex:
             self.toast.error(f"⛔ Error reading file: {str(ex)}")
@@ -280,24 +295,41 @@ class InputTab:
             if self.update_sidebar:
                 self.update_sidebar()
     
-    def read_file(self, file_path: str, file_type: str, read_params: dict):
-        """Leer archivo según su tipo"""
+    def read_file(self, file_path: str, file_type: str, read_params: dict, nrows: int = None):
+        """Leer archivo según su tipo (nrows limita las filas leídas en CSV y Parquet)"""
         if file_type == "csv":
-            return pd.read_csv(file_path, **read_params)
+            return pd.read_csv(file_path, nrows=nrows, **read_params)
         elif file_type == "excel":
-            return pd.read_excel(file_path, **read_params)
+            # Misma caché binaria (sidecar Feather) que usa el pipeline
+            from reader import read_excel_cached
+            return read_excel_cached(file_path, **read_params)
         elif file_type == "parquet":
+            if nrows is not None:
+                import pyarrow.parquet as pq
+                batch = next(pq.ParquetFile(file_path).iter_batches(batch_size=nrows), None)
+                if batch is not None:
+                    return batch.to_pandas()
             return pd.read_parquet(file_path, **read_params)
+        elif file_type == "feather":
+            # Lectura memory-mapped, igual que en el pipeline
+            from reader import read_feather_mapped
+            return read_feather_mapped(file_path, **read_params)
         else:
             raise ValueError(f"Unsupported file type: {file_type}")
     
-    def update_preview(self, df: pd.DataFrame, file_path: str, file_type: str):
-        """Actualizar el área de preview con datos reales"""
+    def update_preview(self, df: pd.DataFrame, file_path: str, file_type: str, metadata: dict = None):
+        """Actualizar el área de preview con datos reales (totales desde los metadatos si se pasan)"""
         # Estadísticas rápidas
+        if metadata:
+            rows = f"{'' if metadata['rows_exact'] else '~'}{metadata['rows']:,}"
+            columns = len(metadata['columns'])
+            size_kb = metadata['bytes'] / 1024
+        else:
+            rows, columns, size_kb = f"{len(df):,}", len(df.columns), os.path.getsize(file_path) / 1024
         stats_row = ft.Row([
-            self._create_stat_badge("Rows", f"{len(df):,}", ft.Icons.TABLE_ROWS),
-            self._create_stat_badge("Columns", f"{len(df.columns)}", ft.Icons.VIEW_COLUMN),
-            self._create_stat_badge("Size", f"{os.path.getsize(file_path) / 1024:.1f} KB", ft.Icons.STORAGE),
+            self._create_stat_badge("Rows", rows, ft.Icons.TABLE_ROWS),
+            self._create_stat_badge("Columns", f"{columns}", ft.Icons.VIEW_COLUMN),
+            self._create_stat_badge("Size", f"{size_kb:.1f} KB", ft.Icons.STORAGE),
         ], spacing=15)
         
         # Preview de datos usando componente existente
@@ -2,6 +2,17 @@ import flet as ft
 import os
 import pandas as pd
 
+# Formatos de output: extensión → etiqueta del checkbox
+OUTPUT_FORMATS = {
+    ".csv": "CSV (.csv)",
+    ".rpt": "RPT (.rpt)",
+    ".parquet": "Parquet (.parquet)",
+    ".feather": "Feather (.feather)",
+    ".arrow": "Arrow IPC (.arrow)",
+}
+
+# Formatos columnares: admiten códec de compresión
+COLUMNAR_FORMATS = (".parquet", ".feather", ".arrow")
 
 class OutputsTab:
     """Tab 3: Output Parameters con control de audit"""
@@ -15,8 +26,8 @@ class OutputsTab:
 
         # Referencias para Tab 3 - Output
         self.output_path_field = ft.Ref[ft.TextField]()
-        self.csv_checkbox = ft.Ref[ft.Checkbox]()
-        self.rpt_checkbox = ft.Ref[ft.Checkbox]()
+        self.format_checkboxes = {ext: ft.Ref[ft.Checkbox]() for ext in OUTPUT_FORMATS}
+        self.compression_dropdown = ft.Ref[ft.Dropdown]()
         self.output_status = ft.Ref[ft.Text]()
         self.audit_checkbox = ft.Ref[ft.Checkbox]()
 
@@ -25,7 +36,7 @@ class OutputsTab:
         controls = [
             ft.TextField(
                 label="Output file location",
-                hint_text="e.g., outputs/results.csv, C:/path/to/output.rpt",
+                hint_text="e.g., outputs/results.csv, C:/path/to/output.rpt, outputs/results.parquet",
                 helper_text="Where to save the processed file",
                 expand=False,
                 on_change=self.validate_output,
@@ -34,19 +45,32 @@ class OutputsTab:
             
             ft.Row([
                 ft.Text("File Format", size=16, weight=ft.FontWeight.BOLD),
-                ft.Checkbox(
-                    label="CSV (.csv)",
-                    value=False,
-                    on_change=self.on_format_change,
-                    ref=self.csv_checkbox
-                ),
-                ft.Checkbox(
-                    label="RPT (.rpt)",
-                    value=False,
-                    on_change=self.on_format_change,
-                    ref=self.rpt_checkbox
-                ),
-            ]),
+                *[
+                    ft.Checkbox(
+                        label=label,
+                        value=False,
+                        on_change=self.on_format_change,
+                        ref=self.format_checkboxes[ext]
+                    )
+                    for ext, label in OUTPUT_FORMATS.items()
+                ],
+            ], wrap=True),
+
+            # Códec de compresión (solo Parquet/Feather/Arrow; Feather/Arrow no admiten snappy)
+            ft.Dropdown(
+                label="Compression",
+                width=250,
+                options=[
+                    ft.dropdown.Option("zstd", "zstd"),
+                    ft.dropdown.Option("lz4", "lz4"),
+                    ft.dropdown.Option("snappy", "snappy (Parquet only)"),
+                    ft.dropdown.Option("none", "None"),
+                ],
+                value="zstd",
+                visible=False,
+                on_change=self.validate_output,
+                ref=self.compression_dropdown
+            ),
 
             ft.Text("", color=ft.Colors.BLUE_600, ref=self.output_status),
         ]
@@ -82,10 +106,10 @@ class OutputsTab:
 
     def on_format_change(self, e):
         # Solo uno puede estar seleccionado
-        if e.control == self.csv_checkbox.current and e.control.value:
-            self.rpt_checkbox.current.value = False
-        elif e.control == self.rpt_checkbox.current and e.control.value:
-            self.csv_checkbox.current.value = False
+        if e.control.value:
+            for ref in self.format_checkboxes.values():
+                if ref.current is not e.control:
+                    ref.current.value = False
         self.page.update()
         self.validate_output(None)
 
@@ -103,20 +127,23 @@ class OutputsTab:
 
     def validate_output(self, e):
         output_path = self.output_path_field.current.value
-        csv_selected = self.csv_checkbox.current.value
-        rpt_selected = self.rpt_checkbox.current.value
+        selected = [ext for ext, ref in self.format_checkboxes.items() if ref.current.value]
 
-        if csv_selected and rpt_selected:
-            self.output_status.current.value = "⛔ Please select only one file format"
-            self.state.reset_output()
-        elif csv_selected:
-            selected_format = ".csv"
-        elif rpt_selected:
-            selected_format = ".rpt"
-        else:
-            selected_format = None
+        error = None
+        selected_format = selected[0] if selected else None
+        if len(selected) > 1:
+            error = "⛔ Please select only one file format"
 
-        if output_path and selected_format:
+        columnar = selected_format in COLUMNAR_FORMATS
+        self.compression_dropdown.current.visible = columnar
+        compression = self.compression_dropdown.current.value if columnar else None
+        if compression == "snappy" and selected_format != ".parquet":
+            error = "⛔ Snappy compression is only available for Parquet"
+
+        if error:
+            self.output_status.current.value = error
+            self.state.reset_output()
+        elif output_path and selected_format:
             # Agregar extensión si falta
             if not output_path.lower().endswith(selected_format):
                 base_path = os.path.splitext(output_path)[0]
@@ -131,7 +158,8 @@ class OutputsTab:
                 self.output_status.current.value = f"✅ Output configured: {final_output_path} ({selected_format.upper()})"
             self.state.set('validated_output', {
                 "path": final_output_path,
-                "file_type": selected_format
+                "file_type": selected_format,
+                "compression": compression
             })
         elif output_path and not selected_format:
             self.output_status.current.value = "⚠️ Please select a file format"
@@ -65,8 +65,16 @@ class ResultsTab:
         
         try:
             # Leer el archivo de resultados
-            if file_type.lower() == 'csv':
+            if file_type.lower().lstrip('.') == 'csv':
                 df = pd.read_csv(final_output_path)
+            elif file_type.lower().lstrip('.') == 'parquet':
+                df = pd.read_parquet(final_output_path)
+            elif file_type.lower().lstrip('.') == 'rpt':
+                from reader import read_rpt
+                df = read_rpt(final_output_path)
+            elif file_type.lower().lstrip('.') in ['feather', 'arrow']:
+                from reader import read_feather_mapped
+                df = read_feather_mapped(final_output_path)
             elif file_type.lower() in ['xlsx', 'excel']:
                 df = pd.read_excel(final_output_path)
             else:
@@ -1,7 +1,6 @@
 import flet as ft
 import os
 import glob
-import pandas as pd
 from views.components import create_data_preview
 
 
@@ -200,8 +199,9 @@ class TablesTab:
             
             file_path = os.path.join(tables_path, filename)
             
-            # Leer archivo CSV
-            df_preview = pd.read_csv(file_path)
+            # Leer la tabla desde el registro (misma caché que usan las reglas del pipeline)
+            from transformers.tables import get_registry
+            df_preview = get_registry(tables_path).get(filename)
             
             # Crear preview usando nuestro método reutilizable
             preview_content = create_data_preview(df_preview, file_path, "csv", max_rows=5)